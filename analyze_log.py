@@ -0,0 +1,50 @@
+# analyze_log.py
+# Phân tích logs/runs.log qua sidecar index (src/log_index.py): đọc log 1 lần,
+# các truy vấn sau đó chỉ seek tới record của height cần xem.
+import argparse
+from pathlib import Path
+
+from src.log_index import LogIndex
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Indexed queries over runs.log")
+    ap.add_argument("--log", type=Path, default=Path("logs") / "runs.log")
+    ap.add_argument("--rebuild", action="store_true", help="bỏ qua index cũ, index lại từ đầu")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("index", help="build/refresh the sidecar index")
+    p = sub.add_parser("timeline", help="network message timeline of a height")
+    p.add_argument("height", type=int)
+    p = sub.add_parser("links", help="DROP/DUP/BLOCK/DEFER_BODY counts per link")
+    p.add_argument("--height", type=int, default=None)
+    p = sub.add_parser("votes", help="vote arrival order until FINALIZE")
+    p.add_argument("height", type=int)
+    p = sub.add_parser("slowest", help="slowest heights (PROPOSE_BLOCK → HEIGHT_FINALIZED)")
+    p.add_argument("-n", type=int, default=10)
+    p = sub.add_parser("export", help="per-height columnar summary as CSV")
+    p.add_argument("out", type=Path)
+    args = ap.parse_args()
+
+    idx = LogIndex.build(args.log) if args.rebuild else LogIndex.open(args.log)
+
+    if args.cmd == "index":
+        print(f"indexed {idx.total_records} records, {len(idx.heights)} heights")
+    elif args.cmd == "timeline":
+        for r in idx.timeline(args.height):
+            print(f"t={r['time']:>6} {r['event']:<12} {r['src'] or '-':>4} -> {r['dst'] or '-':<4} "
+                  f"{r['kind'] or '':<12} {r['msg_id']}")
+    elif args.cmd == "links":
+        for (src, dst), c in idx.link_counts(args.height).items():
+            print(f"{src:>4} -> {dst:<4} " + " ".join(f"{k}={v}" for k, v in sorted(c.items())))
+    elif args.cmd == "votes":
+        for i, (node, validator, phase) in enumerate(idx.vote_order(args.height)):
+            print(f"{i:>4} {node:<4} <- {validator:<4} {phase}")
+    elif args.cmd == "slowest":
+        for h, d in idx.slowest(args.n):
+            print(f"height {h}: {d} ticks")
+    elif args.cmd == "export":
+        print("wrote", idx.export_csv(args.out))
+
+
+if __name__ == "__main__":
+    main()
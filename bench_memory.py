@@ -0,0 +1,42 @@
+# bench_memory.py
+# Footprint theo component (src/pruning.py memory_report) khi chạy nhiều height,
+# có/không HeightPruner: các cấu trúc theo height phải đứng yên khi bật prune.
+import argparse
+
+from src.logger import set_log_sink
+from src.pruning import HeightPruner, memory_report
+from src.simulator import Simulator
+from src.state import make_tx
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Per-component memory report over a long run")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--nodes", type=int, default=4)
+    ap.add_argument("--heights", type=int, default=60)
+    ap.add_argument("--every", type=int, default=20, help="in báo cáo mỗi N height")
+    ap.add_argument("--retention", type=int, default=8, help="0 = không prune")
+    ap.add_argument("--header-body", action="store_true")
+    args = ap.parse_args()
+
+    set_log_sink(lambda line: None)  # chỉ đo bộ nhớ, không ghi runs.log
+    sim = Simulator(args.nodes, args.seed, header_body=args.header_body)
+    if args.retention:
+        HeightPruner(sim, retention=args.retention)
+    try:
+        for h in range(1, args.heights + 1):
+            for nid in sim.node_ids:
+                tx = make_tx(nid, f"{nid}/k", f"h{h}", h, sim.signers[nid], sim.pk_map[nid])
+                for node in sim.nodes.values():
+                    node.receive_tx(tx)
+            sim.run_until(h)
+            if h % args.every == 0 or h == args.heights:
+                print(f"--- height {h}")
+                for comp, r in memory_report(sim).items():
+                    print(f"{comp:26s} entries={r['entries']:7d} bytes={r['bytes']:10d}")
+    finally:
+        set_log_sink(None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# bench_objects.py
+# So sánh bộ nhớ / thời gian heap giữa các class cũ (có __dict__, __lt__ Python)
+# và các class slotted hiện tại trong src/types.py + src/network.py.
+import gc
+import heapq
+import time
+import tracemalloc
+from dataclasses import dataclass
+
+from src.network import Message, NetworkEvent
+from src.types import Vote
+
+N = 200_000
+
+
+# --- Bản cũ (trước khi dùng __slots__), giữ lại chỉ để đo "before" ---
+
+@dataclass
+class LegacyVote:
+    validator: str
+    height: int
+    block_hash: str
+    phase: str
+    signature: str
+
+class LegacyMessage:
+    def __init__(self, msg_id, kind, height, body):
+        self.msg_id = msg_id
+        self.kind = kind
+        self.height = height
+        self.body = body
+
+class LegacyNetworkEvent:
+    def __init__(self, t, src, dst, msg):
+        self.t = t
+        self.src = src
+        self.dst = dst
+        self.msg = msg
+
+    def __lt__(self, other):
+        if self.t != other.t:
+            return self.t < other.t
+        return (self.src, self.dst) < (other.src, other.dst)
+
+
+def _make(vote_cls, msg_cls, ev_cls, n):
+    out = []
+    for i in range(n):
+        v = vote_cls("N1", i, "ab" * 32, "PREVOTE", "cd" * 64)
+        m = msg_cls(f"vote_N1_{i}", "VOTE", i, {"vote": v})
+        out.append(ev_cls(i % 97, "N1", "N2", m))
+    return out
+
+
+def bytes_per_message(vote_cls, msg_cls, ev_cls, n=N) -> float:
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    evs = _make(vote_cls, msg_cls, ev_cls, n)
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    del evs
+    return used / n
+
+
+def heap_push_pop(evs, tuple_key: bool, repeat: int = 3) -> float:
+    # Best of `repeat`, GC tắt trong lúc đo để không lẫn chi phí collector
+    return min(_heap_once(evs, tuple_key) for _ in range(repeat))
+
+
+def _heap_once(evs, tuple_key: bool) -> float:
+    pq = []
+    gc.disable()
+    t0 = time.perf_counter()
+    if tuple_key:
+        for seq, ev in enumerate(evs):
+            heapq.heappush(pq, (ev.t, seq, ev))
+    else:
+        for ev in evs:
+            heapq.heappush(pq, ev)
+    while pq:
+        heapq.heappop(pq)
+    elapsed = time.perf_counter() - t0
+    gc.enable()
+    return elapsed
+
+
+def run():
+    legacy = (LegacyVote, LegacyMessage, LegacyNetworkEvent)
+    slotted = (Vote, Message, NetworkEvent)
+    b_legacy = bytes_per_message(*legacy)
+    b_slotted = bytes_per_message(*slotted)
+    print(f"memory per in-flight VOTE message: before {b_legacy:.0f} B, after {b_slotted:.0f} B")
+
+    evs_legacy = _make(*legacy, N)
+    evs_slotted = _make(*slotted, N)
+    t_lt = heap_push_pop(evs_legacy, tuple_key=False)
+    t_legacy = heap_push_pop(evs_legacy, tuple_key=True)
+    t_slotted = heap_push_pop(evs_slotted, tuple_key=True)
+    print(f"heap push+pop x{N}: __lt__ events {t_lt:.3f}s, "
+          f"(t, seq, ev) legacy {t_legacy:.3f}s, (t, seq, ev) slotted {t_slotted:.3f}s")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,75 @@
+# bench_parallel_exec.py
+# So sánh thời gian execute 1 block lớn: tuần tự vs song song theo nhóm sender
+# (src/parallel_exec.py). Commit và log phải giống hệt nhau. --heights > 0 chạy thêm
+# Simulator end-to-end với exec_workers=0 và exec_workers=--workers.
+import argparse
+import time
+
+from src.crypto import derive_keypair
+from src.exec_cache import execute_txs
+from src.logger import set_log_sink
+from src.parallel_exec import ExecPool
+from src.simulator import Simulator
+from src.state import make_tx
+from src.workload import Workload, WorkloadConfig
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Serial vs sender-parallel block execution")
+    ap.add_argument("--txs", type=int, default=2000)
+    ap.add_argument("--senders", type=int, default=64)
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--heights", type=int, default=5, help="0 = bỏ qua phần Simulator")
+    ap.add_argument("--rate", type=float, default=50.0, help="tx mỗi tick của workload")
+    args = ap.parse_args()
+
+    set_log_sink(lambda line: None)  # chỉ đo execute, không đo ghi file
+    keys = {f"S{i}": derive_keypair(0, f"S{i}") for i in range(args.senders)}
+    pk_map = {s: kp.pk for s, kp in keys.items()}
+    names = list(keys)
+    txs = []
+    for n in range(args.txs):
+        s = names[n % len(names)]
+        kp = keys[s]
+        txs.append(make_tx(s, f"{s}/k{n % 16}", f"v{n}", n, kp.sk, kp.pk))
+
+    def best(fn):
+        times = []
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            res = fn()
+            times.append(time.perf_counter() - t0)
+        return min(times), res
+
+    def run_sim(workers):
+        # close() khi ra khỏi with: dừng thread pool của exec_workers
+        with Simulator(4, seed=0, accounts=args.senders, exec_workers=workers, exec_cache_size=0) as sim:
+            cfg = WorkloadConfig(accounts=args.senders, rate=args.rate)
+            t0 = time.perf_counter()
+            Workload(sim, cfg, seed=0).run(args.heights)
+            return time.perf_counter() - t0, [e.block_hash for e in sim.nodes["N0"].ledger]
+
+    pool = ExecPool(args.workers)
+    try:
+        t_serial, serial = best(lambda: execute_txs(None, txs, pk_map))
+        t_par, par = best(lambda: execute_txs(None, txs, pk_map, pool=pool))
+        if args.heights:
+            (t_sim_serial, chain_serial), (t_sim_par, chain_par) = run_sim(0), run_sim(args.workers)
+    finally:
+        pool.shutdown()
+        set_log_sink(None)
+
+    assert par.commit == serial.commit
+    print(f"{args.txs} txs / {args.senders} senders, {args.workers} workers")
+    print(f"serial:   {t_serial * 1000:8.1f} ms")
+    print(f"parallel: {t_par * 1000:8.1f} ms  (x{t_serial / t_par:.2f})")
+    if args.heights:
+        assert chain_par == chain_serial
+        print(f"simulator, {args.heights} heights at {args.rate} tx/tick:")
+        print(f"serial:   {t_sim_serial * 1000:8.1f} ms")
+        print(f"parallel: {t_sim_par * 1000:8.1f} ms  (x{t_sim_serial / t_sim_par:.2f})")
+
+
+if __name__ == "__main__":
+    main()
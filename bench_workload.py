@@ -0,0 +1,41 @@
+# bench_workload.py
+# Load test: chạy workload tổng hợp trên Simulator và in TPS / độ trễ finalize.
+# Dùng để chọn max_block_txs và số validator.
+import argparse
+
+from src.simulator import Simulator
+from src.workload import Workload, WorkloadConfig
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Synthetic tx workload → TPS + finality latency")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--nodes", type=int, default=4)
+    ap.add_argument("--heights", type=int, default=20)
+    ap.add_argument("--accounts", type=int, default=16)
+    ap.add_argument("--rate", type=float, default=2.0, help="tx mỗi tick (Poisson)")
+    ap.add_argument("--key-space", type=int, default=64)
+    ap.add_argument("--distribution", choices=("uniform", "zipf"), default="uniform")
+    ap.add_argument("--zipf-s", type=float, default=1.2)
+    ap.add_argument("--value-size", type=int, default=16)
+    ap.add_argument("--replay-prob", type=float, default=0.0)
+    ap.add_argument("--mode", choices=("direct", "gossip"), default="direct")
+    ap.add_argument("--max-block-txs", type=int, default=None)
+    args = ap.parse_args()
+
+    sim = Simulator(args.nodes, args.seed, accounts=args.accounts, max_block_txs=args.max_block_txs)
+    cfg = WorkloadConfig(
+        accounts=args.accounts, rate=args.rate, key_space=args.key_space,
+        distribution=args.distribution, zipf_s=args.zipf_s, value_size=args.value_size,
+        replay_prob=args.replay_prob, mode=args.mode,
+    )
+    rep = Workload(sim, cfg, seed=args.seed).run(args.heights)
+
+    print(f"ticks={rep.ticks} submitted={rep.submitted} committed={rep.committed} "
+          f"rejected={rep.rejected} replayed={rep.replayed}")
+    print(f"TPS (1 tick = 1 ms): {rep.tps:.1f}")
+    print(f"latency p50/p90/p99 (ticks): {rep.latency_p50} / {rep.latency_p90} / {rep.latency_p99}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+# convert_log.py
+# Chuyển log JSON-lines (runs.log, .gz/.xz hoặc thư mục segment) sang dạng cột
+# (src/columnar_log.py) để phân tích nhanh, và so thời gian đếm event 2 cách.
+import argparse
+import json
+import time
+from collections import Counter
+from pathlib import Path
+
+from src.columnar_log import ColumnarLog, convert_json_log
+from src.log_segments import iter_log_lines
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Convert a JSON-lines run log to the columnar format")
+    ap.add_argument("src", type=Path, nargs="?", default=Path("logs") / "runs.log")
+    ap.add_argument("dst", type=Path, nargs="?", default=None, help="mặc định: <src>.col")
+    ap.add_argument("--rows", type=int, default=65536, help="số record mỗi segment")
+    ap.add_argument("--field", default="event", help="field dùng để so thời gian đếm")
+    ap.add_argument("--verify", action="store_true", help="kiểm tra đọc lại ra đúng từng byte")
+    args = ap.parse_args()
+    dst = args.dst or args.src.with_name(args.src.name + ".col")
+
+    t0 = time.perf_counter()
+    rows = convert_json_log(args.src, dst, rows_per_segment=args.rows)
+    print(f"converted {rows} records in {time.perf_counter() - t0:.3f}s -> {dst} ({dst.stat().st_size} bytes)")
+
+    t0 = time.perf_counter()
+    slow = Counter(json.loads(line).get(args.field) for line in iter_log_lines(args.src))
+    slow.pop(None, None)
+    t_json = time.perf_counter() - t0
+    with ColumnarLog(dst) as log:
+        t0 = time.perf_counter()
+        fast = log.counts(args.field)
+        t_col = time.perf_counter() - t0
+        if args.verify:
+            same = all(a == b for a, b in zip(log.lines(), iter_log_lines(args.src))) and len(log) == rows
+            print("round trip identical:", same)
+    print(f"count by {args.field}: json {t_json:.3f}s, columnar {t_col:.4f}s, equal={dict(slow) == dict(fast)}")
+    for value, n in fast.most_common(5):
+        print(f"  {value}: {n}")
+
+
+if __name__ == "__main__":
+    main()
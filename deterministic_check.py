@@ -1,47 +1,122 @@
 # filepath: deterministic_check.py
 
+import argparse
+import shutil
+from itertools import islice
 from pathlib import Path
+from typing import Optional, Tuple
+
 from src.simulator import Simulator
+from src.logger import RunDigest, start_digest, stop_digest, first_divergence
+from src.log_segments import iter_log_lines, run_dir_for, segmented_log
 LOG_PATH = Path("logs") / "runs.log"
 
 
-def run_one(seed: int = 99, target_height: int = 5) -> bytes:
+def run_one(seed: int = 99, target_height: int = 5, n_nodes: int = 6,
+            keep_as: Optional[Path] = None) -> RunDigest:
     # Xóa file log cũ (nếu có) để đảm bảo log chỉ chứa run hiện tại
     if LOG_PATH.exists():
         LOG_PATH.unlink()
 
-    # Tạo simulator và chạy tới height target_height
-    sim = Simulator(6, seed=seed)
+    # Bật rolling digest: hash từng record khi được ghi, checkpoint mỗi height
+    start_digest()
+    sim = Simulator(n_nodes, seed=seed)
     sim.run_until(target_height)
+    digest = stop_digest()
+
+    # Giữ lại file log của run này (để tìm record lệch nếu có), không đọc vào RAM
+    if keep_as is not None and LOG_PATH.exists():
+        LOG_PATH.replace(keep_as)
+    return digest
+
+
+def run_one_segmented(seed: int, target_height: int, n_nodes: int, run_id: str,
+                      **segment_kw) -> Tuple[RunDigest, Path]:
+    """Như run_one nhưng ghi log thành segment (nén) trong thư mục riêng của run."""
+    run_dir = run_dir_for(LOG_PATH.parent, run_id, seed)
+    if run_dir.exists():
+        shutil.rmtree(run_dir)  # output cũ của chính script này
+    start_digest()
+    with segmented_log(LOG_PATH.parent, run_id, seed, **segment_kw):
+        sim = Simulator(n_nodes, seed=seed)
+        sim.run_until(target_height)
+    return stop_digest(), run_dir
 
-    # Đọc lại toàn bộ file log dưới dạng bytes
-    # (so sánh byte-identical cho đúng yêu cầu)
-    return LOG_PATH.read_bytes()
 
+def first_diverging_record(path1: Path, path2: Path, start: int,
+                           stop: Optional[int]) -> Optional[Tuple[int, str, str]]:
+    """Stream both logs over records [start, stop) and return the first mismatch.
 
-def run():
+    path may be a log file (plain or .gz/.xz) or a segmented run directory;
+    only one line of each log is held in memory at a time.
+    """
+    it1 = islice(iter_log_lines(path1), start, stop)
+    it2 = islice(iter_log_lines(path2), start, stop)
+    idx = start
+    while True:
+        a = next(it1, None)
+        b = next(it2, None)
+        if a is None and b is None:
+            return None
+        if a != b:
+            return idx, (a or "<EOF>").rstrip("\n"), (b or "<EOF>").rstrip("\n")
+        idx += 1
+
+
+def run(seed: int = 99, target_height: int = 5, n_nodes: int = 6,
+        segment_kw: Optional[dict] = None) -> bool:
     # Chạy 2 lần với cùng tham số (seed, height)
-    log1 = run_one(seed=99, target_height=5)
-    log2 = run_one(seed=99, target_height=5)
-
-    # So sánh kích thước + nội dung
-    print("Log1 size:", len(log1))
-    print("Log2 size:", len(log2))
-    print("Logs identical (byte-by-byte):", log1 == log2)
-
-    if log1 != log2:
-        print("\nLogs differ! Showing first differing byte index:")
-        max_len = min(len(log1), len(log2))
-        diff_index = None
-        for i in range(max_len):
-            if log1[i] != log2[i]:
-                diff_index = i
-                break
-        if diff_index is not None:
-            print("First difference at byte index:", diff_index)
+    if segment_kw is None:
+        path1 = LOG_PATH.with_name("runs.1.log")
+        path2 = LOG_PATH.with_name("runs.2.log")
+        d1 = run_one(seed, target_height, n_nodes, keep_as=path1)
+        d2 = run_one(seed, target_height, n_nodes, keep_as=path2)
+    else:
+        d1, path1 = run_one_segmented(seed, target_height, n_nodes, "check1", **segment_kw)
+        d2, path2 = run_one_segmented(seed, target_height, n_nodes, "check2", **segment_kw)
+
+    # So sánh số record + digest cuối cùng
+    print("Log1 records:", d1.records, "digest:", d1.hexdigest())
+    print("Log2 records:", d2.records, "digest:", d2.hexdigest())
+    identical = d1.records == d2.records and d1.hexdigest() == d2.hexdigest()
+    print("Logs identical (sha256):", identical)
+
+    if not identical:
+        # Bisect trên các checkpoint theo height → O(log heights) so sánh
+        cps1, cps2 = d1.checkpoints, d2.checkpoints
+        common = min(len(cps1), len(cps2))
+        idx = first_divergence(cps1, cps2)
+        if idx is None:
+            idx = common
+        start = cps1[idx - 1][1] if idx > 0 else 0
+        stop = None
+        if idx < common:
+            stop = max(cps1[idx][1], cps2[idx][1])
+            print("\nLogs differ! First diverging height:", cps1[idx][0])
         else:
-            print("Lengths differ but prefixes are identical.")
+            print("\nLogs differ after the last common checkpoint.")
+        rec = first_diverging_record(path1, path2, start, stop)
+        if rec is not None:
+            print("First differing record index:", rec[0])
+            print("  run1:", rec[1])
+            print("  run2:", rec[2])
+    return identical
 
 
 if __name__ == "__main__":
-    run()
+    ap = argparse.ArgumentParser(description="Run the simulation twice and compare log digests.")
+    ap.add_argument("--seed", type=int, default=99)
+    ap.add_argument("--heights", type=int, default=5)
+    ap.add_argument("--nodes", type=int, default=6)
+    ap.add_argument("--segmented", action="store_true",
+                    help="ghi mỗi run thành segment trong logs/check{1,2}-seed<seed>/")
+    ap.add_argument("--compress", choices=["gzip", "lzma", "none"], default="gzip")
+    ap.add_argument("--segment-bytes", type=int, default=64 << 20)
+    ap.add_argument("--segment-heights", type=int, default=None)
+    args = ap.parse_args()
+    segment_kw = None
+    if args.segmented:
+        segment_kw = {"compress": None if args.compress == "none" else args.compress,
+                      "max_bytes": args.segment_bytes, "max_heights": args.segment_heights}
+    ok = run(args.seed, args.heights, args.nodes, segment_kw)
+    raise SystemExit(0 if ok else 1)
@@ -0,0 +1,53 @@
+# profile_sim.py
+# Thời gian theo component (verify, sign, apply/commit, execute, finalize, network, log)
+# và bộ nhớ cấp phát theo module, tách theo từng height (src/profiling.py).
+import argparse
+
+from src.logger import set_log_sink
+from src.profiling import Profiler
+from src.simulator import Simulator
+from src.state import make_tx
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Per-height CPU / memory profile of a simulator run")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--nodes", type=int, default=4)
+    ap.add_argument("--heights", type=int, default=20)
+    ap.add_argument("--rate", type=float, default=1000, help="token bucket rate của network")
+    ap.add_argument("--memory", action="store_true", help="tracemalloc diff mỗi height")
+    ap.add_argument("--sample", metavar="OUT", help="ghi collapsed stacks (flamegraph) ra file")
+    ap.add_argument("--interval", type=float, default=0.002)
+    ap.add_argument("--per-height", action="store_true", help="in profile từng height")
+    args = ap.parse_args()
+
+    set_log_sink(lambda line: None)  # chỉ đo, không ghi runs.log
+    sim = Simulator(args.nodes, args.seed)
+    sim.network.rate = args.rate
+    prof = Profiler(sim, memory=args.memory, sampling=bool(args.sample), interval=args.interval)
+    try:
+        for h in range(1, args.heights + 1):
+            for nid in sim.node_ids:
+                tx = make_tx(nid, f"{nid}/k", f"h{h}", h, sim.signers[nid], sim.pk_map[nid])
+                for node in sim.nodes.values():
+                    node.receive_tx(tx)
+            sim.run_until(h)
+    finally:
+        set_log_sink(None)
+
+    if args.per_height:
+        for hp in prof.heights:
+            top = sorted(hp.exclusive.items(), key=lambda kv: -kv[1])[:3]
+            line = " ".join(f"{c}={t * 1000:.1f}ms" for c, t in top)
+            print(f"h={hp.height:4d} wall={hp.wall * 1000:7.1f}ms {line}")
+            if hp.memory:
+                mem = sorted(hp.memory.items(), key=lambda kv: -abs(kv[1]))[:3]
+                print("         mem " + " ".join(f"{m}={b:+d}B" for m, b in mem))
+    print(prof.format_breakdown())
+    if args.sample:
+        n = prof.write_collapsed(args.sample)
+        print(f"{n} stacks -> {args.sample}")
+
+
+if __name__ == "__main__":
+    main()
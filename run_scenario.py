@@ -0,0 +1,42 @@
+# run_scenario.py
+# Chạy 1 timeline fault (partition / degrade / crash / join, file JSON) trên Simulator
+# và in, cho từng fault: số message gửi/mất trong lúc fault và thời gian hồi phục finality.
+import argparse
+
+from src.logger import set_log_sink
+from src.scenario import ScenarioEngine, load_timeline
+from src.simulator import Simulator
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Scripted partition/churn scenario → recovery timing")
+    ap.add_argument("timeline", help="JSON list of faults, vd. scenarios/split_5_3.json")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--nodes", type=int, default=8)
+    ap.add_argument("--until", type=int, default=1000, help="logical time (ticks) to run to")
+    ap.add_argument("--rate", type=int, default=None,
+                    help="token refill mỗi link (msg/s); mặc định network là 50/s, run dài sẽ bị rate limit")
+    ap.add_argument("--quiet", action="store_true", help="không ghi runs.log")
+    args = ap.parse_args()
+
+    if args.quiet:
+        set_log_sink(lambda line: None)
+    sim = Simulator(args.nodes, args.seed)
+    if args.rate is not None:
+        sim.network.rate = args.rate
+    engine = ScenarioEngine(sim, load_timeline(args.timeline))
+    try:
+        engine.run(args.until)
+    finally:
+        set_log_sink(None)
+
+    print(f"time={sim.network.time} heights={sim.height - 1} finalized(quorum)={len(engine.quorum_at)}")
+    print(f"{'fault':10s} {'start':>6s} {'end':>6s} {'sent':>7s} {'wasted':>7s} {'ttr':>6s} {'ttr_all':>8s}")
+    for r in engine.report():
+        fmt = lambda v: "-" if v is None else str(v)
+        print(f"{r.kind:10s} {r.start:6d} {r.end:6d} {r.sent:7d} {r.wasted:7d} "
+              f"{fmt(r.time_to_recover):>6s} {fmt(r.time_to_recover_all):>8s}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+import asyncio
+import random
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .network import Message
+from .wire import encode_message, decode_message, frame, FRAME_HEADER
+from .logger import log_event
+
+
+class AsyncNetwork:
+    """Real-time transport with the same send/broadcast surface as UnreliableNetwork.
+
+    Every node listens on its own loopback TCP port; messages are
+    length-prefixed JSON frames written on one pooled connection per
+    directed link. Drop/delay/duplicate decisions come from a seeded RNG per
+    link, so a link's fault sequence does not depend on how tasks interleave.
+    Delays are in ticks of tick_ms wall-clock milliseconds.
+
+    Broadcasts of the kinds in loopback are also queued to the sender's own
+    node task (no TCP, no faults), for messages the sender must process too.
+    """
+    def __init__(self, nodes: List[str], seed: int,
+                 drop_prob=0.05, dup_prob=0.05,
+                 delay_min=0, delay_max=5,
+                 tick_ms: float = 1.0, host: str = "127.0.0.1",
+                 loopback: Tuple[str, ...] = ()):
+        self.nodes = nodes
+        self.loopback = loopback
+        self.drop_prob = drop_prob
+        self.dup_prob = dup_prob
+        self.delay_min = delay_min
+        self.delay_max = delay_max
+        self.tick = tick_ms / 1000.0
+        self.host = host
+        self.link_rng: Dict[Tuple[str, str], random.Random] = {
+            (src, dst): random.Random(f"{seed}:{src}:{dst}")
+            for src in nodes for dst in nodes if src != dst}
+
+        self.handler: Optional[Callable] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.ports: Dict[str, int] = {}
+        self._servers = []
+        self._tasks: List[asyncio.Task] = []
+        self._inbox: Dict[str, asyncio.Queue] = {}
+        self._conns: Dict[Tuple[str, str], asyncio.Task] = {}  # (src,dst) -> open_connection task
+        # Scheduled or queued deliveries not yet handled; 0 == idle
+        self.in_flight = 0
+        self.bytes_sent = 0
+        self.frames_sent = 0
+
+    async def start(self, handler: Callable):
+        self.handler = handler
+        self.loop = asyncio.get_running_loop()
+        for nid in self.nodes:
+            self._inbox[nid] = asyncio.Queue()
+            server = await asyncio.start_server(
+                lambda r, w, nid=nid: self._serve(nid, r, w), self.host, 0)
+            self._servers.append(server)
+            self.ports[nid] = server.sockets[0].getsockname()[1]
+            self._tasks.append(asyncio.create_task(self._node_task(nid)))
+
+    async def close(self):
+        for t in self._tasks:
+            t.cancel()
+        for fut in self._conns.values():
+            if fut.done() and not fut.cancelled() and fut.exception() is None:
+                fut.result()[1].close()
+            else:
+                fut.cancel()
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks, self._servers, self._conns = [], [], {}
+
+    async def _serve(self, dst: str, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                hdr = await reader.readexactly(FRAME_HEADER)
+                payload = await reader.readexactly(int.from_bytes(hdr, "big"))
+                await self._inbox[dst].put(decode_message(payload))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _node_task(self, nid: str):
+        # Mỗi node là 1 task: xử lý inbox tuần tự, không chia sẻ với node khác
+        q = self._inbox[nid]
+        while True:
+            src, msg = await q.get()
+            try:
+                log_event(
+                    component="aio_network",
+                    event="DELIVER",
+                    src=src,
+                    dst=nid,
+                    msg_id=msg.msg_id,
+                    kind=msg.kind,
+                    height=msg.height,
+                )
+                self.handler(msg, nid)
+            finally:
+                self.in_flight -= 1
+
+    async def _connection(self, src: str, dst: str) -> asyncio.StreamWriter:
+        key = (src, dst)
+        fut = self._conns.get(key)
+        if fut is None:
+            fut = self.loop.create_task(asyncio.open_connection(self.host, self.ports[dst]))
+            self._conns[key] = fut
+        _, writer = await fut
+        return writer
+
+    async def _write(self, src: str, dst: str, payload: bytes):
+        try:
+            writer = await self._connection(src, dst)
+            writer.write(payload)
+            await writer.drain()
+            self.bytes_sent += len(payload)
+            self.frames_sent += 1
+        except (OSError, asyncio.CancelledError):
+            self.in_flight -= 1
+            log_event(component="aio_network", event="WRITE_FAIL", src=src, dst=dst)
+
+    def _schedule(self, src: str, dst: str, payload: bytes, delay: int):
+        self.in_flight += 1
+        self.loop.call_later(delay * self.tick,
+                             lambda: self.loop.create_task(self._write(src, dst, payload)))
+
+    def broadcast(self, src: str, msg: Message):
+        for dst in self.nodes:
+            if dst == src: continue
+            self.send(src, dst, msg)
+        if msg.kind in self.loopback:
+            self.in_flight += 1
+            self._inbox[src].put_nowait((src, msg))
+
+    def send(self, src: str, dst: str, msg: Message):
+        rng = self.link_rng[(src, dst)]
+        if rng.random() < self.drop_prob:
+            log_event(component="aio_network", event="DROP", src=src, dst=dst,
+                      msg_id=msg.msg_id, height=msg.height)
+            return
+        delay = rng.randint(self.delay_min, self.delay_max)
+        dup = rng.random() < self.dup_prob
+        # Serialize ngay lúc gửi: đo đúng chi phí encode thật
+        payload = frame(encode_message(src, msg))
+        self._schedule(src, dst, payload, delay)
+        log_event(component="aio_network", event="SEND", src=src, dst=dst,
+                  msg_id=msg.msg_id, height=msg.height, delay=delay, size=len(payload))
+        if dup:
+            self._schedule(src, dst, payload, delay + 1)
+            log_event(component="aio_network", event="DUP", src=src, dst=dst,
+                      msg_id=msg.msg_id, height=msg.height)
+
+    def idle(self) -> bool:
+        return self.in_flight == 0
+
+
+class AsyncRuntime:
+    """Drive a Simulator's nodes over AsyncNetwork and measure wall-clock finality.
+
+    Each frame is handled by its destination node only, in that node's task
+    (Simulator.handle_message would fan BLOCK/VOTE out to every node). The
+    proposer gets its own BLOCK back through loopback, as fan-out gave it.
+    """
+    def __init__(self, sim, **net_kwargs):
+        self.sim = sim
+        net_kwargs.setdefault("loopback", ("BLOCK",))
+        self.network = AsyncNetwork(sim.node_ids, sim.seed, **net_kwargs)
+        # Node broadcast callbacks resolve sim.network lazily, so swapping is enough
+        sim.network = self.network
+        self.finality_ms: Dict[int, float] = {}
+
+    def _deliver(self, msg: Message, dst: str):
+        node = self.sim.nodes[dst]
+        if msg.kind == "BLOCK":
+            node.receive_block(msg.body["block"])
+        elif msg.kind == "VOTE":
+            node.receive_vote(msg.body["vote"])
+        else:
+            self.sim._handle_p2p(msg, dst)
+
+    async def run_until(self, target_height: int, height_timeout_s: float = 10.0):
+        sim = self.sim
+        await self.network.start(self._deliver)
+        try:
+            while sim.height <= target_height:
+                h = sim.height
+                t0 = time.perf_counter()
+                sim.begin_height()
+                while not sim.height_finalized():
+                    if self.network.idle() or time.perf_counter() - t0 > height_timeout_s:
+                        break
+                    await asyncio.sleep(self.network.tick)
+                if sim.height_finalized():
+                    self.finality_ms[h] = (time.perf_counter() - t0) * 1000.0
+                log_event(
+                    component="aio_runtime",
+                    event="HEIGHT_DONE",
+                    height=h,
+                    finalized=sim.height_finalized(),
+                    wall_ms=round((time.perf_counter() - t0) * 1000.0, 3),
+                )
+                sim.end_height()
+        finally:
+            await self.network.close()
+        return self.finality_ms
+
+    def run(self, target_height: int, height_timeout_s: float = 10.0) -> Dict[int, float]:
+        return asyncio.run(self.run_until(target_height, height_timeout_s))
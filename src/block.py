@@ -1,31 +1,38 @@
 from typing import List, Dict
 from .types import Block, BlockHeader, Transaction
-from .state import State, verify_tx
+from .state import State
 from .crypto import sha256, sign, verify, CTX_HEADER
+from .exec_cache import ExecutionCache, execute_txs
+from .parallel_exec import ExecPool
 
-def build_block(parent_hash: str, height: int, txs: List[Transaction], proposer: str, sk, pk_map: Dict[str, bytes], parent_state: State = None) -> Block:
-    # Initialize state from parent_state if provided to ensure continuity
-    st = State(parent_state.kv, parent_state.executed_txs) if parent_state is not None else State()
-    # Execute txs deterministically (assume parent state separately applied; here minimal)
-    for tx in txs:
-        if not verify_tx(tx, pk_map): continue
-        st.apply(tx)
-    commit = st.commit()
+def compute_block_hash(parent_hash: str, height: int, state_commit: str) -> str:
+    h_bytes = parent_hash.encode() + b":" + str(height).encode() + state_commit.encode()
+    return sha256(h_bytes).hex()
+
+def build_block(parent_hash: str, height: int, txs: List[Transaction], proposer: str, sk, pk_map: Dict[str, bytes], parent_state: State = None,
+                cache: ExecutionCache = None, pool: ExecPool = None) -> Block:
+    # Execute txs deterministically on a copy of parent_state (continuity across blocks);
+    # cache: kết quả được dùng lại khi các node verify cùng block; pool: chạy song song theo sender
+    commit = execute_txs(parent_state, txs, pk_map, cache, pool).commit
     header_fields = (parent_hash, str(height), commit, proposer)
     sig = sign(CTX_HEADER, header_fields, sk).hex()
     header = BlockHeader(parent_hash=parent_hash, height=height, state_commit=commit, proposer=proposer, signature=sig)
-    h_bytes = parent_hash.encode() + b":" + str(height).encode() + commit.encode()
-    block_hash = sha256(h_bytes).hex()
+    block_hash = compute_block_hash(parent_hash, height, commit)
     return Block(header=header, txs=txs, hash=block_hash)
 
-def verify_block(block: Block, pk_map: Dict[str, bytes], parent_state: State = None) -> bool:
-    if block.header.proposer not in pk_map: return False
-    fields = (block.header.parent_hash, str(block.header.height), block.header.state_commit, block.header.proposer)
-    if not verify(CTX_HEADER, fields, pk_map[block.header.proposer], bytes.fromhex(block.header.signature)):
-        return False
+def verify_header(header: BlockHeader, pk_map: Dict[str, bytes]) -> bool:
+    if header.proposer not in pk_map: return False
+    fields = (header.parent_hash, str(header.height), header.state_commit, header.proposer)
+    return verify(CTX_HEADER, fields, pk_map[header.proposer], bytes.fromhex(header.signature))
+
+def verify_body(block: Block, pk_map: Dict[str, bytes], parent_state: State = None,
+                cache: ExecutionCache = None, pool: ExecPool = None) -> bool:
     # Deterministic recompute commitment from txs
-    st = State(parent_state.kv, parent_state.executed_txs) if parent_state is not None else State()
-    for tx in block.txs:
-        if verify_tx(tx, pk_map):
-            st.apply(tx)
-    return st.commit() == block.header.state_commit
+    return execute_txs(parent_state, block.txs, pk_map, cache, pool).commit == block.header.state_commit
+
+def verify_block(block: Block, pk_map: Dict[str, bytes], parent_state: State = None, tx_pk_map: Dict[str, bytes] = None,
+                 cache: ExecutionCache = None, pool: ExecPool = None) -> bool:
+    # tx_pk_map: khóa của các tài khoản gửi tx (mặc định = pk_map của validator)
+    if not verify_header(block.header, pk_map):
+        return False
+    return verify_body(block, tx_pk_map if tx_pk_map is not None else pk_map, parent_state, cache, pool)
@@ -0,0 +1,326 @@
+import pickle
+import struct
+import zlib
+from bisect import bisect_right
+from pathlib import Path
+from typing import Dict, Optional
+
+from .crypto import KeyPair
+from .mvcc import GENESIS_HEIGHT
+
+try:
+    from nacl import signing
+except ImportError:
+    signing = None
+
+MAGIC = b"SIMCKPT"
+VERSION = 2  # v2: accepted_headers lưu kèm height, thêm watermark pruned_below
+SUPPORTED_VERSIONS = (1, 2)  # load đọc được; save luôn ghi VERSION
+_REC = struct.Struct("<7sBI")  # magic, version, payload length (zlib(pickle(record)))
+
+# Thuộc tính network được lưu nguyên mỗi lần (nhỏ, hoặc đổi liên tục)
+_NET_FIELDS = ("time", "seq", "pq", "drop_prob", "dup_prob", "delay_min", "delay_max",
+               "rate", "capacity", "tokens", "last_refill", "block_duration",
+               "blocked_until", "_blocked", "last_height", "pruned_below")
+
+
+def _encode_sk(sk):
+    if signing and isinstance(sk, signing.SigningKey):
+        return ("nacl", bytes(sk))
+    return ("raw", sk)
+
+
+def _decode_sk(enc):
+    kind, raw = enc
+    if kind == "nacl":
+        return signing.SigningKey(raw)
+    return raw
+
+
+def _vote_fingerprint(vb, h: int) -> tuple:
+    pre = tuple((bh, vs.mask) for bh, vs in vb.prevotes.get(h, {}).items())
+    pc = tuple((bh, vs.mask) for bh, vs in vb.precommits.get(h, {}).items())
+    ev = tuple((bh, len(votes)) for bh, votes in vb.precommit_votes.get(h, {}).items())
+    return pre, pc, ev, vb.finalized.get(h)
+
+
+def _vote_heights(vb) -> set:
+    return set(vb.prevotes) | set(vb.precommits) | set(vb.precommit_votes) | set(vb.finalized)
+
+
+class _NodeShadow:
+    """What has already been written for one node (to compute the next delta)."""
+    __slots__ = ("kv", "executed", "blocks", "ledger_len", "mempool", "votes", "headers", "history_tip")
+
+    def __init__(self):
+        self.kv: Dict[str, str] = {}
+        self.executed: set = set()
+        self.blocks: set = set()
+        self.ledger_len = 0
+        self.mempool: set = set()
+        self.votes: Dict[int, tuple] = {}
+        self.headers: set = set()  # network.accepted_headers[nid] đã lưu
+        self.history_tip = GENESIS_HEIGHT  # height cao nhất của node.history đã lưu
+
+
+class Checkpointer:
+    """Incremental, versioned checkpoints of a whole Simulator in one append-only file.
+
+    Each save() appends one record: MAGIC, version byte, length, then a
+    zlib-compressed pickle of what changed since the previous save (kv
+    set/delete, new executed tx ids, new blocks and ledger entries, mempool
+    add/remove, vote-book heights whose tallies changed, and with
+    state_history the MVCC versions of the new heights). The first record
+    also carries the simulator config (history and execution options
+    included) and all signing keys, since key generation is not seeded.
+    The execution cache contents are not saved; they only save work. Network queue, token/block arrays and the
+    RNG state are small and change every tick, so they are written whole.
+
+    Checkpoints are taken between heights (every= registers a height hook, so
+    it also works inside run_until). load() replays every record; a resumed
+    run produces the same runs.log bytes as an uninterrupted one. Hooks
+    (step_hooks, finalize_hooks, …) are not persisted.
+
+    load() also reads v1 files (written before pruning): there is no
+    watermark (pruned_below = 0) and accepted headers are a plain set of
+    hashes, restored with the record's current height. New records are
+    always appended as v2.
+    """
+    def __init__(self, sim, path, every: Optional[int] = None):
+        if len(sim.nodes) != len(sim.node_ids):
+            raise ValueError("checkpointing needs a simulator that hosts every node")
+        if sim.network.model is not None:
+            # Stream random theo link (N² stream, có thể NumPy) không được lưu
+            raise ValueError("checkpointing a simulator with a link model is not supported")
+        self.sim = sim
+        self.path = Path(path)
+        self.saves = 0
+        self.shadows: Dict[str, _NodeShadow] = {nid: _NodeShadow() for nid in sim.node_ids}
+        if every:
+            sim.height_hooks.append(lambda h: self.save() if h % every == 0 else None)
+
+    # --- save ---
+
+    def _node_delta(self, nid: str) -> dict:
+        node, sh = self.sim.nodes[nid], self.shadows[nid]
+        kv = node.state.kv
+        d: dict = {
+            "kv_set": {k: v for k, v in kv.items() if sh.kv.get(k) != v or k not in sh.kv},
+            "kv_del": [k for k in sh.kv if k not in kv],
+            "executed_add": sorted(node.state.executed_txs - sh.executed),
+            "blocks": {h: b for h, b in node.blocks_by_height.items() if h not in sh.blocks},
+            "ledger": node.ledger[sh.ledger_len:],
+            "mempool_add": {k: tx for k, tx in node.mempool.items() if k not in sh.mempool},
+            "mempool_del": [k for k in sh.mempool if k not in node.mempool],
+            "pending_compact": dict(node.pending_compact),
+            "pending_headers": dict(node.pending_headers),
+            "parked_headers": dict(node.parked_headers),
+            "parked_bodies": dict(node.parked_bodies),
+            "pruned_below": node.pruned_below,
+        }
+        vb = node.vote_book
+        votes = {}
+        for h in _vote_heights(vb):
+            fp = _vote_fingerprint(vb, h)
+            if sh.votes.get(h) != fp:
+                votes[h] = {
+                    "prevotes": {bh: vs.mask for bh, vs in vb.prevotes.get(h, {}).items()},
+                    "precommits": {bh: vs.mask for bh, vs in vb.precommits.get(h, {}).items()},
+                    "precommit_votes": {bh: dict(v) for bh, v in vb.precommit_votes.get(h, {}).items()},
+                    "finalized": vb.finalized.get(h),
+                }
+        d["votes"] = votes
+        headers = self.sim.network.accepted_headers.get(nid, {})
+        d["headers_add"] = {bh: h for bh, h in headers.items() if bh not in sh.headers}
+        if node.history is not None:
+            d["history"] = _history_delta(node.history, sh.history_tip)
+        return d
+
+    def _commit_shadow(self, nid: str):
+        node, sh = self.sim.nodes[nid], self.shadows[nid]
+        sh.kv = dict(node.state.kv)
+        sh.executed = set(node.state.executed_txs)
+        sh.blocks = set(node.blocks_by_height)
+        sh.ledger_len = len(node.ledger)
+        sh.mempool = set(node.mempool)
+        sh.votes = {h: _vote_fingerprint(node.vote_book, h) for h in _vote_heights(node.vote_book)}
+        sh.headers = set(self.sim.network.accepted_headers.get(nid, {}))
+        if node.history is not None:
+            sh.history_tip = node.history.tip
+
+    def save(self) -> int:
+        """Append one checkpoint record; returns its size in bytes."""
+        sim, net = self.sim, self.sim.network
+        rec: dict = {
+            "sim": {"height": sim.height, "parent_hash": sim.parent_hash,
+                    "pending_finalize": dict(sim.pending_finalize)},
+            "network": {f: getattr(net, f) for f in _NET_FIELDS},
+            "rng": net.rng.getstate(),
+            "nodes": {nid: self._node_delta(nid) for nid in sim.node_ids},
+        }
+        if self.saves == 0:
+            history = sim.nodes[sim.node_ids[0]].history
+            rec["config"] = {
+                "n_nodes": len(sim.node_ids), "seed": sim.seed,
+                "compact_blocks": sim.compact_blocks, "header_body": sim.header_body,
+                "max_block_txs": sim.max_block_txs, "batch_steps": sim.batch_steps,
+                "accounts": len(sim.account_ids),
+                "exec_cache_size": sim.exec_cache.capacity if sim.exec_cache is not None else 0,
+                "exec_workers": sim.exec_pool.workers if sim.exec_pool is not None else 0,
+                "state_history": history is not None,
+                "history_retention": history.retention if history is not None else None,
+            }
+            rec["keys"] = {vid: _encode_sk(sk) for vid, sk in sim.signers.items()}
+            rec["account_keys"] = {aid: _encode_sk(kp.sk) for aid, kp in sim.account_keys.items()}
+        payload = zlib.compress(pickle.dumps(rec, protocol=pickle.HIGHEST_PROTOCOL))
+        mode = "wb" if self.saves == 0 else "ab"
+        with self.path.open(mode) as f:
+            f.write(_REC.pack(MAGIC, VERSION, len(payload)))
+            f.write(payload)
+        for nid in sim.node_ids:
+            self._commit_shadow(nid)
+        self.saves += 1
+        return _REC.size + len(payload)
+
+    # --- load ---
+
+    @classmethod
+    def load(cls, path, every: Optional[int] = None) -> "Checkpointer":
+        """Rebuild the Simulator from every record in path.
+
+        The returned Checkpointer (its .sim is the restored simulator) keeps
+        appending deltas to the same file.
+        """
+        from .simulator import Simulator  # tránh import vòng
+
+        path = Path(path)
+        sim = None
+        ck = None
+        with path.open("rb") as f:
+            while True:
+                hdr = f.read(_REC.size)
+                if not hdr:
+                    break
+                if len(hdr) < _REC.size:
+                    break  # record cuối ghi dở (crash giữa lúc save): bỏ qua
+                magic, version, n = _REC.unpack(hdr)
+                if magic != MAGIC:
+                    raise ValueError(f"{path}: not a simulator checkpoint")
+                if version not in SUPPORTED_VERSIONS:
+                    raise ValueError(f"{path}: unsupported checkpoint version {version}")
+                payload = f.read(n)
+                if len(payload) < n:
+                    break
+                rec = pickle.loads(zlib.decompress(payload))
+                if sim is None:
+                    cfg = rec["config"]
+                    keys = {vid: _decode_sk(enc) for vid, enc in rec["keys"].items()}
+                    keypairs = {vid: KeyPair(sk, _pk_of(sk)) for vid, sk in keys.items()}
+                    sim = Simulator(cfg["n_nodes"], cfg["seed"], compact_blocks=cfg["compact_blocks"],
+                                    max_block_txs=cfg["max_block_txs"], header_body=cfg["header_body"],
+                                    keypairs=keypairs, accounts=cfg["accounts"],
+                                    batch_steps=cfg["batch_steps"],
+                                    exec_cache_size=cfg.get("exec_cache_size", 256),
+                                    exec_workers=cfg.get("exec_workers", 0),
+                                    state_history=cfg.get("state_history", False),
+                                    history_retention=cfg.get("history_retention"))
+                    for aid, enc in rec["account_keys"].items():
+                        sk = _decode_sk(enc)
+                        sim.account_keys[aid] = KeyPair(sk, _pk_of(sk))
+                        sim.tx_pk_map[aid] = sim.account_keys[aid].pk
+                    ck = cls(sim, path, every=every)
+                _apply(sim, rec, version)
+                for nid in sim.node_ids:
+                    ck._commit_shadow(nid)
+                ck.saves += 1
+        if sim is None:
+            raise ValueError(f"{path}: empty checkpoint")
+        return ck
+
+
+def _history_delta(store, since: int) -> dict:
+    """Versions, executed tx ids and commitments of the heights of store above since."""
+    writes: Dict[int, Dict[str, str]] = {}
+    for k, hs in store._heights.items():
+        i = bisect_right(hs, since)
+        for h, v in zip(hs[i:], store._values[k][i:]):
+            writes.setdefault(h, {})[k] = v
+    executed: Dict[int, list] = {}
+    for tx_id, h in store.executed_at.items():
+        if h > since:
+            executed.setdefault(h, []).append(tx_id)
+    return {"tip": store.tip, "oldest": store.oldest, "writes": writes, "executed": executed,
+            "commits": {h: c for h, c in store.commits.items() if h > since}}
+
+
+def _apply_history(store, d: dict):
+    # Replay qua commit_height: height bị bỏ qua + prune theo retention giống lúc chạy thật
+    heights = set(d["writes"]) | set(d["executed"]) | set(d["commits"]) | {d["tip"]}
+    for h in sorted(heights):
+        if h > store.tip:
+            store.commit_height(h, d["writes"].get(h, {}), d["executed"].get(h, ()),
+                                commit=d["commits"].get(h))
+    store.prune(d["oldest"])
+
+
+def _pk_of(sk) -> bytes:
+    if signing and isinstance(sk, signing.SigningKey):
+        return sk.verify_key.encode()
+    return sk  # mock fallback: pk == sk
+
+
+def _apply(sim, rec: dict, version: int = VERSION):
+    s = rec["sim"]
+    sim.height, sim.parent_hash = s["height"], s["parent_hash"]
+    sim.pending_finalize = dict(s["pending_finalize"])
+
+    net = sim.network
+    for f, v in rec["network"].items():
+        setattr(net, f, v)
+    net.rng.setstate(rec["rng"])
+
+    for nid, d in rec["nodes"].items():
+        node = sim.nodes[nid]
+        kv = node.state.kv
+        kv.update(d["kv_set"])
+        for k in d["kv_del"]:
+            kv.pop(k, None)
+        node.state.executed_txs.update(d["executed_add"])
+        node.blocks_by_height.update(d["blocks"])
+        for entry in d["ledger"]:
+            if node.ledger and node.ledger[-1].height < node.pruned_below:
+                node.ledger_hashes.discard(node.ledger[-1].block_hash)  # như Node.finalize
+            node.ledger.append(entry)
+            node.ledger_by_height[entry.height] = entry
+            node.ledger_hashes.add(entry.block_hash)
+        node.mempool.update(d["mempool_add"])
+        for k in d["mempool_del"]:
+            node.mempool.pop(k, None)
+        node.pending_compact = d["pending_compact"]
+        node.pending_headers = d["pending_headers"]
+        node.parked_headers = d.get("parked_headers", {})
+        node.parked_bodies = d.get("parked_bodies", {})
+        vb = node.vote_book
+        for h, v in d["votes"].items():
+            for book, masks in ((vb.prevotes, v["prevotes"]), (vb.precommits, v["precommits"])):
+                book.pop(h, None)
+                for bh, mask in masks.items():
+                    book[h][bh].mask = mask
+            vb.precommit_votes.pop(h, None)
+            for bh, votes in v["precommit_votes"].items():
+                vb.precommit_votes[h][bh].update(votes)
+            if v["finalized"] is not None:
+                vb.finalized[h] = v["finalized"]
+        headers = d["headers_add"]
+        if version == 1:
+            # v1 chỉ lưu tập block_hash: không biết height → coi như height hiện tại
+            # (chỉ bị prune khi đã qua height đó, không bao giờ sớm hơn)
+            headers = dict.fromkeys(headers, s["height"])
+        if headers:
+            net.accepted_headers[nid].update(headers)
+        if "history" in d:
+            _apply_history(node.history, d["history"])
+        # Delta chỉ ghi phần thêm: phần đã prune được xóa lại theo watermark (v1: chưa prune)
+        node.prune_below(d.get("pruned_below", 0))
+    net.pruned_below = 0
+    net.prune_below(rec["network"].get("pruned_below", 0))
@@ -0,0 +1,343 @@
+import json
+import mmap
+import struct
+import sys
+from array import array
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+MAGIC = b"SIMCOL"
+VERSION = 1
+_HDR = struct.Struct("<6sBxIQ")  # magic, version, meta length, data length
+MISSING = -(1 << 63)  # giá trị "không có field" của cột int
+_ABSENT = object()
+
+# kind -> typecode của array
+TYPECODES = {"int": "q", "str": "I", "json": "I"}
+
+
+def _pad8(n: int) -> int:
+    return -n % 8
+
+
+class _Column:
+    __slots__ = ("kind", "data")
+
+    def __init__(self, kind: str, rows: int):
+        self.kind = kind
+        self.data = array(TYPECODES[kind], [MISSING if kind == "int" else 0]) * rows
+
+
+def _hashable(v):
+    # Giá trị JSON → key dùng được trong Counter
+    if isinstance(v, list):
+        return tuple(_hashable(x) for x in v)
+    if isinstance(v, dict):
+        return tuple(sorted((k, _hashable(x)) for k, x in v.items()))
+    return v
+
+
+def _kind_of(v) -> str:
+    if type(v) is int and MISSING < v < (1 << 63):
+        return "int"
+    if type(v) is str:
+        return "str"
+    return "json"  # list, float, bool, None, int quá lớn...
+
+
+class ColumnarWriter:
+    """Log writer that stores events as typed columns in mmap-able segments.
+
+    Every field becomes a column: ints go to an array('q') (MISSING where the
+    record lacks the field), strings are dictionary-encoded into array('I')
+    codes (0 = missing) over one string table per segment, so repeated
+    component / event / node ids / block hashes cost 4 bytes each. Anything
+    else (lists, floats, bools) is stored as dictionary-encoded JSON text; a
+    column that sees mixed types is promoted to that kind.
+
+    Rows are buffered and written every rows_per_segment records as a
+    self-contained segment (header, JSON meta with the string table and
+    column offsets, then the 8-byte aligned column arrays), so the file can
+    be read back with ColumnarLog while zero-copying the arrays.
+
+    Implements the log writer interface (write_lines / end_height), so it
+    can be installed with logger.set_log_writer; append(rec) takes records
+    directly (convert_json_log).
+    """
+    def __init__(self, path, rows_per_segment: int = 65536):
+        self.path = Path(path)
+        self.rows_per_segment = rows_per_segment
+        self._f = self.path.open("wb")
+        self.rows = 0
+        self.segments = 0
+        self._reset()
+
+    def _reset(self):
+        self._n = 0
+        self._cols: Dict[str, _Column] = {}
+        self._strings: List[str] = [""]  # code 0 = missing
+        self._codes: Dict[str, int] = {}
+
+    def _code(self, s: str) -> int:
+        c = self._codes.get(s)
+        if c is None:
+            c = self._codes[s] = len(self._strings)
+            self._strings.append(s)
+        return c
+
+    def _promote(self, col: _Column):
+        # int/str → json: mã hóa lại giá trị cũ thành JSON text
+        if col.kind == "int":
+            old = [None if x == MISSING else json.dumps(x) for x in col.data]
+        else:
+            old = [None if c == 0 else json.dumps(self._strings[c]) for c in col.data]
+        col.kind = "json"
+        col.data = array("I", [0 if s is None else self._code(s) for s in old])
+
+    def _put(self, col: _Column, v):
+        kind = _kind_of(v)
+        if kind != col.kind and col.kind != "json":
+            self._promote(col)
+        if col.kind == "int":
+            col.data.append(v)
+        elif col.kind == "str":
+            col.data.append(self._code(v))
+        else:
+            col.data.append(self._code(json.dumps(v, sort_keys=True)))
+
+    def append(self, rec: dict):
+        cols = self._cols
+        for name, col in cols.items():
+            if name in rec:
+                self._put(col, rec[name])
+            else:
+                col.data.append(MISSING if col.kind == "int" else 0)
+        for name, v in rec.items():
+            if name not in cols:
+                col = cols[name] = _Column(_kind_of(v), self._n)
+                self._put(col, v)
+        self._n += 1
+        self.rows += 1
+        if self._n >= self.rows_per_segment:
+            self.flush()
+
+    def write_lines(self, lines):
+        loads = json.loads
+        for line in lines:
+            self.append(loads(line))
+
+    def end_height(self, height: int):
+        pass
+
+    def flush(self):
+        """Write the buffered rows as one segment."""
+        if not self._n:
+            return
+        columns, off = [], 0
+        blobs = []
+        for name, col in self._cols.items():
+            raw = col.data.tobytes()
+            columns.append({"name": name, "kind": col.kind, "offset": off, "length": len(raw)})
+            blobs.append(raw + b"\0" * _pad8(len(raw)))
+            off += len(raw) + _pad8(len(raw))
+        meta = json.dumps({"rows": self._n, "byteorder": sys.byteorder,
+                           "strings": self._strings[1:], "columns": columns}).encode("utf-8")
+        meta += b" " * _pad8(_HDR.size + len(meta))  # data bắt đầu ở offset chia hết cho 8
+        self._f.write(_HDR.pack(MAGIC, VERSION, len(meta), off))
+        self._f.write(meta)
+        self._f.writelines(blobs)
+        self.segments += 1
+        self._reset()
+
+    def close(self):
+        if self._f is None:
+            return
+        self.flush()
+        self._f.close()
+        self._f = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Segment:
+    """One segment of a columnar log; column arrays are views into the mmap."""
+    def __init__(self, log: "ColumnarLog", meta: dict, base: int):
+        self.log = log
+        self.rows: int = meta["rows"]
+        self.strings: List[Optional[str]] = [None] + meta["strings"]
+        self.columns: Dict[str, dict] = {c["name"]: c for c in meta["columns"]}
+        self._swap = meta["byteorder"] != sys.byteorder
+        self._base = base
+
+    def array(self, name: str):
+        """Raw column: int values (MISSING = absent) or dictionary codes (0 = absent)."""
+        c = self.columns.get(name)
+        if c is None:
+            return None
+        tc = TYPECODES[c["kind"]]
+        start = self._base + c["offset"]
+        if self._swap:
+            a = array(tc)
+            a.frombytes(self.log._buf[start:start + c["length"]])
+            a.byteswap()
+            return a
+        return self.log._view(start, c["length"], tc)
+
+    def values(self, name: str) -> list:
+        """Decoded column: Python values, None where the record lacks the field."""
+        return self._decode(name, None)
+
+    def _decode(self, name: str, absent) -> list:
+        c = self.columns.get(name)
+        if c is None:
+            return [absent] * self.rows
+        data = self.array(name)
+        if c["kind"] == "int":
+            return [absent if x == MISSING else x for x in data]
+        if c["kind"] == "str":
+            strings = [absent] + self.strings[1:]
+            return [strings[x] for x in data]
+        # bảng string dùng chung với cột str → chỉ parse JSON các mã cột này dùng
+        decoded = {x: json.loads(self.strings[x]) for x in set(data) if x}
+        decoded[0] = absent
+        return [decoded[x] for x in data]
+
+    def counts(self, name: str) -> Counter:
+        """value -> occurrences, absent values not counted; counted on the codes, not decoded rows.
+
+        Keys are the decoded values whatever the column kind, so counts of
+        segments where the column was promoted to json merge with the rest
+        (lists count as tuples, dicts as their sorted item tuples).
+        """
+        c = self.columns.get(name)
+        if c is None:
+            return Counter()
+        data = self.array(name)
+        if c["kind"] == "int":
+            out = Counter(data)
+            out.pop(MISSING, None)
+            return out
+        codes = Counter(data)
+        codes.pop(0, None)
+        strings = self.strings
+        if c["kind"] == "str":
+            return Counter({strings[k]: n for k, n in codes.items()})
+        out = Counter()
+        for k, n in codes.items():
+            out[_hashable(json.loads(strings[k]))] += n
+        return out
+
+    def records(self) -> Iterator[dict]:
+        # field có thể mang giá trị null thật (cột json) → dùng sentinel riêng cho "không có"
+        names = list(self.columns)
+        cols = [self._decode(n, _ABSENT) for n in names]
+        for i in range(self.rows):
+            yield {n: col[i] for n, col in zip(names, cols) if col[i] is not _ABSENT}
+
+
+class ColumnarLog:
+    """Read-only mmap view of a file written by ColumnarWriter.
+
+    Segment headers are parsed up front; column data is only touched when a
+    column is asked for, as memoryviews into the mapping (no parsing, no
+    copy). Use as a context manager, or call close(), to release the views
+    and the mapping.
+    """
+    def __init__(self, path):
+        self.path = Path(path)
+        self._file = self.path.open("rb")
+        size = self.path.stat().st_size
+        self._buf = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self._mv = memoryview(self._buf)
+        self._views: List[memoryview] = []
+        self.segments: List[Segment] = []
+        pos = 0
+        while pos < size:
+            magic, version, meta_len, data_len = _HDR.unpack_from(self._buf, pos)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{self.path}: not a columnar log segment at offset {pos}")
+            meta = json.loads(bytes(self._buf[pos + _HDR.size:pos + _HDR.size + meta_len]))
+            base = pos + _HDR.size + meta_len
+            self.segments.append(Segment(self, meta, base))
+            pos = base + data_len
+
+    def _view(self, start: int, length: int, typecode: str) -> memoryview:
+        v = self._mv[start:start + length].cast(typecode)
+        self._views.append(v)
+        return v
+
+    def __len__(self) -> int:
+        return sum(s.rows for s in self.segments)
+
+    def fields(self) -> List[str]:
+        seen = {}
+        for s in self.segments:
+            seen.update(dict.fromkeys(s.columns))
+        return list(seen)
+
+    def column(self, name: str) -> list:
+        out = []
+        for s in self.segments:
+            out.extend(s.values(name))
+        return out
+
+    def counts(self, name: str) -> Counter:
+        out = Counter()
+        for s in self.segments:
+            out.update(s.counts(name))
+        return out
+
+    def records(self) -> Iterator[dict]:
+        for s in self.segments:
+            yield from s.records()
+
+    def lines(self) -> Iterator[str]:
+        """Records as JSON lines, byte-identical to what log_event wrote."""
+        for rec in self.records():
+            yield json.dumps(rec, sort_keys=True) + "\n"
+
+    def close(self):
+        for v in self._views:
+            v.release()
+        self._views.clear()
+        self._mv.release()
+        if isinstance(self._buf, mmap.mmap):
+            self._buf.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def convert_json_log(src, dst, rows_per_segment: int = 65536) -> int:
+    """Convert a JSON-lines log (file, .gz/.xz or segmented run dir) to columnar; returns rows."""
+    from .log_segments import iter_log_lines
+
+    with ColumnarWriter(dst, rows_per_segment) as w:
+        loads = json.loads
+        for line in iter_log_lines(src):
+            w.append(loads(line))
+    return w.rows
+
+
+@contextmanager
+def columnar_sink(path, rows_per_segment: int = 65536):
+    """Send the log to a ColumnarWriter at path (instead of runs.log) for the with block."""
+    from .logger import set_log_writer
+
+    writer = ColumnarWriter(path, rows_per_segment)
+    prev = set_log_writer(writer)
+    try:
+        yield writer
+    finally:
+        set_log_writer(prev)
+        writer.close()
@@ -0,0 +1,47 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+from .types import Block, CompactBlock, Transaction
+from .crypto import sha256
+
+SHORT_ID_BYTES = 6
+
+
+def short_tx_id(tx_id: str, block_hash: str) -> str:
+    # Salted with the block hash so collisions can't be precomputed across blocks
+    return sha256(block_hash.encode() + b":" + tx_id.encode())[:SHORT_ID_BYTES].hex()
+
+
+def make_compact_block(block: Block) -> CompactBlock:
+    return CompactBlock(
+        header=block.header,
+        hash=block.hash,
+        short_ids=[short_tx_id(tx.id(), block.hash) for tx in block.txs],
+    )
+
+
+def reconstruct(cb: CompactBlock, pool: Iterable[Transaction]) -> Tuple[List[Optional[Transaction]], List[int]]:
+    """Fill the compact block's slots from a tx pool.
+
+    Returns (slots, missing_indexes). Short ids that collide inside the pool
+    are treated as missing so the full tx is fetched instead of guessed.
+    """
+    by_short: Dict[str, Optional[Transaction]] = {}
+    for tx in pool:
+        sid = short_tx_id(tx.id(), cb.hash)
+        by_short[sid] = None if sid in by_short else tx
+    slots = [by_short.get(sid) for sid in cb.short_ids]
+    missing = [i for i, tx in enumerate(slots) if tx is None]
+    return slots, missing
+
+
+def fill_missing(cb: CompactBlock, slots: List[Optional[Transaction]], txs: List[Transaction]) -> List[int]:
+    """Place txs into the empty slots in index order; returns indexes still missing."""
+    it = iter(txs)
+    for i, cur in enumerate(slots):
+        if cur is not None:
+            continue
+        tx = next(it, None)
+        if tx is None:
+            break
+        if short_tx_id(tx.id(), cb.hash) == cb.short_ids[i]:
+            slots[i] = tx
+    return [i for i, tx in enumerate(slots) if tx is None]
@@ -1,19 +1,27 @@
 from collections import defaultdict
-from typing import Dict, List
+from typing import Dict, List, Union
 from .types import Vote, FinalizationResult
 from .crypto import sign, verify, CTX_VOTE
+from .validators import ValidatorSet, VoterSet
 from .logger import log_event
 
 class VoteBook:
-    def __init__(self, validators: List[str]):
+    def __init__(self, validators: Union[List[str], ValidatorSet]):
         self.validators = validators
-        self.prevotes: Dict[int, Dict[str, set]] = defaultdict(lambda: defaultdict(set))  # height -> block_hash -> validators
-        self.precommits: Dict[int, Dict[str, set]] = defaultdict(lambda: defaultdict(set))
+        # Tally theo index số nguyên: mỗi (height, block_hash) là 1 bitmask VoterSet
+        self.vset = validators if isinstance(validators, ValidatorSet) else ValidatorSet(validators)
+        new_voters = lambda: VoterSet(self.vset)
+        self.prevotes: Dict[int, Dict[str, VoterSet]] = defaultdict(lambda: defaultdict(new_voters))  # height -> block_hash -> validators
+        self.precommits: Dict[int, Dict[str, VoterSet]] = defaultdict(lambda: defaultdict(new_voters))
         self.finalized: Dict[int, str] = {}
+        # Signed precommits (height -> block_hash -> validator -> Vote), kept as commit evidence
+        self.precommit_votes: Dict[int, Dict[str, Dict[str, Vote]]] = defaultdict(lambda: defaultdict(dict))
+        # Mọi height < pruned_below đã bị prune_below() xóa; vote tới muộn cho chúng bị bỏ qua
+        self.pruned_below = 0
 
     def majority(self) -> int:
         # Strict majority
-        return (2 * len(self.validators)) // 3 + 1
+        return self.vset.majority()
 
     def add_vote(self, v: Vote) -> FinalizationResult:
         log_event(
@@ -23,9 +31,15 @@ class VoteBook:
             height=v.height,
             block_hash=v.block_hash,
         )
+        if v.height < self.pruned_below:
+            return FinalizationResult(v.height, v.block_hash, False, "height pruned")
         target = self.prevotes if v.phase == "PREVOTE" else self.precommits
-        target[v.height][v.block_hash].add(v.validator)
+        idx = self.vset.index.get(v.validator)
+        if idx is not None:
+            target[v.height][v.block_hash].add_index(idx)
         if v.phase == "PRECOMMIT":
+            if idx is not None:
+                self.precommit_votes[v.height][v.block_hash].setdefault(v.validator, v)
             if len(target[v.height][v.block_hash]) >= self.majority():
                 # Safety: ensure no conflicting finalized height
                 if v.height in self.finalized and self.finalized[v.height] != v.block_hash:
@@ -49,6 +63,33 @@ class VoteBook:
                 return FinalizationResult(v.height, v.block_hash, True, "")
         return FinalizationResult(v.height, v.block_hash, False, "")
 
+    def commit_evidence(self, height: int) -> List[Vote]:
+        """Precommits backing the finalized block at height, in validator order."""
+        block_hash = self.finalized.get(height)
+        if block_hash is None:
+            return []
+        votes = self.precommit_votes[height][block_hash]
+        return [votes[val] for val in self.validators if val in votes]
+
+    def prune_below(self, height: int) -> int:
+        """Drop tallies, evidence and finalized hashes of heights < height; returns heights dropped."""
+        if height <= self.pruned_below:
+            return 0
+        dropped = set()
+        for book in (self.prevotes, self.precommits, self.precommit_votes, self.finalized):
+            old = [h for h in book if h < height]
+            for h in old:
+                del book[h]
+            dropped.update(old)
+        self.pruned_below = height
+        return len(dropped)
+
+def proposer_for(height: int, validators: Union[List[str], ValidatorSet]) -> str:
+    """Round-robin proposer schedule (shared by Simulator and header checks)."""
+    if isinstance(validators, ValidatorSet):
+        return validators.name(validators.proposer(height))
+    return validators[height % len(validators)]
+
 def make_vote(validator: str, height: int, block_hash: str, phase: str, sk) -> Vote:
     fields = (validator, str(height), block_hash, phase)
     sig = sign(CTX_VOTE, fields, sk).hex()
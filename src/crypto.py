@@ -1,6 +1,6 @@
 import hashlib
 from dataclasses import dataclass
-from typing import Tuple, Any
+from typing import Dict, Iterable, Tuple, Any
 
 # Lightweight placeholder Ed25519 using pynacl if available; else mock (NOT secure).
 try:
@@ -16,16 +16,22 @@ CTX_VOTE = f"VOTE:{CHAIN_ID}"
 def sha256(data: bytes) -> bytes:
     return hashlib.sha256(data).digest()
 
-def encode_kv_state(state: dict) -> bytes:
-    # Deterministic: sort keys, length-prefix key/value
+def encode_kv_items(items) -> bytes:
+    """Length-prefixed encoding of (key, value) pairs already in key order."""
     out = bytearray()
-    for k in sorted(state.keys()):
-        v = state[k]
+    for k, v in items:
         kb = k.encode()
         vb = v.encode()
         out += len(kb).to_bytes(4, 'big') + kb + len(vb).to_bytes(4, 'big') + vb
     return bytes(out)
 
+def encode_kv_state(state: dict) -> bytes:
+    # Deterministic: sort keys, length-prefix key/value
+    # (SortedKV đã giữ key theo thứ tự → stream luôn, không sort lại)
+    if hasattr(state, "sorted_items"):
+        return encode_kv_items(state.sorted_items())
+    return encode_kv_items((k, state[k]) for k in sorted(state.keys()))
+
 def state_hash(state: dict) -> str:
     return sha256(encode_kv_state(state)).hex()
 
@@ -54,6 +60,35 @@ def generate_keypair() -> KeyPair:
     pk = sk.verify_key.encode()
     return KeyPair(sk=sk, pk=pk)
 
+def derive_keypair(seed: int, name: str) -> KeyPair:
+    """Deterministic keypair: SigningKey(seed = H(chain, sim seed, name)).
+
+    Same (seed, name) → same key on every run; only for simulation.
+    """
+    material = sha256(f"KEYGEN:{CHAIN_ID}:{seed}:{name}".encode())
+    if not signing:
+        return KeyPair(sk=material, pk=material)
+    sk = signing.SigningKey(material)
+    return KeyPair(sk=sk, pk=sk.verify_key.encode())
+
+# pk -> VerifyKey đã dựng sẵn; tránh parse lại public key ở mỗi lần verify
+_verify_keys: Dict[bytes, Any] = {}
+_VERIFY_KEY_CACHE_MAX = 1 << 16
+
+def verify_key(pk: bytes):
+    vk = _verify_keys.get(pk)
+    if vk is None:
+        if len(_verify_keys) >= _VERIFY_KEY_CACHE_MAX:
+            _verify_keys.clear()
+        vk = _verify_keys[pk] = signing.VerifyKey(pk)
+    return vk
+
+def preload_verify_keys(pks: Iterable[bytes]):
+    """Dựng trước VerifyKey cho cả validator set (vd. khi nạp keystore)."""
+    if signing:
+        for pk in pks:
+            verify_key(pk)
+
 def sign(context: str, fields: Tuple[str, ...], sk) -> bytes:
     msg = context.encode() + b":" + encode_fields(fields)
     if signing and isinstance(sk, signing.SigningKey):
@@ -64,8 +99,7 @@ def verify(context: str, fields: Tuple[str, ...], pk: bytes, sig: bytes) -> bool
     msg = context.encode() + b":" + encode_fields(fields)
     if signing:
         try:
-            vk = signing.VerifyKey(pk)
-            vk.verify(msg, sig)
+            verify_key(pk).verify(msg, sig)
             return True
         except Exception:
             return False
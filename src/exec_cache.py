@@ -0,0 +1,163 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from .crypto import sha256, encode_fields
+from .logger import capture_lines, emit_lines
+from .parallel_exec import ExecPool, MIN_PARALLEL_TXS, execute_parallel
+from .state import State, verify_tx
+from .types import Transaction
+
+
+@dataclass(slots=True, frozen=True)
+class ExecResult:
+    commit: str
+    write_set: Tuple[Tuple[str, str], ...]  # (key, value) cuối cùng của các key bị ghi
+    applied: Tuple[str, ...]               # tx_id đã apply thành công, theo thứ tự
+    log_lines: Tuple[str, ...]             # log của lần execute gốc, replay khi cache hit
+
+
+def exec_key(parent_state: Optional[State], txs: List[Transaction]) -> bytes:
+    """(parent state commit, executed count, digest of the ordered tx list).
+
+    The executed-tx count stands in for the replay set, which is not part of
+    the state commitment; along one chain (same parent commit) it is the same
+    for every honest node.
+    """
+    if parent_state is None:
+        parent_state = State()
+    h = sha256(encode_fields((parent_state.commit_hash(), len(parent_state.executed_txs))))
+    for tx in txs:
+        h = sha256(h + encode_fields((tx.sender, tx.key, tx.value, tx.nonce, tx.signature)))
+    return h
+
+
+class ExecStore:
+    """Cross-process backing store for ExecutionCache (multi-process runtime).
+
+    Wraps multiprocessing.Manager proxies: a dict key -> ExecResult plus a
+    FIFO list of keys to bound its size. Proxies pickle, so the store can be
+    handed to worker processes.
+    """
+    def __init__(self, manager, capacity: int):
+        self.capacity = capacity
+        self.data = manager.dict()
+        self.order = manager.list()
+        self.lock = manager.Lock()
+
+    def get(self, key: bytes) -> Optional[ExecResult]:
+        return self.data.get(key)
+
+    def put(self, key: bytes, res: ExecResult):
+        with self.lock:
+            if key in self.data:
+                return
+            self.data[key] = res
+            self.order.append(key)
+            while len(self.order) > self.capacity:
+                self.data.pop(self.order.pop(0), None)
+
+
+class ExecutionCache:
+    """Bounded LRU of block execution results, shared by all nodes of a process.
+
+    A hit returns the stored ExecResult and re-emits the log lines of the
+    original execution, so runs.log is the same with or without the cache
+    (and whichever process happened to fill it first). With a shared ExecStore,
+    local misses fall back to the store before executing.
+    """
+    def __init__(self, capacity: int = 256, shared: Optional[ExecStore] = None):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.shared = shared
+        self._lru: "OrderedDict[bytes, ExecResult]" = OrderedDict()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._lru)
+
+    def get(self, key: bytes) -> Optional[ExecResult]:
+        res = self._lru.get(key)
+        if res is not None:
+            self._lru.move_to_end(key)
+            self.hits += 1
+            return res
+        if self.shared is not None:
+            res = self.shared.get(key)
+            if res is not None:
+                self.shared_hits += 1
+                self._put_local(key, res)
+                return res
+        self.misses += 1
+        return None
+
+    def put(self, key: bytes, res: ExecResult):
+        self._put_local(key, res)
+        if self.shared is not None:
+            self.shared.put(key, res)
+
+    def _put_local(self, key: bytes, res: ExecResult):
+        self._lru[key] = res
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.capacity:
+            self._lru.popitem(last=False)
+            self.evictions += 1
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.shared_hits + self.misses
+        return (self.hits + self.shared_hits) / total if total else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "hits": self.hits, "shared_hits": self.shared_hits, "misses": self.misses,
+            "evictions": self.evictions, "size": len(self._lru), "hit_rate": self.hit_rate,
+        }
+
+
+def execute_txs(parent_state: Optional[State], txs: List[Transaction], pk_map: Dict[str, bytes],
+                cache: Optional[ExecutionCache] = None, pool: Optional[ExecPool] = None) -> ExecResult:
+    """Apply txs (valid signatures only) on a copy of parent_state and commit.
+
+    With a cache, identical (parent, txs) executions become lookups; with a
+    pool, large blocks run as parallel sender groups (same commit and log).
+    """
+    if cache is None:
+        st, applied = _execute(parent_state, txs, pk_map, pool)
+        return ExecResult(commit=st.commit(), write_set=_write_set(st, txs, applied),
+                          applied=tuple(applied), log_lines=())
+    key = exec_key(parent_state, txs)
+    res = cache.get(key)
+    if res is not None:
+        emit_lines(res.log_lines)
+        return res
+    with capture_lines() as lines:
+        st, applied = _execute(parent_state, txs, pk_map, pool)
+        commit = st.commit()
+    emit_lines(lines)
+    res = ExecResult(commit=commit, write_set=_write_set(st, txs, applied),
+                     applied=tuple(applied), log_lines=tuple(lines))
+    cache.put(key, res)
+    return res
+
+
+def _execute(parent_state: Optional[State], txs: List[Transaction], pk_map: Dict[str, bytes],
+             pool: Optional[ExecPool] = None):
+    if pool is not None and len(txs) >= MIN_PARALLEL_TXS:
+        return execute_parallel(parent_state, txs, pk_map, pool)
+    st = parent_state.child() if parent_state is not None else State()
+    applied = []
+    for tx in txs:
+        if verify_tx(tx, pk_map) and st.apply(tx):
+            applied.append(tx.id())
+    return st, applied
+
+
+def _write_set(st: State, txs: List[Transaction], applied: List[str]) -> Tuple[Tuple[str, str], ...]:
+    done = set(applied)
+    keys = {tx.key for tx in txs if tx.id() in done}
+    return tuple(sorted((k, st.kv[k]) for k in keys))
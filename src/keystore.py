@@ -0,0 +1,69 @@
+import hashlib
+import struct
+from pathlib import Path
+from typing import Dict, List
+
+from .crypto import KeyPair, derive_keypair, preload_verify_keys
+
+try:
+    from nacl import signing
+except ImportError:
+    signing = None
+
+MAGIC = b"SIMKEYS"
+VERSION = 1
+_HDR = struct.Struct("<7sBqI32s")  # magic, version, seed, count, sha256(names)
+_SEED = 32
+_PK = 32
+
+
+def _names_digest(names: List[str]) -> bytes:
+    return hashlib.sha256("\n".join(names).encode()).digest()
+
+
+def save_keystore(path, seed: int, names: List[str], keys: Dict[str, KeyPair]):
+    """Write (seed, pk) pairs for names, in order, as one flat binary file."""
+    out = bytearray(_HDR.pack(MAGIC, VERSION, seed, len(names), _names_digest(names)))
+    for n in names:
+        kp = keys[n]
+        raw = bytes(kp.sk) if signing and isinstance(kp.sk, signing.SigningKey) else kp.sk
+        out += raw[:_SEED].ljust(_SEED, b"\0") + kp.pk
+    Path(path).write_bytes(bytes(out))
+
+
+def load_keystore(path, seed: int, names: List[str]) -> Dict[str, KeyPair]:
+    """Read a keystore written for exactly (seed, names); ValueError otherwise."""
+    data = Path(path).read_bytes()
+    if len(data) < _HDR.size:
+        raise ValueError(f"{path}: truncated keystore")
+    magic, version, k_seed, count, digest = _HDR.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path}: not a keystore (or unsupported version)")
+    if k_seed != seed or count != len(names) or digest != _names_digest(names):
+        raise ValueError(f"{path}: keystore was built for a different seed/validator set")
+    rec = _SEED + _PK
+    if len(data) != _HDR.size + count * rec:
+        raise ValueError(f"{path}: truncated keystore")
+    keys: Dict[str, KeyPair] = {}
+    pos = _HDR.size
+    for n in names:
+        raw, pk = data[pos:pos + _SEED], data[pos + _SEED:pos + rec]
+        pos += rec
+        keys[n] = KeyPair(sk=signing.SigningKey(raw) if signing else raw, pk=pk)
+    preload_verify_keys(kp.pk for kp in keys.values())
+    return keys
+
+
+def load_or_create_keystore(path, seed: int, names: List[str]) -> Dict[str, KeyPair]:
+    """Keys for names from the cache at path; derive and (re)write it on a miss."""
+    path = Path(path)
+    if path.exists():
+        try:
+            return load_keystore(path, seed, names)
+        except ValueError:
+            pass  # cache cũ/khác validator set → derive lại và ghi đè
+    keys = {n: derive_keypair(seed, n) for n in names}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    save_keystore(path, seed, names, keys)
+    preload_verify_keys(kp.pk for kp in keys.values())
+    return keys
@@ -0,0 +1,130 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+from .types import BlockHeader, StateProof, Vote
+from .block import compute_block_hash
+from .consensus import VoteBook, verify_vote
+from .crypto import sha256, verify, encode_kv_state, CTX_HEADER
+from .logger import log_event
+
+
+def _decode_records(data: bytes) -> Optional[List[Tuple[str, str]]]:
+    """Parse the encode_kv_state layout; None if malformed."""
+    out = []
+    i, n = 0, len(data)
+    while i < n:
+        if i + 4 > n: return None
+        kl = int.from_bytes(data[i:i + 4], 'big'); i += 4
+        if i + kl + 4 > n: return None
+        k = data[i:i + kl]; i += kl
+        vl = int.from_bytes(data[i:i + 4], 'big'); i += 4
+        if i + vl > n: return None
+        v = data[i:i + vl]; i += vl
+        try:
+            out.append((k.decode(), v.decode()))
+        except UnicodeDecodeError:
+            return None
+    return out
+
+
+def verify_state_proof(state_commit: str, proof: StateProof) -> bool:
+    """Check that proof.key has proof.value (or is absent when value is None) under state_commit.
+
+    The commitment is a flat hash of the sorted encoding, so the proof carries
+    the encoded neighbours; we re-parse them to make sure the key cannot be
+    smuggled in (or hidden) through a forged record boundary.
+    """
+    before = _decode_records(proof.prefix)
+    after = _decode_records(proof.suffix)
+    if before is None or after is None:
+        return False
+    keys = [k for k, _ in before] + [k for k, _ in after]
+    if any(a >= b for a, b in zip(keys, keys[1:])):
+        return False
+    if before and before[-1][0] >= proof.key:
+        return False
+    if after and after[0][0] <= proof.key:
+        return False
+    middle = encode_kv_state({proof.key: proof.value}) if proof.value is not None else b""
+    return sha256(proof.prefix + middle + proof.suffix).hex() == state_commit
+
+
+class LightClient:
+    """Header-only chain follower.
+
+    Accepts finalized headers above the current tip, checking the proposer's
+    CTX_HEADER signature, the parent-hash link to the current tip and a
+    majority of valid precommits for the block hash. Heights may be skipped
+    (the simulator moves on when a height fails to finalize); the parent
+    link is what chains the headers. No transaction is
+    executed; per height only the state commitment is retained, so state
+    queries can be answered later with verify_state_proof.
+    """
+    def __init__(self, validators: List[str], pk_map: Dict[str, bytes], genesis_hash: str = "GENESIS"):
+        self.validators = validators
+        self.pk_map = pk_map
+        self.tip_height = 0
+        self.tip_hash = genesis_hash
+        self.state_commits: Dict[int, str] = {}  # height -> state_commit
+
+    def majority(self) -> int:
+        # Same rule as VoteBook.majority
+        return (2 * len(self.validators)) // 3 + 1
+
+    def _reject(self, header: BlockHeader, reason: str) -> bool:
+        log_event(
+            component="light_client",
+            event="HEADER_REJECT",
+            height=header.height,
+            proposer=header.proposer,
+            reason=reason,
+        )
+        return False
+
+    def update(self, header: BlockHeader, block_hash: str, precommits: Iterable[Vote]) -> bool:
+        if header.height <= self.tip_height:
+            return self._reject(header, "stale_height")
+        if header.parent_hash != self.tip_hash:
+            return self._reject(header, "parent_mismatch")
+        if header.proposer not in self.pk_map or header.proposer not in self.validators:
+            return self._reject(header, "unknown_proposer")
+        fields = (header.parent_hash, str(header.height), header.state_commit, header.proposer)
+        if not verify(CTX_HEADER, fields, self.pk_map[header.proposer], bytes.fromhex(header.signature)):
+            return self._reject(header, "bad_header_signature")
+        if compute_block_hash(header.parent_hash, header.height, header.state_commit) != block_hash:
+            return self._reject(header, "block_hash_mismatch")
+
+        signers = set()
+        for v in precommits:
+            if v.phase != "PRECOMMIT" or v.height != header.height or v.block_hash != block_hash:
+                continue
+            if v.validator in signers or v.validator not in self.validators:
+                continue
+            if verify_vote(v, self.pk_map):
+                signers.add(v.validator)
+        if len(signers) < self.majority():
+            return self._reject(header, "insufficient_precommits")
+
+        self.tip_height = header.height
+        self.tip_hash = block_hash
+        self.state_commits[header.height] = header.state_commit
+        log_event(
+            component="light_client",
+            event="HEADER_ACCEPT",
+            height=header.height,
+            block_hash=block_hash,
+            signers=len(signers),
+        )
+        return True
+
+    def update_from_votebook(self, header: BlockHeader, block_hash: str, vote_book: VoteBook) -> bool:
+        return self.update(header, block_hash, vote_book.commit_evidence(header.height))
+
+    def verify_state(self, height: int, proof: StateProof) -> bool:
+        commit = self.state_commits.get(height)
+        ok = commit is not None and verify_state_proof(commit, proof)
+        log_event(
+            component="light_client",
+            event="STATE_PROOF_OK" if ok else "STATE_PROOF_REJECT",
+            height=height,
+            key=proof.key,
+        )
+        return ok
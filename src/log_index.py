@@ -0,0 +1,289 @@
+import csv
+import json
+from array import array
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+INDEX_VERSION = 1
+
+# Các event network đếm theo link (src → dst)
+LINK_EVENTS = ("DROP", "DUP", "BLOCK", "BLOCK_DROP", "DEFER_BODY", "BODY_DROP_EXPIRED_HEADER")
+# Event nào coi là "vote đến node" khi dựng thứ tự vote
+VOTE_EVENTS = ("RECEIVE_VOTE",)
+
+
+def _node_of(rec: dict) -> Optional[str]:
+    # Schema log_event không thống nhất tên field node → lấy field đầu tiên có mặt
+    for k in ("node_id", "node", "dst"):
+        v = rec.get(k)
+        if v is not None:
+            return v
+    return None
+
+
+def index_paths(log_path: Path) -> Tuple[Path, Path]:
+    """Sidecar files: <log>.idx.json (summary) and <log>.idx.bin (byte offsets)."""
+    return log_path.with_name(log_path.name + ".idx.json"), log_path.with_name(log_path.name + ".idx.bin")
+
+
+class HeightSummary:
+    __slots__ = ("height", "records", "first_time", "last_time", "propose_time",
+                 "finalized_time", "events", "components", "nodes", "links")
+
+    def __init__(self, height: int):
+        self.height = height
+        self.records = 0
+        self.first_time: Optional[int] = None
+        self.last_time: Optional[int] = None
+        self.propose_time: Optional[int] = None
+        self.finalized_time: Optional[int] = None
+        self.events: Counter = Counter()
+        self.components: Counter = Counter()
+        self.nodes: Counter = Counter()
+        self.links: Dict[str, Counter] = defaultdict(Counter)  # "src>dst" -> event counts
+
+    @property
+    def duration(self) -> Optional[int]:
+        """PROPOSE_BLOCK → HEIGHT_FINALIZED in network ticks (None if either is missing)."""
+        if self.propose_time is None or self.finalized_time is None:
+            return None
+        return self.finalized_time - self.propose_time
+
+    def to_json(self) -> dict:
+        return {
+            "height": self.height, "records": self.records,
+            "first_time": self.first_time, "last_time": self.last_time,
+            "propose_time": self.propose_time, "finalized_time": self.finalized_time,
+            "events": dict(self.events), "components": dict(self.components),
+            "nodes": dict(self.nodes), "links": {k: dict(v) for k, v in self.links.items()},
+        }
+
+    @classmethod
+    def from_json(cls, d: dict) -> "HeightSummary":
+        s = cls(d["height"])
+        s.records = d["records"]
+        s.first_time, s.last_time = d["first_time"], d["last_time"]
+        s.propose_time, s.finalized_time = d["propose_time"], d["finalized_time"]
+        s.events.update(d["events"])
+        s.components.update(d["components"])
+        s.nodes.update(d["nodes"])
+        for k, v in d["links"].items():
+            s.links[k].update(v)
+        return s
+
+
+class LogIndex:
+    """Sidecar index over a JSON-lines runs.log, built in one streaming pass.
+
+    The log is read line by line (only the current record is parsed), and for
+    each height the index keeps the byte offsets of its records plus counters
+    by component / event / node / link. Records without a height field (vd.
+    state COMMIT) are attributed to the last height seen. Queries seek
+    straight to a height's records instead of rescanning the whole file.
+    Network time is only present on network events, so the "current time" of
+    any other record is the last network time seen before it.
+    """
+    def __init__(self, log_path: Path):
+        self.log_path = Path(log_path)
+        self.heights: Dict[int, HeightSummary] = {}
+        self.offsets: Dict[int, array] = {}
+        self.total_records = 0
+        self.log_size = 0
+
+    # --- build / load ---
+
+    @classmethod
+    def build(cls, log_path, save: bool = True) -> "LogIndex":
+        idx = cls(log_path)
+        cur_height: Optional[int] = None
+        cur_time: Optional[int] = None
+        pos = 0
+        with idx.log_path.open("rb") as f:
+            for line in f:
+                off, pos = pos, pos + len(line)
+                if not line.strip():
+                    continue
+                rec = json.loads(line)
+                idx.total_records += 1
+                t = rec.get("time")
+                if t is not None:
+                    cur_time = t
+                h = rec.get("height")
+                if h is None:
+                    h = cur_height
+                    if h is None:
+                        continue  # record trước height đầu tiên: không gán được
+                else:
+                    cur_height = h
+                idx._add(h, off, rec, cur_time)
+        idx.log_size = pos
+        if save:
+            idx.save()
+        return idx
+
+    def _add(self, h: int, off: int, rec: dict, t: Optional[int]):
+        s = self.heights.get(h)
+        if s is None:
+            s = self.heights[h] = HeightSummary(h)
+            self.offsets[h] = array("Q")
+        self.offsets[h].append(off)
+        s.records += 1
+        if t is not None:
+            if s.first_time is None:
+                s.first_time = t
+            s.last_time = t
+        ev, comp = rec.get("event"), rec.get("component")
+        s.events[ev] += 1
+        s.components[comp] += 1
+        node = _node_of(rec)
+        if node is not None:
+            s.nodes[node] += 1
+        if comp == "network" and ev in LINK_EVENTS:
+            s.links[f"{rec.get('src', '*')}>{rec.get('dst', '*')}"][ev] += 1
+        elif comp == "simulator":
+            if ev == "PROPOSE_BLOCK" and s.propose_time is None:
+                s.propose_time = t if t is not None else 0
+            elif ev == "HEIGHT_FINALIZED":
+                s.finalized_time = t if t is not None else 0
+
+    def save(self):
+        meta_path, bin_path = index_paths(self.log_path)
+        table = {}
+        pos = 0
+        with bin_path.open("wb") as f:
+            for h in sorted(self.offsets):
+                arr = self.offsets[h]
+                arr.tofile(f)
+                table[str(h)] = [pos, len(arr)]
+                pos += len(arr)
+        meta = {
+            "version": INDEX_VERSION,
+            "log_size": self.log_size,
+            "total_records": self.total_records,
+            "offsets": table,
+            "heights": [self.heights[h].to_json() for h in sorted(self.heights)],
+        }
+        meta_path.write_text(json.dumps(meta, sort_keys=True), encoding="utf-8")
+
+    @classmethod
+    def load(cls, log_path) -> Optional["LogIndex"]:
+        """Load the sidecar index; None if missing or stale (log size changed)."""
+        log_path = Path(log_path)
+        meta_path, bin_path = index_paths(log_path)
+        if not meta_path.exists() or not bin_path.exists() or not log_path.exists():
+            return None
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        if meta.get("version") != INDEX_VERSION or meta["log_size"] != log_path.stat().st_size:
+            return None
+        idx = cls(log_path)
+        idx.log_size = meta["log_size"]
+        idx.total_records = meta["total_records"]
+        for d in meta["heights"]:
+            idx.heights[d["height"]] = HeightSummary.from_json(d)
+        all_offsets = array("Q")
+        with bin_path.open("rb") as f:
+            all_offsets.frombytes(f.read())
+        for h, (start, n) in meta["offsets"].items():
+            idx.offsets[int(h)] = all_offsets[start:start + n]
+        return idx
+
+    @classmethod
+    def open(cls, log_path) -> "LogIndex":
+        """Load the sidecar index, rebuilding it if it is missing or stale."""
+        return cls.load(log_path) or cls.build(log_path)
+
+    # --- queries ---
+
+    def records(self, height: int, component: Optional[str] = None,
+                event: Optional[str] = None, node: Optional[str] = None) -> Iterator[dict]:
+        """Records of one height in log order, optionally filtered."""
+        offs = self.offsets.get(height)
+        if offs is None:
+            return
+        with self.log_path.open("rb") as f:
+            for off in offs:
+                f.seek(off)
+                rec = json.loads(f.readline())
+                if component is not None and rec.get("component") != component:
+                    continue
+                if event is not None and rec.get("event") != event:
+                    continue
+                if node is not None and _node_of(rec) != node:
+                    continue
+                yield rec
+
+    def timeline(self, height: int) -> List[dict]:
+        """Network message timeline of a height: (time, event, src, dst, kind, msg_id)."""
+        out = []
+        for rec in self.records(height, component="network"):
+            out.append({k: rec.get(k) for k in ("time", "event", "src", "dst", "kind", "msg_id")})
+        return out
+
+    def link_counts(self, height: Optional[int] = None) -> Dict[Tuple[str, str], Dict[str, int]]:
+        """DROP/DUP/BLOCK/DEFER_BODY… counts per (src, dst); '*' when the event has no src."""
+        total: Dict[str, Counter] = defaultdict(Counter)
+        hs = [self.heights[height]] if height is not None else self.heights.values()
+        for s in hs:
+            for link, c in s.links.items():
+                total[link].update(c)
+        return {tuple(k.split(">", 1)): dict(v) for k, v in sorted(total.items())}
+
+    def vote_order(self, height: int) -> List[Tuple[str, str, str]]:
+        """(node, validator, phase) of votes received, in order, until the first FINALIZE."""
+        out = []
+        for rec in self.records(height):
+            ev = rec.get("event")
+            if rec.get("component") == "consensus" and ev == "FINALIZE":
+                break
+            if ev in VOTE_EVENTS:
+                out.append((rec.get("node_id"), rec.get("validator"), rec.get("phase")))
+        return out
+
+    def slowest(self, n: int = 10) -> List[Tuple[int, int]]:
+        """(height, duration in ticks) of the n slowest finalized heights."""
+        done = [(s.height, s.duration) for s in self.heights.values() if s.duration is not None]
+        done.sort(key=lambda x: (-x[1], x[0]))
+        return done[:n]
+
+    def counts(self, by: str = "events", height: Optional[int] = None) -> Dict[str, int]:
+        """Counts by 'events', 'components' or 'nodes', for one height or the whole log."""
+        total: Counter = Counter()
+        hs = [self.heights[height]] if height is not None else self.heights.values()
+        for s in hs:
+            total.update(getattr(s, by))
+        return dict(total)
+
+    # --- export ---
+
+    def columns(self) -> Dict[str, list]:
+        """Per-height summary as columns (one list per field), ready for plotting."""
+        cols: Dict[str, list] = {k: [] for k in (
+            "height", "records", "propose_time", "finalized_time", "duration",
+            "sends", "delivers", "drops", "dups", "blocks", "defers", "votes")}
+        for h in sorted(self.heights):
+            s = self.heights[h]
+            ev = s.events
+            cols["height"].append(h)
+            cols["records"].append(s.records)
+            cols["propose_time"].append(s.propose_time)
+            cols["finalized_time"].append(s.finalized_time)
+            cols["duration"].append(s.duration)
+            cols["sends"].append(ev.get("SEND", 0))
+            cols["delivers"].append(ev.get("DELIVER", 0))
+            cols["drops"].append(ev.get("DROP", 0))
+            cols["dups"].append(ev.get("DUP", 0))
+            cols["blocks"].append(ev.get("BLOCK", 0) + ev.get("BLOCK_DROP", 0))
+            cols["defers"].append(ev.get("DEFER_BODY", 0))
+            cols["votes"].append(ev.get("RECEIVE_VOTE", 0))
+        return cols
+
+    def export_csv(self, path) -> Path:
+        path = Path(path)
+        cols = self.columns()
+        names = list(cols)
+        with path.open("w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(names)
+            w.writerows(zip(*(cols[k] for k in names)))
+        return path
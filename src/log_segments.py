@@ -0,0 +1,213 @@
+import gzip
+import json
+import lzma
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+MANIFEST = "manifest.json"
+MANIFEST_VERSION = 1
+
+# compress -> (đuôi file, hàm open)
+CODECS = {
+    "gzip": (".gz", gzip.open),
+    "lzma": (".xz", lzma.open),
+}
+
+
+def run_dir_for(base, run_id: str, seed: int) -> Path:
+    """Thư mục riêng của 1 run: <base>/<run_id>-seed<seed>."""
+    return Path(base) / f"{run_id}-seed{seed}"
+
+
+def new_run_id() -> str:
+    # Chỉ dùng làm tên thư mục, không đi vào nội dung log (determinism không đổi)
+    return time.strftime("%Y%m%d-%H%M%S") + f"-{os.getpid()}"
+
+
+class SegmentWriter:
+    """Log writer that splits a run into bounded segments under its own directory.
+
+    A segment is closed once it holds max_bytes of log lines, or once
+    max_heights heights have ended in it (end_height is called from
+    digest_checkpoint, so heights are the simulator's own). Closed segments
+    are compressed (gzip / lzma) on one background thread while the run goes
+    on; the raw file is removed only after the compressed one is complete.
+
+    manifest.json lists the segments in order with their record / byte counts
+    and height span, and is rewritten atomically after every change, so a
+    reader (iter_log_lines) always sees a consistent list, even mid-run.
+    Lines are written exactly as given, so the concatenation of the segments
+    is byte-identical to what runs.log would hold.
+    """
+    def __init__(self, run_dir, run_id: str = "", seed: Optional[int] = None,
+                 max_bytes: int = 64 << 20, max_heights: Optional[int] = None,
+                 compress: Optional[str] = "gzip"):
+        if compress is not None and compress not in CODECS:
+            raise ValueError(f"unknown compression {compress!r}")
+        self.dir = Path(run_dir)
+        self.dir.mkdir(parents=True, exist_ok=False)  # 2 run không ghi chung 1 thư mục
+        self.max_bytes = max_bytes
+        self.max_heights = max_heights
+        self.compress = compress
+        self.meta = {"version": MANIFEST_VERSION, "run_id": run_id, "seed": seed,
+                     "compress": compress, "closed": False, "segments": []}
+        self._lock = threading.Lock()  # bảo vệ meta (thread nén cũng sửa)
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="log-archive") if compress else None
+        self._pending = []
+        self._f = None
+        self._seg: Optional[dict] = None
+        self._heights = 0
+        self._open_segment()
+
+    @classmethod
+    def for_run(cls, base, run_id: Optional[str] = None, seed: int = 0, **kw) -> "SegmentWriter":
+        run_id = run_id or new_run_id()
+        return cls(run_dir_for(base, run_id, seed), run_id=run_id, seed=seed, **kw)
+
+    # --- ghi ---
+
+    def _open_segment(self):
+        i = len(self.meta["segments"])
+        name = f"seg-{i:05d}.log"
+        self._f = (self.dir / name).open("w", encoding="utf-8")
+        # first/last_height: các height kết thúc trong segment (None nếu chưa có)
+        self._seg = {"name": name, "file": name, "records": 0, "bytes": 0,
+                     "first_height": None, "last_height": None}
+        self._heights = 0
+        with self._lock:
+            self.meta["segments"].append(self._seg)
+            self._save_manifest()
+
+    def write_lines(self, lines: List[str]):
+        self._f.writelines(lines)
+        seg = self._seg
+        seg["records"] += len(lines)
+        seg["bytes"] += sum(len(l) for l in lines)
+        if seg["bytes"] >= self.max_bytes:
+            self._rotate()
+
+    def end_height(self, height: int):
+        seg = self._seg
+        if seg["first_height"] is None:
+            seg["first_height"] = height
+        seg["last_height"] = height
+        self._heights += 1
+        if self.max_heights is not None and self._heights >= self.max_heights:
+            self._rotate()
+
+    def _rotate(self):
+        self._finish_segment()
+        self._open_segment()
+
+    def _finish_segment(self):
+        self._f.close()
+        seg = self._seg
+        if seg["records"] == 0:  # segment rỗng: bỏ luôn
+            (self.dir / seg["file"]).unlink()
+            with self._lock:
+                self.meta["segments"].remove(seg)
+                self._save_manifest()
+            return
+        with self._lock:
+            self._save_manifest()
+        if self._pool is not None:
+            self._pending.append(self._pool.submit(self._archive, seg))
+
+    # --- nén nền ---
+
+    def _archive(self, seg: dict):
+        ext, opener = CODECS[self.compress]
+        raw = self.dir / seg["file"]
+        dst = raw.with_name(raw.name + ext)
+        tmp = dst.with_name(dst.name + ".tmp")
+        with raw.open("rb") as src, opener(tmp, "wb") as out:
+            while True:
+                chunk = src.read(1 << 20)
+                if not chunk:
+                    break
+                out.write(chunk)
+        tmp.replace(dst)
+        with self._lock:
+            seg["file"] = dst.name
+            self._save_manifest()
+        raw.unlink()
+
+    def _save_manifest(self):
+        path = self.dir / MANIFEST
+        tmp = path.with_name(MANIFEST + ".tmp")
+        tmp.write_text(json.dumps(self.meta, indent=1), encoding="utf-8")
+        tmp.replace(path)
+
+    def close(self):
+        """Close the last segment, wait for archiving, mark the manifest closed."""
+        if self._f is None:
+            return
+        self._finish_segment()
+        self._f = None
+        for fut in self._pending:
+            fut.result()
+        self._pending.clear()
+        if self._pool is not None:
+            self._pool.shutdown()
+        with self._lock:
+            self.meta["closed"] = True
+            self._save_manifest()
+
+
+def read_manifest(run_dir) -> dict:
+    return json.loads((Path(run_dir) / MANIFEST).read_text(encoding="utf-8"))
+
+
+def _open_text(path: Path):
+    for ext, opener in CODECS.values():
+        if path.name.endswith(ext):
+            return opener(path, "rt", encoding="utf-8", newline="")
+    return path.open("r", encoding="utf-8", newline="")
+
+
+def iter_log_lines(path) -> Iterator[str]:
+    """Stream log lines from runs.log, a .gz/.xz file or a segmented run directory.
+
+    Segments are read one at a time in manifest order, decompressing on the
+    fly; lines keep their trailing newline, so the stream is byte-identical
+    to the single-file log.
+    """
+    path = Path(path)
+    if not path.is_dir():
+        with _open_text(path) as f:
+            yield from f
+        return
+    for seg in read_manifest(path)["segments"]:
+        with _open_text(_segment_path(path, seg)) as f:
+            yield from f
+
+
+def _segment_path(run_dir: Path, seg: dict) -> Path:
+    p = run_dir / seg["file"]
+    if p.exists():
+        return p
+    # manifest đọc trước khi thread nén xong: bản nén đã thay file gốc
+    for ext, _ in CODECS.values():
+        q = run_dir / (seg["name"] + ext)
+        if q.exists():
+            return q
+    raise FileNotFoundError(p)
+
+
+@contextmanager
+def segmented_log(base="logs", run_id: Optional[str] = None, seed: int = 0, **kw):
+    """Install a SegmentWriter as the log destination for the with block."""
+    from .logger import set_log_writer
+
+    writer = SegmentWriter.for_run(base, run_id, seed, **kw)
+    prev = set_log_writer(writer)
+    try:
+        yield writer
+    finally:
+        set_log_writer(prev)
+        writer.close()
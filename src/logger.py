@@ -1,7 +1,11 @@
 # logger.py
+import hashlib
 import json
+import multiprocessing
+from contextlib import contextmanager
 from pathlib import Path
 from threading import Lock
+from typing import Callable, Iterable, List, Optional, Tuple
 
 # Đường dẫn file log (đổi lại nếu project bạn đang dùng tên khác)
 LOG_DIR = Path("logs")
@@ -16,13 +20,161 @@ LOG_DIR.mkdir(parents=True, exist_ok=True)
 
 # Truncate file (xóa nội dung cũ, tạo file rỗng)
 # Mỗi process mới (mỗi lần bạn chạy pytest) sẽ thực hiện đoạn này đúng 1 lần.
-LOG_FILE.write_text("", encoding="utf-8")
+# Process con (worker của multiprocessing) không được xóa log của process cha.
+if multiprocessing.parent_process() is None:
+    LOG_FILE.write_text("", encoding="utf-8")
+
+
+class RunDigest:
+    """Rolling SHA-256 over every emitted log line, with per-height checkpoints.
+
+    The digest covers the exact bytes written to runs.log, so two runs are
+    byte-identical iff their final digests match. A checkpoint is
+    (height, record_count, digest_of_prefix); because each checkpoint hashes
+    a prefix of the log, once two runs diverge every later checkpoint differs
+    too, which is what makes bisection over checkpoints valid.
+    """
+    def __init__(self):
+        self._h = hashlib.sha256()
+        self.records = 0
+        self.checkpoints: List[Tuple[int, int, str]] = []
+
+    def update(self, line: bytes):
+        self._h.update(line)
+        self.records += 1
+
+    def hexdigest(self) -> str:
+        return self._h.hexdigest()
+
+    def checkpoint(self, height: int) -> Tuple[int, int, str]:
+        cp = (height, self.records, self._h.copy().hexdigest())
+        self.checkpoints.append(cp)
+        return cp
+
+
+_digest: Optional[RunDigest] = None
+# Nếu set, log_event chuyển dòng log cho sink thay vì ghi file (worker process)
+_sink: Optional[Callable[[str], None]] = None
+# Nếu set, dòng log ghi vào writer (vd. SegmentWriter của src/log_segments.py) thay vì runs.log
+_writer = None
 
 # --- Hàm ghi log dùng chung cho toàn bộ project ---
 
 def log_event(**rec):
     """Ghi một event (một dict) ra file logs/runs.log dạng JSON mỗi dòng."""
+    line = json.dumps(rec, sort_keys=True) + "\n"
+    if _sink is not None:
+        _sink(line)
+        return
+    with _log_lock:
+        if _writer is not None:
+            _writer.write_lines((line,))
+        else:
+            with LOG_FILE.open("a", encoding="utf-8") as f:
+                f.write(line)
+        if _digest is not None:
+            _digest.update(line.encode("utf-8"))
+
+
+def log_lines(lines: Iterable[str]):
+    """Ghi các dòng log đã serialize sẵn (vd. do worker gửi về) theo đúng thứ tự."""
+    lines = list(lines)
+    if not lines:
+        return
+    with _log_lock:
+        if _writer is not None:
+            _writer.write_lines(lines)
+        else:
+            with LOG_FILE.open("a", encoding="utf-8") as f:
+                f.writelines(lines)
+        if _digest is not None:
+            for line in lines:
+                _digest.update(line.encode("utf-8"))
+
+
+@contextmanager
+def capture_lines():
+    """Gom các dòng log phát sinh trong khối with vào 1 list thay vì ghi ra.
+
+    Dùng để cache kết quả kèm log của nó (vd. ExecutionCache); sau đó gọi
+    emit_lines để ghi chúng ra như bình thường.
+    """
+    global _sink
+    prev, lines = _sink, []
+    _sink = lines.append
+    try:
+        yield lines
+    finally:
+        _sink = prev
+
+
+def emit_lines(lines: Iterable[str]):
+    """Ghi các dòng đã serialize qua đúng đường log hiện tại (sink hoặc file)."""
+    if _sink is not None:
+        for line in lines:
+            _sink(line)
+    else:
+        log_lines(lines)
+
+
+def set_log_sink(sink: Optional[Callable[[str], None]]):
+    """Chuyển hướng log_event sang sink (None để ghi file như bình thường)."""
+    global _sink
+    _sink = sink
+
+
+def set_log_writer(writer):
+    """Ghi log qua writer (có write_lines/end_height) thay vì runs.log; trả về writer cũ."""
+    global _writer
     with _log_lock:
-        with LOG_FILE.open("a", encoding="utf-8") as f:
-            json.dump(rec, f, sort_keys=True)
-            f.write("\n")
+        prev, _writer = _writer, writer
+    return prev
+
+
+def start_digest() -> RunDigest:
+    """Bật chế độ determinism digest; trả về RunDigest mới (reset trạng thái cũ)."""
+    global _digest
+    with _log_lock:
+        _digest = RunDigest()
+    return _digest
+
+
+def stop_digest() -> Optional[RunDigest]:
+    """Tắt digest mode, trả về digest đã thu thập (hoặc None nếu chưa bật)."""
+    global _digest
+    with _log_lock:
+        d, _digest = _digest, None
+    return d
+
+
+def digest_checkpoint(height: int) -> Optional[Tuple[int, int, str]]:
+    """Ghi checkpoint cho height vừa xong; no-op nếu digest mode đang tắt.
+
+    Cũng báo cho log writer (nếu có) để cắt segment theo height.
+    """
+    with _log_lock:
+        if _writer is not None:
+            _writer.end_height(height)
+        if _digest is None:
+            return None
+        return _digest.checkpoint(height)
+
+
+def first_divergence(cps_a: List[Tuple[int, int, str]],
+                     cps_b: List[Tuple[int, int, str]]) -> Optional[int]:
+    """Binary search for the index of the first differing checkpoint.
+
+    Returns None when every common checkpoint matches and both lists have
+    the same length (i.e. the runs are identical at checkpoint granularity).
+    """
+    n = min(len(cps_a), len(cps_b))
+    lo, hi = 0, n
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if cps_a[mid] == cps_b[mid]:
+            lo = mid + 1
+        else:
+            hi = mid
+    if lo == n and len(cps_a) == len(cps_b):
+        return None
+    return lo
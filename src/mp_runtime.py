@@ -0,0 +1,218 @@
+import multiprocessing
+import pickle
+from typing import Dict, List, Optional
+
+from .consensus import proposer_for
+from .crypto import derive_keypair, KeyPair
+from .network import UnreliableNetwork, Message
+from .exec_cache import ExecStore
+from .shm_ring import ShmRing
+from .types import Transaction
+from .logger import log_event, log_lines, set_log_sink, digest_checkpoint
+
+RING_BYTES = 8 << 20
+
+
+class _RecordingNetwork:
+    """Stand-in network inside a worker: records sends for the coordinator to replay."""
+    def __init__(self, out: list):
+        self.out = out
+
+    def send(self, src, dst, msg: Message):
+        self.out.append(("send", src, dst, msg))
+
+    def broadcast(self, src, msg: Message):
+        self.out.append(("bcast", src, msg))
+
+
+def _worker_main(n_nodes: int, seed: int, sim_kwargs: dict, keypairs: Dict[str, KeyPair],
+                 local_ids: List[str], cmd_ring: ShmRing, res_ring: ShmRing):
+    from .simulator import Simulator  # tránh import vòng khi module được nạp
+
+    # Mọi output (log, send, finalize) giữ đúng thứ tự phát sinh để coordinator replay
+    out: list = []
+    set_log_sink(lambda line: out.append(("log", line)))
+    sim = Simulator(n_nodes, seed, keypairs=keypairs, local_ids=local_ids, **sim_kwargs)
+    sim.network = _RecordingNetwork(out)
+    for node in sim.nodes.values():
+        node.finalize_cb = lambda nid, h, bh: out.append(("fin", nid, h, bh))
+
+    while True:
+        cmd = pickle.loads(cmd_ring.pop())
+        op = cmd[0]
+        if op == "stop":
+            break
+        if op == "deliver":
+            sim.handle_message(cmd[1], cmd[2])
+        elif op == "propose":
+            sim.height, sim.parent_hash = cmd[1], cmd[2]
+            sim.propose()
+        elif op == "submit_tx":
+            sim.height = cmd[4]
+            sim.submit_tx(cmd[1], origin=cmd[2], gossip=cmd[3])
+        elif op == "ledgers":
+            out.append(("ledgers", {nid: list(node.ledger) for nid, node in sim.nodes.items()}))
+        elif op == "exec_stats":
+            out.append(("exec_stats", sim.exec_cache.stats() if sim.exec_cache else {}))
+        res_ring.push(pickle.dumps(out, protocol=pickle.HIGHEST_PROTOCOL))
+        out.clear()
+
+
+class MultiProcessRuntime:
+    """Run the Simulator's nodes in worker processes, coordinated over shared-memory rings.
+
+    Nodes are split into contiguous groups, one group per OS process. The
+    coordinator owns the UnreliableNetwork (logical time plus the seeded
+    drop/delay/rate-limit decisions). A delivered message is fanned out to
+    every worker hosting a recipient at once, so signature checks and state
+    execution run on all cores. The workers' outputs (log lines, sends,
+    finalizations) are then replayed in node order. With the fork start
+    method this gives the same runs.log as the single-process Simulator for
+    the same seed.
+    """
+    def __init__(self, n_nodes: int, seed: int, workers: int = 2,
+                 ring_bytes: int = RING_BYTES, shared_exec_cache: bool = False, **sim_kwargs):
+        methods = multiprocessing.get_all_start_methods()
+        self.ctx = multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+        # shared_exec_cache: các worker dùng chung 1 ExecStore (Manager process), nên block
+        # đã execute ở 1 worker là lookup ở worker khác
+        self.manager = None
+        self.exec_store: Optional[ExecStore] = None
+        if shared_exec_cache:
+            self.manager = self.ctx.Manager()
+            self.exec_store = ExecStore(self.manager, sim_kwargs.get("exec_cache_size", 256))
+            sim_kwargs = dict(sim_kwargs, exec_cache_store=self.exec_store)
+        self.seed = seed
+        self.node_ids = [f"N{i}" for i in range(n_nodes)]
+        self.network = UnreliableNetwork(self.node_ids, seed, model=sim_kwargs.get("link_model"))
+        self.keypairs = {nid: derive_keypair(seed, nid) for nid in self.node_ids}
+
+        workers = max(1, min(workers, n_nodes))
+        per = -(-n_nodes // workers)
+        self.groups = [self.node_ids[i:i + per] for i in range(0, n_nodes, per)]
+        self.owner = {nid: w for w, group in enumerate(self.groups) for nid in group}
+
+        self.cmd_rings = [ShmRing(ring_bytes, self.ctx) for _ in self.groups]
+        self.res_rings = [ShmRing(ring_bytes, self.ctx) for _ in self.groups]
+        self.procs = []
+        for w, group in enumerate(self.groups):
+            p = self.ctx.Process(
+                target=_worker_main,
+                args=(n_nodes, seed, sim_kwargs, self.keypairs, group,
+                      self.cmd_rings[w], self.res_rings[w]),
+                daemon=True,
+            )
+            p.start()
+            self.procs.append(p)
+
+        self.height = 1
+        self.parent_hash = "GENESIS"
+        self.pending_finalize: Dict[int, int] = {}
+        # Hash đã finalize của node mẫu (N0), giống Simulator.end_height
+        self.sample_finalized: Dict[int, str] = {}
+
+    # --- worker I/O ---
+
+    def _call(self, targets: List[int], cmd: tuple):
+        payload = pickle.dumps(cmd, protocol=pickle.HIGHEST_PROTOCOL)
+        # Gửi cho tất cả worker trước, để chúng chạy song song...
+        for w in targets:
+            self.cmd_rings[w].push(payload)
+        # ...rồi replay output theo thứ tự worker (= thứ tự node)
+        for w in targets:
+            self._replay(pickle.loads(self.res_rings[w].pop()))
+
+    def _replay(self, items: list):
+        logs = []
+        for item in items:
+            kind = item[0]
+            if kind == "log":
+                logs.append(item[1])
+                continue
+            log_lines(logs)
+            logs = []
+            if kind == "send":
+                self.network.send(item[1], item[2], item[3])
+            elif kind == "bcast":
+                self.network.broadcast(item[1], item[2])
+            elif kind == "fin":
+                _, nid, h, bh = item
+                if h in self.pending_finalize:
+                    self.pending_finalize[h] -= 1
+                if nid == self.node_ids[0]:
+                    self.sample_finalized[h] = bh
+            elif kind == "ledgers":
+                self._ledgers.update(item[1])
+            elif kind == "exec_stats":
+                self._exec_stats.append(item[1])
+        log_lines(logs)
+
+    def handle_message(self, msg: Message, dst: str = None):
+        if msg.kind in ("BLOCK", "VOTE"):
+            self._call(list(range(len(self.groups))), ("deliver", msg, dst))
+        else:
+            self._call([self.owner[dst]], ("deliver", msg, dst))
+
+    # --- Simulator-compatible driver ---
+
+    def submit_tx(self, tx: Transaction, origin: Optional[str] = None, gossip: bool = True):
+        if origin is None:
+            origin = tx.sender if tx.sender in self.owner else self.node_ids[0]
+        self._call([self.owner[origin]], ("submit_tx", tx, origin, gossip, self.height))
+
+    def run_until(self, target_height: int):
+        while self.height <= target_height:
+            self.pending_finalize[self.height] = len(self.node_ids)
+            proposer = proposer_for(self.height, self.node_ids)
+            self._call([self.owner[proposer]], ("propose", self.height, self.parent_hash))
+
+            while True:
+                self.network.step(self.handle_message)
+                if self.pending_finalize[self.height] == 0:
+                    break
+                if self.network.idle():
+                    break
+
+            block_hash = self.sample_finalized.get(self.height)
+            if block_hash:
+                self.parent_hash = block_hash
+                log_event(
+                    component="simulator",
+                    event="HEIGHT_FINALIZED",
+                    height=self.height,
+                    block_hash=block_hash,
+                )
+            digest_checkpoint(self.height)
+            del self.pending_finalize[self.height]
+            self.height += 1
+
+    def ledgers(self) -> Dict[str, list]:
+        self._ledgers: Dict[str, list] = {}
+        self._call(list(range(len(self.groups))), ("ledgers",))
+        return self._ledgers
+
+    def exec_cache_stats(self) -> List[dict]:
+        """ExecutionCache.stats() of every worker, in worker order."""
+        self._exec_stats: List[dict] = []
+        self._call(list(range(len(self.groups))), ("exec_stats",))
+        return self._exec_stats
+
+    def close(self):
+        payload = pickle.dumps(("stop",))
+        for w, p in enumerate(self.procs):
+            if p.is_alive():
+                self.cmd_rings[w].push(payload)
+        for p in self.procs:
+            p.join(timeout=5)
+        for ring in self.cmd_rings + self.res_rings:
+            ring.close()
+        self.procs = []
+        if self.manager is not None:
+            self.manager.shutdown()
+            self.manager = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,215 @@
+from bisect import bisect_right
+from collections import ChainMap
+from collections.abc import Mapping
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .crypto import state_hash
+from .state import State
+
+GENESIS_HEIGHT = 0
+
+
+class VersionedStore:
+    """Multi-height (MVCC) key-value store: per-key version chains tagged by height.
+
+    Each key keeps two parallel lists, heights (strictly increasing) and
+    values, so get(key, at_height) is one bisect, O(log versions). Heights
+    are committed in order with commit_height(); height 0 is the empty
+    genesis state. Tx ids map to the height that executed them, which gives
+    replay protection at any height. With retention=R, versions that no
+    snapshot at or above tip - R can see are pruned on commit.
+    """
+    def __init__(self, retention: Optional[int] = None):
+        if retention is not None and retention < 0:
+            raise ValueError("retention must be >= 0")
+        self.retention = retention
+        self.tip = GENESIS_HEIGHT
+        self.oldest = GENESIS_HEIGHT  # snapshot thấp nhất còn trả lời được
+        self._heights: Dict[str, List[int]] = {}
+        self._values: Dict[str, List[str]] = {}
+        self._multi: set = set()  # key có > 1 version (ứng viên prune)
+        self.executed_at: Dict[str, int] = {}
+        self.executed_count: Dict[int, int] = {GENESIS_HEIGHT: 0}  # số tx đã execute tính tới height
+        self.commits: Dict[int, str] = {GENESIS_HEIGHT: state_hash({})}
+
+    # --- ghi ---
+
+    def commit_height(self, height: int, writes: Dict[str, str], executed: Iterable[str] = (),
+                      commit: Optional[str] = None):
+        """Record the writes and executed tx ids of one height (> tip).
+
+        Skipped heights (a node that never finalized them) read as unchanged.
+
+        commit: the height's state commitment if already known (vd. from the
+        ledger entry); otherwise it is computed lazily by snapshot().commit_hash().
+        """
+        if height <= self.tip:
+            raise ValueError(f"height {height} already committed (tip {self.tip})")
+        for k, v in writes.items():
+            hs = self._heights.get(k)
+            if hs is None:
+                self._heights[k] = [height]
+                self._values[k] = [v]
+            else:
+                hs.append(height)
+                self._values[k].append(v)
+                self._multi.add(k)
+        for tx_id in executed:
+            self.executed_at.setdefault(tx_id, height)
+        for h in range(self.tip + 1, height):
+            self.executed_count[h] = self.executed_count[self.tip]
+            if self.tip in self.commits:
+                self.commits[h] = self.commits[self.tip]
+        self.executed_count[height] = len(self.executed_at)
+        if commit is not None:
+            self.commits[height] = commit
+        self.tip = height
+        if self.retention is not None and self.tip - self.retention > self.oldest:
+            self.prune(self.tip - self.retention)
+
+    def prune(self, keep_from: int):
+        """Drop versions no snapshot at height >= keep_from can observe."""
+        keep_from = min(keep_from, self.tip)
+        if keep_from <= self.oldest:
+            return
+        for k in list(self._multi):
+            hs = self._heights[k]
+            # Giữ version cuối cùng <= keep_from (giá trị nhìn thấy ở keep_from) và mọi version sau đó
+            i = bisect_right(hs, keep_from) - 1
+            if i > 0:
+                del hs[:i]
+                del self._values[k][:i]
+            if len(hs) == 1:
+                self._multi.discard(k)
+        for table in (self.commits, self.executed_count):
+            for h in [h for h in table if h < keep_from]:
+                del table[h]
+        self.oldest = keep_from
+
+    # --- đọc ---
+
+    def _check(self, height: int):
+        if height < self.oldest or height > self.tip:
+            raise KeyError(f"height {height} outside retained range [{self.oldest}, {self.tip}]")
+
+    def get(self, key: str, at_height: Optional[int] = None, default=None):
+        """Value of key right after block at_height (default: tip); O(log versions)."""
+        h = self.tip if at_height is None else at_height
+        self._check(h)
+        hs = self._heights.get(key)
+        if hs is None:
+            return default
+        i = bisect_right(hs, h) - 1
+        return self._values[key][i] if i >= 0 else default
+
+    def history(self, key: str) -> List[Tuple[int, str]]:
+        """Retained (height, value) versions of key, oldest first."""
+        return list(zip(self._heights.get(key, ()), self._values.get(key, ())))
+
+    def snapshot(self, height: Optional[int] = None) -> "StateView":
+        h = self.tip if height is None else height
+        self._check(h)
+        return StateView(self, h)
+
+
+class _KVView(Mapping):
+    """Read-only Mapping of the store as of one height (no copy)."""
+    __slots__ = ("store", "height")
+
+    def __init__(self, store: VersionedStore, height: int):
+        self.store = store
+        self.height = height
+
+    def __getitem__(self, key: str) -> str:
+        v = self.store.get(key, self.height)
+        if v is None:
+            raise KeyError(key)
+        return v
+
+    def __contains__(self, key) -> bool:
+        return self.store.get(key, self.height) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        h = self.height
+        for k, hs in self.store._heights.items():
+            if hs[0] <= h:
+                yield k
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+class _ExecutedView:
+    """Set-like view: tx ids executed at or before height."""
+    __slots__ = ("store", "height")
+
+    def __init__(self, store: VersionedStore, height: int):
+        self.store = store
+        self.height = height
+
+    def __contains__(self, tx_id) -> bool:
+        h = self.store.executed_at.get(tx_id)
+        return h is not None and h <= self.height
+
+    def __iter__(self) -> Iterator[str]:
+        h = self.height
+        return (t for t, th in self.store.executed_at.items() if th <= h)
+
+    def __len__(self) -> int:
+        return self.store.executed_count[self.height]
+
+
+class _OverlaySet:
+    """Writable set on top of a read-only base (executed txs of a child state)."""
+    __slots__ = ("base", "own")
+
+    def __init__(self, base):
+        self.base = base
+        self.own = set()
+
+    def __contains__(self, x) -> bool:
+        return x in self.own or x in self.base
+
+    def add(self, x):
+        self.own.add(x)
+
+    def update(self, xs):
+        self.own.update(xs)
+
+    def __iter__(self):
+        yield from self.base
+        yield from (x for x in self.own if x not in self.base)
+
+    def __len__(self) -> int:
+        return len(self.base) + sum(1 for x in self.own if x not in self.base)
+
+
+class StateView:
+    """Read-only state as of one height; a parent_state for execute/verify without copying.
+
+    child() returns a State whose kv/executed_txs are overlays on this view,
+    so executing a block on a historical (or forked) parent only allocates
+    the block's own writes.
+    """
+    __slots__ = ("store", "height", "kv", "executed_txs")
+
+    def __init__(self, store: VersionedStore, height: int):
+        self.store = store
+        self.height = height
+        self.kv = _KVView(store, height)
+        self.executed_txs = _ExecutedView(store, height)
+
+    def get(self, key: str) -> str:
+        return self.store.get(key, self.height, "")
+
+    def commit_hash(self) -> str:
+        c = self.store.commits.get(self.height)
+        if c is None:
+            c = self.store.commits[self.height] = state_hash(dict(self.kv))
+        return c
+
+    def child(self) -> State:
+        st = State()
+        st.kv = ChainMap({}, self.kv)
+        st.executed_txs = _OverlaySet(self.executed_txs)
+        return st
@@ -1,10 +1,13 @@
 import random, heapq, json
+from array import array
 from typing import List, Dict, Tuple, Any
 from collections import defaultdict
 import copy
 from .logger import log_event
 
 class Message:
+    __slots__ = ("msg_id", "kind", "height", "body")
+
     def __init__(self, msg_id, kind, height, body):
         self.msg_id = msg_id
         self.kind = kind
@@ -12,25 +15,27 @@ class Message:
         self.body = body  
 
 class NetworkEvent:
-    def __init__(self, t, src, dst, msg: Message):
+    """One scheduled delivery.
+
+    Events live in the heap as (t, seq, ev) tuples; seq is unique, so
+    ordering is decided by C-level int comparisons and ev itself is never
+    compared. deadline is only set for deferred BODY messages.
+    """
+    __slots__ = ("t", "src", "dst", "msg", "deadline")
+
+    def __init__(self, t, src, dst, msg: Message, deadline=None):
         self.t = t
         self.src = src
         self.dst = dst
         self.msg = msg
-    
-    def __lt__(self, other):
-        """Enable comparison for heapq - compare by time, then by src/dst for determinism"""
-        if self.t != other.t:
-            return self.t < other.t
-        # Secondary comparison for determinism when times are equal
-        return (self.src, self.dst) < (other.src, other.dst)
+        self.deadline = deadline
 
 class UnreliableNetwork:
     def __init__(self, nodes: List[str], seed: int,
                  drop_prob=0.05, dup_prob=0.05,
                  delay_min=0, delay_max=5,
                  rate_per_sec=50, bucket_cap=20,
-                 block_duration=10):
+                 block_duration=10, model=None):
 
         self.nodes = nodes
         self.rng = random.Random(seed)
@@ -38,42 +43,71 @@ class UnreliableNetwork:
         self.dup_prob = dup_prob
         self.delay_min = delay_min
         self.delay_max = delay_max
+        # model (LinkModel): drop/delay/dup theo từng link (latency matrix, bandwidth,
+        # jitter lognormal/Pareto) thay cho drop_prob/delay_min..max dùng chung; None = mô hình cũ
+        self.model = model
+        if model is not None and model.nodes != list(nodes):
+            raise ValueError("link model was built for a different node list")
 
         self.time = 0
         self.seq = 0
         self.pq = []  # (t, seq, ev)
 
-        # header-before-body
-        self.accepted_headers = defaultdict(set)
+        # header-before-body: dst -> {block_hash: height} (height để prune_below)
+        self.accepted_headers = defaultdict(dict)
+        self.pruned_below = 0
 
-        # rate limiting
+        # Per-link state lives in flat N×N arrays indexed by link = src_idx * N + dst_idx
+        self.index: Dict[str, int] = {n: i for i, n in enumerate(nodes)}
+        n_links = len(nodes) * len(nodes)
+
+        # rate limiting (token bucket, refilled lazily per link on send)
         self.rate = rate_per_sec
         self.capacity = bucket_cap
-        self.tokens = {(src, dst): self.capacity
-                       for src in nodes for dst in nodes if src != dst}
-        self.last_refill = 0
+        self.tokens = array('d', [self.capacity]) * n_links
+        self.last_refill = array('q', [0]) * n_links
 
         # temporary block for overactive peers
         self.block_duration = block_duration
-        self.blocked_links: Dict[Tuple[str, str], int] = {}  # (src,dst) -> unblock_time
+        self.blocked_until = array('q', [0]) * n_links  # link -> unblock_time (0 = not blocked)
+        self._blocked: Dict[int, int] = {}  # currently blocked links, in blocking order
+
+        # NEW: track last height per link (-1 = chưa có)
+        self.last_height = array('q', [-1]) * n_links
 
-        # NEW: track last height per link
-        self.last_height: Dict[Tuple[str,str], int] = {}
+        # Fault injection (src/scenario.py): số fault đang cắt mỗi link (partition/crash),
+        # drop/delay cộng thêm của link bị degrade. faults = số link đang bị ảnh hưởng;
+        # 0 → send/deliver không kiểm tra gì thêm. RNG riêng để không lệch stream chính.
+        self.cut = bytearray(n_links)
+        self.extra_drop = array('d', [0.0]) * n_links
+        self.extra_delay = array('q', [0]) * n_links
+        self.faults = 0
+        self.fault_rng = random.Random(f"faults:{seed}")
+        self.sent = 0
+        self.fault_drops = 0
 
         # deterministic log
         self.log: List[str] = []
 
+    def link_id(self, src: str, dst: str) -> int:
+        return self.index[src] * len(self.nodes) + self.index[dst]
+
+    @property
+    def blocked_links(self) -> Dict[Tuple[str, str], int]:
+        """(src, dst) -> unblock_time view of the currently blocked links."""
+        n = len(self.nodes)
+        return {(self.nodes[k // n], self.nodes[k % n]): t for k, t in self._blocked.items()}
+
 #    def log_event(self, **rec):
 #       rec["time"] = self.time
 #      self.log.append(json.dumps(rec, sort_keys=True))
 
-    def _refill_tokens(self):
-        delta = self.time - self.last_refill
+    def _refill_tokens(self, link: int):
+        delta = self.time - self.last_refill[link]
         if delta > 0:
-            for k in self.tokens:
-                self.tokens[k] = min(self.capacity,
-                                     self.tokens[k] + delta * (self.rate/1000))
-            self.last_refill = self.time
+            self.tokens[link] = min(self.capacity,
+                                    self.tokens[link] + delta * (self.rate/1000))
+            self.last_refill[link] = self.time
 
     def broadcast(self, src: str, msg: Message):
         for dst in self.nodes:
@@ -81,11 +115,17 @@ class UnreliableNetwork:
             self.send(src, dst, msg)
 
     def send(self, src, dst, msg: Message):
+        link = self.index[src] * len(self.nodes) + self.index[dst]
         # record last height
-        self.last_height[(src, dst)] = msg.height
+        self.last_height[link] = msg.height
+        self.sent += 1
+
+        if self.faults and self.cut[link]:
+            self._fault_drop(src, dst, msg, "cut")
+            return
 
         # check if blocked
-        unblock_time = self.blocked_links.get((src, dst), 0)
+        unblock_time = self.blocked_until[link]
         if self.time < unblock_time:
             log_event(
                 component="network",
@@ -100,11 +140,10 @@ class UnreliableNetwork:
             return
 
         # rate limit
-        self._refill_tokens()
-        key = (src, dst)
-        if self.tokens[key] < 1:
+        self._refill_tokens(link)
+        if self.tokens[link] < 1:
             # block temporaily
-            self.blocked_links[(src, dst)] = self.time + self.block_duration
+            self.blocked_until[link] = self._blocked[link] = self.time + self.block_duration
             log_event(
                 component="network",
                 event="BLOCK",
@@ -116,10 +155,15 @@ class UnreliableNetwork:
                 height=msg.height,
             )
             return
-        self.tokens[key] -= 1
+        self.tokens[link] -= 1
+
+        if self.model is not None:
+            dropped, delay, dup = self.model.sample(link, msg, self.time)
+        else:
+            dropped, delay, dup = self.rng.random() < self.drop_prob, None, None
 
         # drop
-        if self.rng.random() < self.drop_prob:
+        if dropped:
             log_event(
                 component="network",
                 event="DROP",
@@ -132,7 +176,14 @@ class UnreliableNetwork:
             return
 
         # schedule deliver
-        delay = self.rng.randint(self.delay_min, self.delay_max)
+        if delay is None:
+            delay = self.rng.randint(self.delay_min, self.delay_max)
+        if self.faults:
+            p = self.extra_drop[link]
+            if p > 0 and self.fault_rng.random() < p:
+                self._fault_drop(src, dst, msg, "degraded")
+                return
+            delay += self.extra_delay[link]
         msg_clone = copy.deepcopy(msg)
         ev = NetworkEvent(self.time + delay, src, dst, msg_clone)
         self.seq += 1
@@ -149,7 +200,9 @@ class UnreliableNetwork:
         )
 
         # duplicate
-        if self.rng.random() < self.dup_prob:
+        if dup is None:
+            dup = self.rng.random() < self.dup_prob
+        if dup:
             ev2 = NetworkEvent(ev.t + 1, src, dst, copy.deepcopy(msg_clone))
             self.seq += 1
             heapq.heappush(self.pq, (ev2.t, self.seq, ev2))
@@ -163,20 +216,40 @@ class UnreliableNetwork:
                 height=msg.height,
             )
 
-    def step(self, handler):
-        if not self.pq:
-            self.time += 1
-            return
+    def _fault_drop(self, src, dst, msg: Message, reason: str):
+        self.fault_drops += 1
+        log_event(
+            component="network",
+            event="FAULT_DROP",
+            time=self.time,
+            src=src,
+            dst=dst,
+            msg_id=msg.msg_id,
+            reason=reason,
+            height=msg.height,
+        )
 
-        t, seq, ev = heapq.heappop(self.pq)
-        self.time = t
+    def set_link_fault(self, link: int, cut: int = 0, drop: float = 0.0, delay: int = 0):
+        """Add (or, with negative values, remove) one fault's effect on a link."""
+        before = bool(self.cut[link] or self.extra_drop[link] > 0 or self.extra_delay[link])
+        self.cut[link] += cut
+        self.extra_drop[link] = max(0.0, round(self.extra_drop[link] + drop, 12))
+        self.extra_delay[link] += delay
+        after = bool(self.cut[link] or self.extra_drop[link] > 0 or self.extra_delay[link])
+        self.faults += after - before
 
+    def _admit(self, ev: NetworkEvent) -> bool:
+        """Deliver-side checks for one popped event; False if it was deferred/dropped."""
+        # Message đang bay khi link bị cắt (partition, node crash) thì mất luôn
+        if self.faults and self.cut[self.index[ev.src] * len(self.nodes) + self.index[ev.dst]]:
+            self._fault_drop(ev.src, ev.dst, ev.msg, "cut_in_flight")
+            return False
         # HEADER → BODY enforcement
         if ev.msg.kind == "BODY":
             block_hash = ev.msg.body.get("block_hash")
             if block_hash not in self.accepted_headers[ev.dst]:
                 # assign deadline if not yet
-                if not hasattr(ev, "deadline"):
+                if ev.deadline is None:
                     ev.deadline = self.time + 30  # MAX_WAIT_FOR_HEADER
 
                 # expired
@@ -190,12 +263,11 @@ class UnreliableNetwork:
                         block_hash=block_hash,
                         height=ev.msg.height,
                     )
-                    return
+                    return False
 
                 # defer body
                 new_t = self.time + 2
-                ev2 = NetworkEvent(new_t, ev.src, ev.dst, copy.deepcopy(ev.msg))
-                ev2.deadline = ev.deadline
+                ev2 = NetworkEvent(new_t, ev.src, ev.dst, copy.deepcopy(ev.msg), deadline=ev.deadline)
                 self.seq += 1
                 heapq.heappush(self.pq, (new_t, self.seq, ev2))
 
@@ -210,7 +282,7 @@ class UnreliableNetwork:
                     next_try=new_t,
                     deadline=ev2.deadline,
                 )
-                return
+                return False
 
         # deliver
         log_event(
@@ -227,29 +299,103 @@ class UnreliableNetwork:
         if ev.msg.kind == "HEADER":
             block_hash = ev.msg.body.get("block_hash")
             if block_hash:
-                self.accepted_headers[ev.dst].add(block_hash)
+                self.accepted_headers[ev.dst][block_hash] = ev.msg.height
+        return True
 
+    def _unblock_expired(self):
         # unblock peers if needed
-        to_unblock = []
-        for (s,d), unblock_time in self.blocked_links.items():
-            if self.time >= unblock_time:
-                to_unblock.append((s,d))
+        to_unblock = [k for k, unblock_time in self._blocked.items() if self.time >= unblock_time]
 
+        n = len(self.nodes)
         for k in to_unblock:
-            del self.blocked_links[k]
+            del self._blocked[k]
+            self.blocked_until[k] = 0
             # NEW: use last known height per link
-            height_val = self.last_height.get(k, None)
+            height_val = self.last_height[k]
             log_event(
                 component="network",
                 event="UNBLOCK",
                 time=self.time,
-                src=k[0],
-                dst=k[1],
-                height=height_val,
+                src=self.nodes[k // n],
+                dst=self.nodes[k % n],
+                height=height_val if height_val >= 0 else None,
             )
 
-        handler(ev.msg)
+    def step(self, handler):
+        if not self.pq:
+            self.time += 1
+            return
+
+        t, seq, ev = heapq.heappop(self.pq)
+        self.time = t
+
+        if not self._admit(ev):
+            return
+        self._unblock_expired()
+        handler(ev.msg, ev.dst)
         return True
 
+    def step_batch(self, handler=None, batch_handler=None) -> int:
+        """Deliver every event already queued for the earliest timestamp.
+
+        Events are popped in (t, seq) order. Housekeeping (unblocking expired
+        links) runs once for the whole tick instead of once per event; token
+        refill is already lazy per link on send. Admitted messages are passed
+        as one list of (msg, dst) to batch_handler, or one by one to handler.
+        Events scheduled at the same t while the batch is being handled (delay
+        0) go into the next batch. Returns the number of delivered messages.
+        """
+        if not self.pq:
+            self.time += 1
+            return 0
+
+        t = self.pq[0][0]
+        self.time = t
+        batch = []
+        while self.pq and self.pq[0][0] == t:
+            _, _, ev = heapq.heappop(self.pq)
+            if self._admit(ev):
+                batch.append((ev.msg, ev.dst))
+        if not batch:
+            return 0
+        self._unblock_expired()
+        if batch_handler is not None:
+            batch_handler(batch)
+        else:
+            for msg, dst in batch:
+                handler(msg, dst)
+        return len(batch)
+
+    def run_until_time(self, t_end: int, handler=None, batch_handler=None, stop=None) -> int:
+        """step_batch until no event is due at or before t_end, or stop() is true.
+
+        Logical time ends at t_end unless stop() cut the run short.
+        Returns the number of delivered messages.
+        """
+        delivered = 0
+        while self.pq and self.pq[0][0] <= t_end:
+            delivered += self.step_batch(handler, batch_handler)
+            if stop is not None and stop():
+                return delivered
+        self.time = max(self.time, t_end)
+        return delivered
+
+    def prune_below(self, height: int) -> int:
+        """Forget accepted headers of heights < height; returns entries dropped.
+
+        Per-link state (tokens, blocks, last_height) is a fixed N×N array and
+        does not grow with heights; queued events drain on their own.
+        """
+        if height <= self.pruned_below:
+            return 0
+        dropped = 0
+        for headers in self.accepted_headers.values():
+            old = [bh for bh, h in headers.items() if h < height]
+            for bh in old:
+                del headers[bh]
+            dropped += len(old)
+        self.pruned_below = height
+        return dropped
+
     def idle(self):
         return not self.pq
@@ -1,25 +1,221 @@
-from typing import Dict, List
-from .types import Block, Vote, LedgerEntry
-from .block import verify_block
-from .consensus import VoteBook, make_vote, verify_vote
+from typing import Dict, List, Optional
+from .types import Block, BlockHeader, CompactBlock, Transaction, Vote, LedgerEntry
+from .block import verify_block, verify_header, verify_body, compute_block_hash
+from .compact import reconstruct, fill_missing
+from .consensus import VoteBook, make_vote, verify_vote, proposer_for
 from .crypto import generate_keypair
+from .exec_cache import ExecutionCache
+from .parallel_exec import ExecPool
+from .mvcc import VersionedStore
 from .state import State, verify_tx
 from .logger import log_event
 
+# Số header tối đa park cho 1 height (proposer equivocate không làm phình parked_headers)
+MAX_PARKED_PER_HEIGHT = 4
+
 class Node:
-    def __init__(self, nid: str, validators: List[str], pk_map: Dict[str, bytes], vote_book: VoteBook, keypair=None, broadcast_cb=None):
+    def __init__(self, nid: str, validators: List[str], pk_map: Dict[str, bytes], vote_book: VoteBook, keypair=None, broadcast_cb=None, finalize_cb=None, tx_pk_map: Dict[str, bytes] = None,
+                 exec_cache: ExecutionCache = None, exec_pool: ExecPool = None,
+                 history: VersionedStore = None):
         self.id = nid
         self.validators = validators
+        self.is_validator = nid in validators
         self.keypair = keypair if keypair else generate_keypair()
         self.pk_map = pk_map
+        # Khóa dùng để verify tx (validator + tài khoản thường); mặc định chỉ validator
+        self.tx_pk_map = tx_pk_map if tx_pk_map is not None else pk_map
         self.vote_book = vote_book
+        # Cache kết quả execute block, dùng chung giữa các node cùng process (có thể None)
+        self.exec_cache = exec_cache
+        # Thread pool để execute block lớn song song theo sender (có thể None)
+        self.exec_pool = exec_pool
         self.blocks_by_height: Dict[int, Block] = {}
         self.ledger: List[LedgerEntry] = []
+        # height -> ledger entry; O(1) "đã finalize height này chưa?"
+        self.ledger_by_height: Dict[int, LedgerEntry] = {}
+        # GENESIS + block_hash các height đã finalize chưa bị prune, luôn giữ tip
+        # (header nối vào 1 trong số này là hợp lệ)
+        self.ledger_hashes: set = {"GENESIS"}
         self.broadcast_cb = broadcast_cb
+        # Gọi finalize_cb(node_id, height, block_hash) mỗi khi commit 1 height mới
+        self.finalize_cb = finalize_cb
         # Local application state maintained by this node
         self.state = State()
+        # Các version theo height của state (MVCC), để truy vấn lịch sử; None = tắt
+        self.history = history
+        # Pending txs (tx_id -> tx) đã nhận qua gossip, chưa được finalize
+        self.mempool: Dict[str, Transaction] = {}
+        # Compact blocks đang chờ tx còn thiếu: block_hash -> (compact, slots)
+        self.pending_compact: Dict[str, tuple] = {}
+        # Header đã kiểm tra xong, đang chờ BODY: block_hash -> header
+        self.pending_headers: Dict[str, BlockHeader] = {}
+        # Header có parent chưa finalize ở node này (node đang trễ): block_hash -> header,
+        # kiểm tra lại khi finalize parent; BODY đến trong lúc đó giữ ở parked_bodies
+        self.parked_headers: Dict[str, BlockHeader] = {}
+        self.parked_bodies: Dict[str, List[Transaction]] = {}
+        # Dữ liệu theo height < pruned_below đã bị prune_below() xóa (0 = chưa prune)
+        self.pruned_below = 0
+
+    def _reject_header(self, header: BlockHeader, block_hash: str, reason: str) -> bool:
+        log_event(
+            component="node",
+            event="HEADER_REJECT",
+            node_id=self.id,
+            height=header.height,
+            block_hash=block_hash,
+            reason=reason,
+        )
+        return False
+
+    def receive_header(self, header: BlockHeader, block_hash: str) -> bool:
+        """Validate a header ahead of its body (signature, linkage, proposer schedule).
+
+        The header must be above this node's tip and build on a block it has
+        finalized (and not pruned). Heights may be skipped (the simulator
+        moves on when a height fails to finalize), and the proposer may lag
+        behind this node, so the parent need not be the tip; the body's state
+        commitment is still checked against local state. An authenticated
+        header whose parent is not finalized here yet is parked (at most
+        MAX_PARKED_PER_HEIGHT per height) and checked again once it is.
+        """
+        h = header.height
+        if h in self.blocks_by_height or block_hash in self.pending_headers or block_hash in self.parked_headers:
+            return False
+        tip_height, tip_hash = (self.ledger[-1].height, self.ledger[-1].block_hash) if self.ledger else (0, "GENESIS")
+        if h <= tip_height:
+            return self._reject_header(header, block_hash, "unexpected_height")
+        if header.proposer != proposer_for(h, self.validators):
+            return self._reject_header(header, block_hash, "wrong_proposer")
+        if compute_block_hash(header.parent_hash, h, header.state_commit) != block_hash:
+            return self._reject_header(header, block_hash, "block_hash_mismatch")
+        if not verify_header(header, self.pk_map):
+            return self._reject_header(header, block_hash, "bad_signature")
+        if header.parent_hash != tip_hash and header.parent_hash not in self.ledger_hashes:
+            # Chỉ header đã xác thực mới được park, tối đa MAX_PARKED_PER_HEIGHT mỗi height
+            if sum(1 for hdr in self.parked_headers.values() if hdr.height == h) >= MAX_PARKED_PER_HEIGHT:
+                return self._reject_header(header, block_hash, "park_full")
+            self.parked_headers[block_hash] = header
+            log_event(
+                component="node",
+                event="HEADER_PARK",
+                node_id=self.id,
+                height=h,
+                block_hash=block_hash,
+                parent_hash=header.parent_hash,
+            )
+            return False
+        self.pending_headers[block_hash] = header
+        log_event(
+            component="node",
+            event="HEADER_ACCEPT",
+            node_id=self.id,
+            height=h,
+            block_hash=block_hash,
+        )
+        txs = self.parked_bodies.pop(block_hash, None)
+        if txs is not None:
+            self.receive_body(block_hash, txs)
+        return True
+
+    def _retry_parked(self, height: int, block_hash: str):
+        """Re-check parked headers after finalizing (height, block_hash)."""
+        if not self.parked_headers:
+            return
+        for bh, hdr in list(self.parked_headers.items()):
+            if hdr.height <= height or hdr.parent_hash == block_hash:
+                del self.parked_headers[bh]
+                if not (hdr.height > height and self.receive_header(hdr, bh)):
+                    self.parked_bodies.pop(bh, None)
+
+    def receive_body(self, block_hash: str, txs: List[Transaction]):
+        header = self.pending_headers.pop(block_hash, None)
+        if header is None:
+            if block_hash in self.parked_headers:
+                self.parked_bodies[block_hash] = txs
+                return
+            log_event(
+                component="node",
+                event="BODY_ORPHAN",
+                node_id=self.id,
+                block_hash=block_hash,
+            )
+            return
+        # Header đã verify ở receive_header → chỉ còn kiểm tra state commitment
+        self.receive_block(Block(header=header, txs=txs, hash=block_hash), header_verified=True)
+
+    def receive_tx(self, tx: Transaction) -> bool:
+        tx_id = tx.id()
+        if tx_id in self.mempool or tx_id in self.state.executed_txs:
+            return False
+        if not verify_tx(tx, self.tx_pk_map):
+            log_event(
+                component="node",
+                event="TX_REJECT",
+                node_id=self.id,
+                tx_id=tx_id,
+            )
+            return False
+        self.mempool[tx_id] = tx
+        log_event(
+            component="node",
+            event="TX_ACCEPT",
+            node_id=self.id,
+            tx_id=tx_id,
+            mempool=len(self.mempool),
+        )
+        return True
+
+    def receive_compact(self, cb: CompactBlock) -> List[int]:
+        """Rebuild a block from the mempool; returns the tx indexes to fetch."""
+        h = cb.header.height
+        if h in self.blocks_by_height or h < self.pruned_below:
+            return []
+        if cb.hash in self.pending_compact:
+            # Bản sao (dup/re-broadcast): hỏi lại phần còn thiếu phòng khi request trước bị drop
+            _, slots = self.pending_compact[cb.hash]
+            return [i for i, tx in enumerate(slots) if tx is None]
+        slots, missing = reconstruct(cb, self.mempool.values())
+        log_event(
+            component="node",
+            event="COMPACT_RECEIVE",
+            node_id=self.id,
+            height=h,
+            block_hash=cb.hash,
+            txs=len(cb.short_ids),
+            missing=len(missing),
+        )
+        if missing:
+            self.pending_compact[cb.hash] = (cb, slots)
+            return missing
+        self.receive_block(Block(header=cb.header, txs=slots, hash=cb.hash))
+        return []
+
+    def receive_block_txn(self, block_hash: str, txs: List[Transaction]):
+        pending = self.pending_compact.get(block_hash)
+        if pending is None:
+            return
+        cb, slots = pending
+        missing = fill_missing(cb, slots, txs)
+        if missing:
+            log_event(
+                component="node",
+                event="COMPACT_INCOMPLETE",
+                node_id=self.id,
+                height=cb.header.height,
+                block_hash=block_hash,
+                missing=len(missing),
+            )
+            return
+        del self.pending_compact[block_hash]
+        self.receive_block(Block(header=cb.header, txs=slots, hash=cb.hash))
+
+    def serve_block_txn(self, height: int, block_hash: str, indexes: List[int]) -> Optional[List[Transaction]]:
+        block = self.blocks_by_height.get(height)
+        if not block or block.hash != block_hash:
+            return None
+        return [block.txs[i] for i in indexes if 0 <= i < len(block.txs)]
 
-    def receive_block(self, block: Block):
+    def receive_block(self, block: Block, header_verified: bool = False):
         log_event(
             component="node",
             event="RECEIVE_BLOCK",
@@ -27,8 +223,24 @@ class Node:
             height=block.header.height,
             block_hash=getattr(block, "hash", None),
         )
+        if block.header.height < self.pruned_below:
+            # Height đã finalize và bị prune: không verify lại trên state hiện tại
+            log_event(
+                component="node",
+                event="BLOCK_STALE",
+                node_id=self.id,
+                height=block.header.height,
+                block_hash=getattr(block, "hash", None),
+            )
+            return
         # Verify block signature and state commitment using local parent state
-        if not verify_block(block, self.pk_map, parent_state=self.state):
+        if header_verified:
+            ok = verify_body(block, self.tx_pk_map, parent_state=self.state, cache=self.exec_cache,
+                             pool=self.exec_pool)
+        else:
+            ok = verify_block(block, self.pk_map, parent_state=self.state, tx_pk_map=self.tx_pk_map,
+                              cache=self.exec_cache, pool=self.exec_pool)
+        if not ok:
             log_event(
                 component="node",
                 event="BLOCK_REJECT",
@@ -56,7 +268,7 @@ class Node:
             height=h,
             block_hash=getattr(block, "hash", None),
         )
-        if self.id in self.validators:
+        if self.is_validator:
             v = make_vote(self.id, h, block.hash, "PREVOTE", self.keypair.sk)
             log_event(
                 component="node",
@@ -67,7 +279,7 @@ class Node:
             )
             self.handle_vote(v)
 
-    def receive_vote(self, v: Vote):
+    def receive_vote(self, v: Vote, verified: Optional[bool] = None):
         log_event(
             component="node",
             event="RECEIVE_VOTE",
@@ -77,10 +289,13 @@ class Node:
             phase=v.phase,
             validator=v.validator,
         )
-        self.handle_vote(v)
+        self.handle_vote(v, verified)
 
-    def handle_vote(self, v: Vote):
-        if not verify_vote(v, self.pk_map): 
+    def handle_vote(self, v: Vote, verified: Optional[bool] = None):
+        # verified: kết quả verify đã có sẵn cho cả batch (Simulator.handle_batch); None = tự verify
+        if verified is None:
+            verified = verify_vote(v, self.pk_map)
+        if not verified:
             log_event(
                 component="node",
                 event="VOTE_INVALID",
@@ -92,13 +307,18 @@ class Node:
             )
             return
         
+        if v.height < self.vote_book.pruned_below:
+            return  # height đã prune: không tạo lại tally cho nó
         # Check if we already have this vote to avoid infinite loops if we were to rebroadcast (we don't rebroadcast here but good practice)
         # Actually, VoteBook handles duplicates, but we need to know if it's new to decide on actions.
         # For now, just add it.
+        book = self.vote_book.prevotes if v.phase == "PREVOTE" else self.vote_book.precommits
+        is_new = v.validator not in book[v.height][v.block_hash]
         res = self.vote_book.add_vote(v)
         
-        # If it's our own vote, broadcast it
-        if v.validator == self.id and self.broadcast_cb:
+        # If it's our own vote, broadcast it (only once: our vote echoed back
+        # by the network must not be re-broadcast, or every delivery fans out again)
+        if v.validator == self.id and is_new and self.broadcast_cb:
             log_event(
                 component="node",
                 event="BROADCAST_VOTE",
@@ -109,7 +329,7 @@ class Node:
             )
             self.broadcast_cb(v.height, ("VOTE", v))
 
-        if v.phase == "PREVOTE" and self.id in self.validators:
+        if v.phase == "PREVOTE" and self.is_validator:
             # Issue PRECOMMIT if majority prevote reached for this block
             prev_count = len(self.vote_book.prevotes[v.height][v.block_hash])
             if prev_count >= self.vote_book.majority():
@@ -139,6 +359,50 @@ class Node:
             )
             self.finalize(v.height, v.block_hash)
 
+    def prune_below(self, height: int) -> Dict[str, int]:
+        """Drop per-height data of heights < height (blocks, pending, votes, history).
+
+        The ledger (one small entry per height) is the chain record and is
+        kept; only its hashes leave the set of accepted header parents.
+        Returns the number of entries dropped per structure.
+        """
+        if height <= self.pruned_below:
+            return {}
+        old = [h for h in self.blocks_by_height if h < height]
+        for h in old:
+            del self.blocks_by_height[h]
+        stale_cmpct = [bh for bh, (cb, _) in self.pending_compact.items() if cb.header.height < height]
+        for bh in stale_cmpct:
+            del self.pending_compact[bh]
+        stale_hdr = [bh for bh, hdr in self.pending_headers.items() if hdr.height < height]
+        for bh in stale_hdr:
+            del self.pending_headers[bh]
+        stale_park = [bh for bh, hdr in self.parked_headers.items() if hdr.height < height]
+        for bh in stale_park:
+            del self.parked_headers[bh]
+            self.parked_bodies.pop(bh, None)
+        # Hash của ledger entry đã prune không còn là parent hợp lệ (tip giữ tới khi finalize height mới)
+        tip_hash = self.ledger[-1].block_hash if self.ledger else None
+        for h in range(self.pruned_below, height):
+            entry = self.ledger_by_height.get(h)
+            if entry is not None and entry.block_hash != tip_hash:
+                self.ledger_hashes.discard(entry.block_hash)
+        dropped = {
+            "blocks": len(old),
+            "pending": len(stale_cmpct) + len(stale_hdr) + len(stale_park),
+            "vote_heights": self.vote_book.prune_below(height),
+        }
+        if self.history is not None:
+            self.history.prune(height)
+        self.pruned_below = height
+        return dropped
+
+    def state_at(self, height: int):
+        """Read-only view of this node's state right after height (needs history)."""
+        if self.history is None:
+            raise ValueError(f"{self.id}: state history is disabled")
+        return self.history.snapshot(height)
+
     def finalize(self, height: int, block_hash: str):
         block = self.blocks_by_height.get(height)
         if not block or block.hash != block_hash: 
@@ -151,7 +415,7 @@ class Node:
                 reason="block_missing_or_hash_mismatch",
             )
             return
-        if any(le.height == height for le in self.ledger): 
+        if height in self.ledger_by_height:
             log_event(
                 component="node",
                 event="FINALIZE_SKIP",
@@ -162,11 +426,23 @@ class Node:
             )
             return
         # Apply block transactions to local state (only valid txs)
+        applied = []
+        for tx in block.txs:
+            if verify_tx(tx, self.tx_pk_map) and self.state.apply(tx):
+                applied.append(tx)
         for tx in block.txs:
-            if verify_tx(tx, self.pk_map):
-                self.state.apply(tx)
+            self.mempool.pop(tx.id(), None)
         # Append ledger entry after state updated
-        self.ledger.append(LedgerEntry(height=height, block_hash=block_hash, state_commit=block.header.state_commit))
+        entry = LedgerEntry(height=height, block_hash=block_hash, state_commit=block.header.state_commit)
+        if self.ledger and self.ledger[-1].height < self.pruned_below:
+            # Tip cũ đã nằm dưới watermark, prune_below giữ lại chỉ vì nó là tip
+            self.ledger_hashes.discard(self.ledger[-1].block_hash)
+        self.ledger.append(entry)
+        self.ledger_by_height[height] = entry
+        self.ledger_hashes.add(block_hash)
+        if self.history is not None:
+            self.history.commit_height(height, {tx.key: tx.value for tx in applied},
+                                       [tx.id() for tx in applied], commit=entry.state_commit)
         log_event(
             component="node",
             event="FINALIZE_COMMIT",
@@ -174,3 +450,6 @@ class Node:
             height=height,
             block_hash=block_hash
         )
+        if self.finalize_cb:
+            self.finalize_cb(self.id, height, block_hash)
+        self._retry_parked(height, block_hash)
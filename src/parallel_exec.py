@@ -0,0 +1,107 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from .state import (State, tx_reject_reason, apply_reject_reason,
+                    log_tx_verify, log_apply_attempt, log_apply_result)
+from .types import Transaction
+
+# Block nhỏ hơn ngưỡng này chạy tuần tự: chi phí chia nhóm/submit lớn hơn lợi ích
+MIN_PARALLEL_TXS = 32
+
+# Kết quả của 1 tx: (index trong block, tx_id, lý do verify fail, lý do apply fail)
+_Outcome = Tuple[int, str, Optional[str], Optional[str]]
+
+
+def sender_groups(txs: List[Transaction]) -> Dict[str, List[Tuple[int, Transaction]]]:
+    """Partition txs by sender, keeping block order (= nonce order) within each sender.
+
+    State.apply only lets a tx write sender/* keys and tx ids embed the
+    sender, so two groups never touch the same key or replay-set entry.
+    """
+    groups: Dict[str, List[Tuple[int, Transaction]]] = {}
+    for i, tx in enumerate(txs):
+        groups.setdefault(tx.sender, []).append((i, tx))
+    return groups
+
+
+def _run_groups(groups: List[List[Tuple[int, Transaction]]], pk_map: Dict[str, bytes],
+                executed_txs) -> Tuple[List[_Outcome], Dict[str, str]]:
+    """Verify + apply some sender groups without logging; returns outcomes and writes."""
+    outcomes: List[_Outcome] = []
+    writes: Dict[str, str] = {}
+    for group in groups:
+        seen = set()  # tx đã apply trong group (replay trong cùng block)
+        for i, tx in group:
+            tx_id = tx.id()
+            sig = tx_reject_reason(tx, pk_map)
+            if sig is not None:
+                outcomes.append((i, tx_id, sig, None))
+                continue
+            # Cùng thứ tự kiểm tra như State.apply: replay (kể cả trong block) trước ownership
+            reason = "replay" if tx_id in seen else apply_reject_reason(tx, tx_id, executed_txs)
+            if reason is None:
+                seen.add(tx_id)
+                writes[tx.key] = tx.value
+            outcomes.append((i, tx_id, None, reason))
+    return outcomes, writes
+
+
+def _chunks(groups: List[List[Tuple[int, Transaction]]], n: int) -> List[List[List[Tuple[int, Transaction]]]]:
+    # Chia group cho n worker, group lớn trước, luôn vào worker đang nhẹ nhất
+    buckets: List[List[List[Tuple[int, Transaction]]]] = [[] for _ in range(n)]
+    loads = [0] * n
+    for g in sorted(groups, key=len, reverse=True):
+        w = loads.index(min(loads))
+        buckets[w].append(g)
+        loads[w] += len(g)
+    return [b for b in buckets if b]
+
+
+def execute_parallel(parent_state: Optional[State], txs: List[Transaction], pk_map: Dict[str, bytes],
+                     pool: "ExecPool") -> Tuple[State, List[str]]:
+    """Execute a block's txs with sender groups spread over pool; same result as serial.
+
+    Workers only verify and compute write-sets (signature checks release the
+    GIL inside libsodium). The merge then runs on the calling thread: the
+    verify/apply log records are emitted in block order, so runs.log matches
+    the serial execution, and the write-sets are installed before commit.
+    Returns the post-state and the applied tx ids in block order.
+    """
+    st = parent_state.child() if parent_state is not None else State()
+    groups = list(sender_groups(txs).values())
+    futures = [pool.submit(_run_groups, chunk, pk_map, st.executed_txs)
+               for chunk in _chunks(groups, pool.workers)]
+    outcomes: List[_Outcome] = []
+    for fut in futures:
+        part, writes = fut.result()
+        outcomes.extend(part)
+        st.kv.update(writes)  # các group ghi key rời nhau → thứ tự merge không ảnh hưởng
+    outcomes.sort()
+
+    applied: List[str] = []
+    for i, tx_id, sig, reason in outcomes:
+        tx = txs[i]
+        log_tx_verify(tx, sig)
+        if sig is not None:
+            continue
+        log_apply_attempt(tx, tx_id)
+        log_apply_result(tx, tx_id, reason)
+        if reason is None:
+            applied.append(tx_id)
+    st.executed_txs.update(applied)
+    return st, applied
+
+
+class ExecPool:
+    """Thread pool for execute_parallel (workers > 1)."""
+    def __init__(self, workers: int):
+        if workers < 2:
+            raise ValueError("ExecPool needs at least 2 workers")
+        self.workers = workers
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="exec")
+
+    def submit(self, fn, *args):
+        return self._pool.submit(fn, *args)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True)
@@ -0,0 +1,317 @@
+import heapq
+import multiprocessing
+import pickle
+import random
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from .block import build_block
+from .consensus import VoteBook, proposer_for
+from .crypto import generate_keypair, KeyPair
+from .network import Message
+from .node import Node
+from .shm_ring import ShmRing
+from .logger import log_event, log_lines, set_log_sink
+
+# Event = (t, src, src_seq, dst, msg). The first four fields are a total order
+# that does not depend on how nodes are partitioned, which is what lets the
+# parallel engine reproduce the sequential one exactly.
+Event = Tuple[int, str, int, str, Message]
+
+RING_BYTES = 16 << 20
+
+
+class ConsensusModel:
+    """Per-node consensus for the discrete-event engines.
+
+    Unlike Simulator (which hands a delivered BLOCK/VOTE to every node), a
+    message only affects its destination. The proposer of height h+1
+    proposes as soon as it has finalized h, so no global coordinator is
+    involved and delay_min is a genuine lookahead.
+    """
+    def __init__(self, n_nodes: int, target_height: int):
+        self.node_ids = [f"N{i}" for i in range(n_nodes)]
+        self.target_height = target_height
+        self.keypairs: Dict[str, KeyPair] = {nid: generate_keypair() for nid in self.node_ids}
+        self.pk_map = {nid: kp.pk for nid, kp in self.keypairs.items()}
+
+    def build(self, ids: List[str]) -> Dict[str, "ConsensusLP"]:
+        return {nid: ConsensusLP(self, nid) for nid in ids}
+
+    def initial_events(self) -> List[Event]:
+        first = proposer_for(1, self.node_ids)
+        return [(0, "", 0, first, Message("start", "START", 0, {}))]
+
+
+class ConsensusLP:
+    def __init__(self, model: ConsensusModel, nid: str):
+        self.model = model
+        self.id = nid
+        self.ctx: Optional["_Ctx"] = None
+        self.node = Node(nid, model.node_ids, model.pk_map, VoteBook(model.node_ids),
+                         keypair=model.keypairs[nid],
+                         broadcast_cb=self._on_broadcast, finalize_cb=self._on_finalize)
+
+    def finalized_height(self) -> int:
+        return self.node.ledger[-1].height if self.node.ledger else 0
+
+    def _on_broadcast(self, height: int, payload):
+        typ, obj = payload
+        if typ == "VOTE":
+            self.ctx.broadcast(Message(f"vote_{self.id}_{height}_{obj.block_hash}", "VOTE", height, {"vote": obj}))
+
+    def _on_finalize(self, node_id: str, height: int, block_hash: str):
+        nxt = height + 1
+        if nxt <= self.model.target_height and proposer_for(nxt, self.model.node_ids) == self.id:
+            self._propose(nxt, block_hash)
+
+    def _propose(self, height: int, parent_hash: str):
+        block = build_block(parent_hash, height, [], self.id, self.node.keypair.sk,
+                            self.model.pk_map, parent_state=self.node.state)
+        log_event(
+            component="pdes",
+            event="PROPOSE_BLOCK",
+            height=height,
+            proposer=self.id,
+            parent_hash=parent_hash,
+            block_hash=block.hash,
+        )
+        self.ctx.broadcast(Message(f"blk_{height}", "BLOCK", height, {"block": block}))
+        self.node.receive_block(block)
+
+    def on_message(self, ctx: "_Ctx", msg: Message):
+        self.ctx = ctx
+        if msg.kind == "START":
+            self._propose(1, "GENESIS")
+        elif msg.kind == "BLOCK":
+            self.node.receive_block(msg.body["block"])
+        elif msg.kind == "VOTE":
+            self.node.receive_vote(msg.body["vote"])
+
+
+class _Ctx:
+    def __init__(self, part: "Partition", src: str, t: int):
+        self.part, self.src, self.t = part, src, t
+
+    def send(self, dst: str, msg: Message):
+        self.part.send(self.t, self.src, dst, msg)
+
+    def broadcast(self, msg: Message):
+        for dst in self.part.all_ids:
+            if dst != self.src:
+                self.send(dst, msg)
+
+
+class Partition:
+    """A group of logical processes with its own event queue and outgoing link RNGs."""
+    def __init__(self, model, ids: List[str], seed: int, drop_prob: float, dup_prob: float,
+                 delay_min: int, delay_max: int):
+        self.all_ids = model.node_ids
+        self.local = set(ids)
+        self.lps = model.build(ids)
+        self.drop_prob, self.dup_prob = drop_prob, dup_prob
+        self.delay_min, self.delay_max = delay_min, delay_max
+        # Sender-owned per-link streams: decisions don't depend on partitioning
+        self.link_rng = {(s, d): random.Random(f"{seed}:{s}:{d}")
+                         for s in ids for d in model.node_ids if s != d}
+        self.src_seq: Dict[str, int] = defaultdict(int)
+        self.pq: List[Event] = []
+        self.outbound: List[Event] = []
+
+    def push(self, ev: Event):
+        heapq.heappush(self.pq, ev)
+
+    def _enqueue(self, ev: Event):
+        if ev[3] in self.local:
+            heapq.heappush(self.pq, ev)
+        else:
+            self.outbound.append(ev)
+
+    def send(self, t: int, src: str, dst: str, msg: Message):
+        rng = self.link_rng[(src, dst)]
+        if rng.random() < self.drop_prob:
+            log_event(component="network", event="DROP", time=t, src=src, dst=dst,
+                      msg_id=msg.msg_id, height=msg.height)
+            return
+        delay = rng.randint(self.delay_min, self.delay_max)
+        self.src_seq[src] += 1
+        self._enqueue((t + delay, src, self.src_seq[src], dst, msg))
+        log_event(component="network", event="SEND", time=t, src=src, dst=dst,
+                  msg_id=msg.msg_id, height=msg.height, delay=delay)
+        if rng.random() < self.dup_prob:
+            self.src_seq[src] += 1
+            self._enqueue((t + delay + 1, src, self.src_seq[src], dst, msg))
+            log_event(component="network", event="DUP", time=t, src=src, dst=dst,
+                      msg_id=msg.msg_id, height=msg.height)
+
+    def process(self, ev: Event):
+        t, src, _, dst, msg = ev
+        log_event(component="network", event="DELIVER", time=t, src=src, dst=dst,
+                  msg_id=msg.msg_id, kind=msg.kind, height=msg.height)
+        self.lps[dst].on_message(_Ctx(self, dst, t), msg)
+
+    def next_time(self) -> Optional[int]:
+        return self.pq[0][0] if self.pq else None
+
+    def min_finalized(self) -> int:
+        return min(lp.finalized_height() for lp in self.lps.values())
+
+    def run_window(self, t_end: int) -> List[Tuple[tuple, List[str]]]:
+        """Process every local event with t < t_end; returns (event key, log lines) per event."""
+        records = []
+        lines: List[str] = []
+        set_log_sink(lines.append)
+        try:
+            while self.pq and self.pq[0][0] < t_end:
+                ev = heapq.heappop(self.pq)
+                self.process(ev)
+                records.append((ev[:4], lines[:]))
+                lines.clear()
+        finally:
+            set_log_sink(None)
+        return records
+
+
+def _check_lookahead(delay_min: int):
+    if delay_min < 1:
+        raise ValueError("conservative PDES needs delay_min >= 1 (the lookahead window)")
+
+
+class SequentialEngine:
+    """Reference engine: one global heap, events popped strictly in (t, src, seq, dst) order."""
+    def __init__(self, model, seed: int, drop_prob=0.05, dup_prob=0.05, delay_min=1, delay_max=5):
+        _check_lookahead(delay_min)
+        self.model = model
+        self.lookahead = delay_min
+        self.part = Partition(model, model.node_ids, seed, drop_prob, dup_prob, delay_min, delay_max)
+        for ev in model.initial_events():
+            self.part.push(ev)
+        self.events = 0
+
+    def run(self, until_t: Optional[int] = None) -> int:
+        target = getattr(self.model, "target_height", None)
+        window_end = None
+        while self.part.pq:
+            t = self.part.pq[0][0]
+            if until_t is not None and t >= until_t:
+                break
+            if window_end is None or t >= window_end:
+                # Stop check on the same window boundaries the parallel engine uses
+                if target is not None and self.part.min_finalized() >= target:
+                    break
+                window_end = t + self.lookahead
+            self.part.process(heapq.heappop(self.part.pq))
+            self.events += 1
+        return self.events
+
+
+def _pdes_worker(model, ids, net_args, cmd_ring: ShmRing, res_ring: ShmRing):
+    part = Partition(model, ids, *net_args)
+    while True:
+        cmd = pickle.loads(cmd_ring.pop())
+        if cmd[0] == "stop":
+            break
+        for ev in cmd[1]:
+            part.push(ev)
+        records = part.run_window(cmd[2]) if cmd[2] is not None else []
+        out, part.outbound = part.outbound, []
+        res_ring.push(pickle.dumps((records, out, part.next_time(), part.min_finalized()),
+                                   protocol=pickle.HIGHEST_PROTOCOL))
+
+
+class ParallelEngine:
+    """Conservative parallel DES over delay_min-sized lookahead windows.
+
+    Nodes are partitioned across workers. Within a window [T, T+L) no event
+    can create another event inside the same window, because every send is
+    delayed by at least L = delay_min. So each partition drains its own
+    queue independently. Cross-partition events are exchanged at the
+    barrier, and each window's log records are merged by event key. The
+    resulting runs.log is byte-identical to SequentialEngine's.
+
+    With processes=False the partitions run in-process, which exercises the
+    same merge logic without OS processes.
+    """
+    def __init__(self, model, seed: int, workers: int = 2, drop_prob=0.05, dup_prob=0.05,
+                 delay_min=1, delay_max=5, processes: bool = True, ring_bytes: int = RING_BYTES):
+        _check_lookahead(delay_min)
+        self.model = model
+        self.lookahead = delay_min
+        ids = model.node_ids
+        workers = max(1, min(workers, len(ids)))
+        self.groups = [ids[i::workers] for i in range(workers)]
+        self.owner = {nid: w for w, g in enumerate(self.groups) for nid in g}
+        net_args = (seed, drop_prob, dup_prob, delay_min, delay_max)
+        self.processes = processes
+        self.inbox: List[List[Event]] = [[] for _ in self.groups]
+        for ev in model.initial_events():
+            self.inbox[self.owner[ev[3]]].append(ev)
+        self.events = 0
+
+        if processes:
+            methods = multiprocessing.get_all_start_methods()
+            ctx = multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+            self.cmd_rings = [ShmRing(ring_bytes, ctx) for _ in self.groups]
+            self.res_rings = [ShmRing(ring_bytes, ctx) for _ in self.groups]
+            self.procs = [ctx.Process(target=_pdes_worker, daemon=True,
+                                      args=(model, g, net_args, self.cmd_rings[w], self.res_rings[w]))
+                          for w, g in enumerate(self.groups)]
+            for p in self.procs:
+                p.start()
+        else:
+            self.parts = [Partition(model, g, *net_args) for g in self.groups]
+
+    def _round(self, t_end: Optional[int]):
+        inbox, self.inbox = self.inbox, [[] for _ in self.groups]
+        if self.processes:
+            for w, evs in enumerate(inbox):
+                self.cmd_rings[w].push(pickle.dumps(("window", evs, t_end), protocol=pickle.HIGHEST_PROTOCOL))
+            results = [pickle.loads(ring.pop()) for ring in self.res_rings]
+        else:
+            results = []
+            for part, evs in zip(self.parts, inbox):
+                for ev in evs:
+                    part.push(ev)
+                records = part.run_window(t_end) if t_end is not None else []
+                out, part.outbound = part.outbound, []
+                results.append((records, out, part.next_time(), part.min_finalized()))
+        for _, out, _, _ in results:
+            for ev in out:
+                self.inbox[self.owner[ev[3]]].append(ev)
+        return results
+
+    def run(self, until_t: Optional[int] = None) -> int:
+        target = getattr(self.model, "target_height", None)
+        try:
+            results = self._round(None)  # distribute initial events, learn next times
+            while True:
+                pending = [ev[0] for evs in self.inbox for ev in evs]
+                times = [r[2] for r in results if r[2] is not None] + pending
+                if not times:
+                    break
+                t = min(times)
+                if until_t is not None and t >= until_t:
+                    break
+                if target is not None and min(r[3] for r in results) >= target:
+                    break
+                t_end = t + self.lookahead
+                if until_t is not None:
+                    t_end = min(t_end, until_t)
+                results = self._round(t_end)
+                merged = heapq.merge(*[r[0] for r in results], key=lambda rec: rec[0])
+                for _, lines in merged:
+                    log_lines(lines)
+                    self.events += 1
+        finally:
+            self.close()
+        return self.events
+
+    def close(self):
+        if self.processes and self.procs:
+            for ring in self.cmd_rings:
+                ring.push(pickle.dumps(("stop",)))
+            for p in self.procs:
+                p.join(timeout=5)
+            for ring in self.cmd_rings + self.res_rings:
+                ring.close()
+            self.procs = []
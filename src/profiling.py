@@ -0,0 +1,256 @@
+import functools
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+_PKG = __name__.rsplit(".", 1)[0]  # "src"
+
+# component -> (module, "Class.method" hoặc "function"); các hàm nóng của một height
+TIMED: Dict[str, Tuple[str, str]] = {
+    "crypto.verify": ("crypto", "verify"),
+    "crypto.sign": ("crypto", "sign"),
+    "state.apply": ("state", "State.apply"),
+    "state.commit": ("state", "State.commit"),
+    "exec.execute_txs": ("exec_cache", "execute_txs"),
+    "node.finalize": ("node", "Node.finalize"),
+    "network.step": ("network", "UnreliableNetwork.step"),
+    "network.step_batch": ("network", "UnreliableNetwork.step_batch"),
+    "logger.log_event": ("logger", "log_event"),
+}
+
+
+@dataclass
+class HeightProfile:
+    height: int
+    wall: float
+    exclusive: Dict[str, float]                 # component -> giây (không tính component con)
+    calls: Dict[str, int]
+    memory: Dict[str, int] = field(default_factory=dict)  # module -> byte cấp phát thêm trong height
+
+
+class Profiler:
+    """Opt-in profiling of Simulator.run_until, reported per height.
+
+    timers:   wraps the functions in TIMED while a run is active (every src
+              module that imported them by name is patched too, and restored
+              on stop). Time is split inclusive / exclusive with a stack, so a
+              verify inside execute_txs is not counted twice. Only the thread
+              that runs the simulator is timed; exec pool workers call through.
+    memory:   tracemalloc snapshot at every height boundary, diffed against
+              the previous one and grouped by source module.
+    sampling: a background thread samples the simulator thread's stack every
+              `interval` seconds into collapsed stacks (write_collapsed()
+              gives flamegraph.pl / speedscope input).
+
+    Attaching sets sim.profiler; run_until then starts/stops it around the
+    run. With no profiler nothing is patched and run_until only checks None.
+    """
+    def __init__(self, sim, timers: bool = True, memory: bool = False,
+                 sampling: bool = False, interval: float = 0.005):
+        self.sim = sim
+        self.timers = timers
+        self.memory = memory
+        self.sampling = sampling
+        self.interval = interval
+        self.totals: Dict[str, List[float]] = {c: [0, 0.0, 0.0] for c in TIMED}  # calls, incl, excl
+        self.heights: List[HeightProfile] = []
+        self.samples: Counter = Counter()
+        self.wall = 0.0
+        self._depth = 0
+        self._patched: List[Tuple[object, str, object]] = []
+        self._stack: List[List[float]] = []
+        self._tid: Optional[int] = None
+        self._t0 = 0.0
+        self._mark: Tuple[float, Dict[str, List[float]]] = (0.0, {})
+        self._snap: Optional[tracemalloc.Snapshot] = None
+        self._own_tracemalloc = False
+        self._sampler: Optional[threading.Thread] = None
+        self._stop_sampling = threading.Event()
+        sim.profiler = self
+        sim.height_hooks.append(self.on_height)
+
+    # --- start / stop (gọi bởi run_until, lồng nhau được) ---
+
+    def start(self):
+        self._depth += 1
+        if self._depth > 1:
+            return
+        self._tid = threading.get_ident()
+        if self.timers:
+            self._install()
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._own_tracemalloc = True
+            self._snap = tracemalloc.take_snapshot()
+        if self.sampling:
+            self._stop_sampling.clear()
+            self._sampler = threading.Thread(target=self._sample_loop, name="profiler-sampler", daemon=True)
+            self._sampler.start()
+        self._t0 = time.perf_counter()
+        self._mark = (self._t0, self._copy_totals())
+
+    def stop(self):
+        self._depth -= 1
+        if self._depth > 0:
+            return
+        self.wall += time.perf_counter() - self._t0
+        if self._sampler is not None:
+            self._stop_sampling.set()
+            self._sampler.join()
+            self._sampler = None
+        if self.memory and self._own_tracemalloc:
+            tracemalloc.stop()
+            self._own_tracemalloc = False
+        self._snap = None
+        self._uninstall()
+
+    # --- timers ---
+
+    def _install(self):
+        for comp, (mod, qual) in TIMED.items():
+            owner_name = f"{_PKG}.{mod}"
+            owner = sys.modules.get(owner_name)
+            if owner is None:
+                continue
+            if "." in qual:
+                cls_name, meth = qual.split(".")
+                cls = getattr(owner, cls_name)
+                orig = cls.__dict__[meth]
+                self._patch(cls, meth, self._timed(comp, orig))
+                continue
+            # Hàm module-level: patch mọi module của package đã import nó theo tên
+            # (nhận diện theo __module__/__qualname__, nên bỏ qua mock của test)
+            wrappers = {}
+            for name, m in list(sys.modules.items()):
+                if m is None or name == __name__ or not (name == _PKG or name.startswith(_PKG + ".")):
+                    continue
+                f = m.__dict__.get(qual)
+                if getattr(f, "__module__", None) != owner_name or getattr(f, "__qualname__", None) != qual:
+                    continue
+                w = wrappers.get(id(f))
+                if w is None:
+                    w = wrappers[id(f)] = self._timed(comp, f)
+                self._patch(m, qual, w)
+
+    def _patch(self, obj, name: str, value):
+        self._patched.append((obj, name, getattr(obj, "__dict__")[name]))
+        setattr(obj, name, value)
+
+    def _uninstall(self):
+        for obj, name, orig in reversed(self._patched):
+            setattr(obj, name, orig)
+        self._patched.clear()
+        self._stack.clear()
+
+    def _timed(self, comp: str, fn):
+        rec = self.totals[comp]
+        stack = self._stack
+        clock = time.perf_counter
+        get_ident = threading.get_ident
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if get_ident() != self._tid:
+                return fn(*args, **kwargs)
+            frame = [0.0]  # thời gian của các component con
+            stack.append(frame)
+            t0 = clock()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                dt = clock() - t0
+                stack.pop()
+                rec[0] += 1
+                rec[1] += dt
+                rec[2] += dt - frame[0]
+                if stack:
+                    stack[-1][0] += dt
+        return wrapper
+
+    def _copy_totals(self) -> Dict[str, List[float]]:
+        return {c: list(r) for c, r in self.totals.items()}
+
+    # --- per height ---
+
+    def on_height(self, height: int):
+        if self._depth == 0:
+            return
+        now = time.perf_counter()
+        t_prev, prev = self._mark
+        cur = self._copy_totals()
+        hp = HeightProfile(
+            height=height,
+            wall=now - t_prev,
+            exclusive={c: cur[c][2] - prev[c][2] for c in cur if cur[c][0] != prev[c][0]},
+            calls={c: int(cur[c][0] - prev[c][0]) for c in cur if cur[c][0] != prev[c][0]},
+        )
+        if self.memory and self._snap is not None:
+            snap = tracemalloc.take_snapshot().filter_traces(
+                (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)))
+            hp.memory = _by_module(snap.compare_to(self._snap, "filename"))
+            self._snap = snap
+        self.heights.append(hp)
+        self._mark = (time.perf_counter(), cur)
+
+    # --- sampling ---
+
+    def _sample_loop(self):
+        frames = sys._current_frames
+        skip = __file__
+        while not self._stop_sampling.wait(self.interval):
+            f = frames().get(self._tid)
+            stack = []
+            while f is not None:
+                co = f.f_code
+                if co.co_filename != skip:
+                    stack.append(f"{Path(co.co_filename).stem}:{co.co_name}")
+                f = f.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def write_collapsed(self, path) -> int:
+        """Write samples as collapsed stacks ("a;b;c count" per line); returns line count."""
+        lines = [f"{stack} {n}" for stack, n in sorted(self.samples.items())]
+        Path(path).write_text("\n".join(lines) + ("\n" if lines else ""), encoding="utf-8")
+        return len(lines)
+
+    # --- report ---
+
+    def breakdown(self) -> Dict[str, Dict[str, float]]:
+        """component -> {calls, inclusive, exclusive, share of wall time}; plus "other"."""
+        out = {}
+        timed = 0.0
+        for c, (calls, incl, excl) in self.totals.items():
+            if calls:
+                out[c] = {"calls": int(calls), "inclusive": incl, "exclusive": excl,
+                          "share": excl / self.wall if self.wall else 0.0}
+                timed += excl
+        other = max(0.0, self.wall - timed)
+        out["other"] = {"calls": 0, "inclusive": other, "exclusive": other,
+                        "share": other / self.wall if self.wall else 0.0}
+        return out
+
+    def format_breakdown(self) -> str:
+        rows = [f"{'component':22s} {'calls':>9s} {'incl s':>9s} {'excl s':>9s} {'share':>7s}"]
+        for c, r in sorted(self.breakdown().items(), key=lambda kv: -kv[1]["exclusive"]):
+            rows.append(f"{c:22s} {r['calls']:9d} {r['inclusive']:9.3f} {r['exclusive']:9.3f} "
+                        f"{r['share'] * 100:6.1f}%")
+        rows.append(f"wall {self.wall:.3f}s")
+        return "\n".join(rows)
+
+
+def _by_module(diffs) -> Dict[str, int]:
+    out: Dict[str, int] = {}
+    for d in diffs:
+        if not d.size_diff:
+            continue
+        p = Path(d.traceback[0].filename)
+        key = p.stem if p.parent.name == _PKG else "other"
+        out[key] = out.get(key, 0) + d.size_diff
+    return out
@@ -0,0 +1,123 @@
+import sys
+from typing import Dict, Iterable, Optional
+
+
+class HeightPruner:
+    """Coordinated height-based GC for a Simulator (nodes, vote books, network).
+
+    Counts finalize_hooks calls per height; once every hosted node has
+    finalized a height (and all heights before it), prune_below(height + 1)
+    runs on every component after end_height. With retention=R, heights
+    older than the current height - R are pruned even if some node never
+    finalized them (a lagging node then cannot catch up on those heights).
+    The ledger itself is kept. Hooks are not persisted by checkpoints, but
+    the pruning watermark is.
+    """
+    def __init__(self, sim, retention: Optional[int] = None):
+        if retention is not None and retention < 1:
+            raise ValueError("retention must be >= 1")
+        self.sim = sim
+        self.retention = retention
+        self.complete = 0  # mọi height <= complete đã được tất cả node finalize
+        self.pruned_below = 0
+        self.runs = 0
+        self.dropped: Dict[str, int] = {}
+        self._counts: Dict[int, int] = {}
+        sim.finalize_hooks.append(self.on_finalize)
+        sim.height_hooks.append(self.on_height)
+
+    def on_finalize(self, node_id: str, height: int, block_hash: str):
+        if height > self.complete:
+            self._counts[height] = self._counts.get(height, 0) + 1
+
+    def on_height(self, height: int):
+        n = len(self.sim.nodes)
+        while self._counts.get(self.complete + 1, 0) >= n:
+            del self._counts[self.complete + 1]
+            self.complete += 1
+        below = self.complete + 1
+        if self.retention is not None:
+            below = max(below, height + 1 - self.retention)
+        self.prune_below(below)
+
+    def prune_below(self, height: int):
+        """Drop per-height data of heights < height in every component."""
+        if height <= self.pruned_below:
+            return
+        for node in self.sim.nodes.values():
+            for k, n in node.prune_below(height).items():
+                self.dropped[k] = self.dropped.get(k, 0) + n
+        self.dropped["headers"] = self.dropped.get("headers", 0) + self.sim.network.prune_below(height)
+        for h in [h for h in self._counts if h < height]:
+            del self._counts[h]
+        # Height đã prune (kể cả do retention) coi như xong: không chờ chúng nữa
+        self.complete = max(self.complete, height - 1)
+        self.pruned_below = height
+        self.runs += 1
+
+
+def deep_sizeof(obj, seen: Optional[set] = None) -> int:
+    """Approximate retained bytes of obj (containers, __slots__/__dict__ objects)."""
+    if seen is None:
+        seen = set()
+    todo = [obj]
+    total = 0
+    while todo:
+        o = todo.pop()
+        if id(o) in seen:
+            continue
+        seen.add(id(o))
+        total += sys.getsizeof(o)
+        if isinstance(o, (str, bytes, bytearray, int, float, bool, type(None))):
+            continue
+        if isinstance(o, dict):
+            todo.extend(o.keys())
+            todo.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset)):
+            todo.extend(o)
+        else:
+            d = getattr(o, "__dict__", None)
+            if d is not None:
+                todo.append(d)
+            for cls in type(o).__mro__:
+                for name in getattr(cls, "__slots__", ()):
+                    if hasattr(o, name):
+                        todo.append(getattr(o, name))
+    return total
+
+
+def _component(objs: Iterable, count) -> Dict[str, int]:
+    seen: set = set()  # object dùng chung giữa các node (vd. cùng Block) chỉ tính 1 lần
+    entries = 0
+    size = 0
+    for o in objs:
+        entries += count(o)
+        size += deep_sizeof(o, seen)
+    return {"entries": entries, "bytes": size}
+
+
+def memory_report(sim) -> Dict[str, Dict[str, int]]:
+    """Per-component footprint: {component: {"entries": n, "bytes": approx}}.
+
+    Entries count per-height records (heights, blocks, headers), so a pruned
+    run should show them flat while ledger/state grow with the chain.
+    """
+    nodes = list(sim.nodes.values())
+    vbs = [n.vote_book for n in nodes]
+    net = sim.network
+    return {
+        "node.blocks_by_height": _component((n.blocks_by_height for n in nodes), len),
+        "node.pending": _component(((n.pending_compact, n.pending_headers, n.parked_headers) for n in nodes),
+                                   lambda p: len(p[0]) + len(p[1]) + len(p[2])),
+        "node.mempool": _component((n.mempool for n in nodes), len),
+        "node.ledger": _component(((n.ledger, n.ledger_by_height) for n in nodes), lambda l: len(l[0])),
+        "node.ledger_hashes": _component((n.ledger_hashes for n in nodes), len),
+        "node.state": _component((n.state for n in nodes), lambda s: len(s.kv)),
+        "votebook.tallies": _component(((vb.prevotes, vb.precommits) for vb in vbs),
+                                       lambda t: len(set(t[0]) | set(t[1]))),
+        "votebook.evidence": _component(((vb.precommit_votes, vb.finalized) for vb in vbs),
+                                        lambda e: len(set(e[0]) | set(e[1]))),
+        "network.accepted_headers": _component([net.accepted_headers],
+                                               lambda a: sum(len(v) for v in a.values())),
+        "network.queue": _component([net.pq], len),
+    }
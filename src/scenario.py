@@ -0,0 +1,245 @@
+import json
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .logger import log_event
+
+
+@dataclass
+class Partition:
+    """Cut every link between nodes of different groups during [start, end).
+
+    Nodes listed in no group keep all their links (a bridge).
+    """
+    start: int
+    end: int
+    groups: List[List[str]]
+    kind: str = "partition"
+
+
+@dataclass
+class Degrade:
+    """Extra drop probability / delay (ticks) on links during [start, end).
+
+    links: explicit (src, dst) pairs; nodes: every link to or from these nodes.
+    """
+    start: int
+    end: int
+    drop_prob: float = 0.0
+    delay: int = 0
+    links: List[Tuple[str, str]] = field(default_factory=list)
+    nodes: List[str] = field(default_factory=list)
+    kind: str = "degrade"
+
+
+@dataclass
+class Crash:
+    """Node is down during [start, end): no links, no proposals; restarts with its state."""
+    start: int
+    end: int
+    node: str
+    kind: str = "crash"
+
+
+@dataclass
+class Join:
+    """Node is absent until time at (a delayed join: down during [0, at))."""
+    at: int
+    node: str
+    kind: str = "join"
+
+    @property
+    def start(self) -> int:
+        return 0
+
+    @property
+    def end(self) -> int:
+        return self.at
+
+
+FAULT_TYPES = {"partition": Partition, "degrade": Degrade, "crash": Crash, "join": Join}
+
+
+def parse_timeline(spec: Sequence[dict]) -> list:
+    """Faults from plain dicts, vd. {"kind": "partition", "start": 100, "end": 400, "groups": [...]}."""
+    faults = []
+    for item in spec:
+        item = dict(item)
+        kind = item.pop("kind", None)
+        if kind not in FAULT_TYPES:
+            raise ValueError(f"unknown fault kind {kind!r}")
+        if kind == "degrade":
+            item["links"] = [tuple(l) for l in item.get("links", [])]
+        faults.append(FAULT_TYPES[kind](**item))
+    return faults
+
+
+def load_timeline(path) -> list:
+    return parse_timeline(json.loads(Path(path).read_text()))
+
+
+@dataclass
+class FaultReport:
+    kind: str
+    start: int
+    end: int
+    sent: int            # message gửi đi trong lúc fault
+    wasted: int          # bị partition/crash/degrade làm mất
+    recover_at: Optional[int]   # lúc height đầu tiên sau khi heal được quorum (2/3) node finalize
+    time_to_recover: Optional[int]
+    all_recover_at: Optional[int]  # lúc height đầu tiên sau heal được mọi node finalize
+    time_to_recover_all: Optional[int]
+
+
+class ScenarioEngine:
+    """Apply a fault timeline to a Simulator at the link level and measure recovery.
+
+    Each fault becomes two actions (start, end) in time order, applied from
+    a step hook as logical time passes them. Faults only touch the network's
+    per-link arrays (cut counts, extra drop/delay) through set_link_fault, so
+    overlapping faults stack and undo cleanly, and send/deliver cost one
+    array lookup. Crashed nodes are also kept in sim.crashed (no proposals).
+
+    Finality is tracked with a finalize hook: for each height, the time a
+    quorum (2/3) of nodes, and all nodes, had finalized it. A fault's recovery
+    time is the wait, after it ends, for the first height that reaches that.
+    """
+    def __init__(self, sim, timeline: Sequence):
+        if len(sim.nodes) != len(sim.node_ids):
+            raise ValueError("scenarios need a simulator that hosts every node")
+        self.sim = sim
+        self.net = sim.network
+        self.faults = [parse_timeline([f])[0] if isinstance(f, dict) else f for f in timeline]
+        n = len(sim.node_ids)
+        for f in self.faults:
+            if f.end < f.start:
+                raise ValueError(f"{f.kind}: end before start")
+            for nid in self._fault_nodes(f):
+                if nid not in self.net.index:
+                    raise ValueError(f"{f.kind}: unknown node {nid!r}")
+        actions = []
+        for i, f in enumerate(self.faults):
+            if f.end == f.start:
+                continue  # fault rỗng (vd. Join at=0)
+            actions.append((f.start, 1, i, +1))
+            actions.append((f.end, 0, i, -1))  # cùng thời điểm: heal trước khi fault mới bắt đầu
+        self._actions = sorted(actions)
+        self._next = 0
+        self._links: Dict[int, List[int]] = {i: self._links_of(f) for i, f in enumerate(self.faults)}
+        self._sent0: Dict[int, Tuple[int, int]] = {}
+        self._window: Dict[int, Tuple[int, int]] = {}
+        self._count: Dict[int, int] = {}
+        self._down: Dict[str, int] = {}  # node -> số crash/join fault đang giữ nó down
+        self.quorum_at: Dict[int, int] = {}  # height -> time đạt quorum (2/3) node finalize
+        self.all_at: Dict[int, int] = {}
+        self._quorum = sim.validators.majority()
+        sim.step_hooks.append(self.advance)
+        sim.finalize_hooks.append(self.on_finalize)
+        self.advance(self.net.time)
+
+    # --- fault → link ---
+
+    @staticmethod
+    def _fault_nodes(f) -> List[str]:
+        if isinstance(f, Partition):
+            return [nid for g in f.groups for nid in g]
+        if isinstance(f, Degrade):
+            return list(f.nodes) + [nid for l in f.links for nid in l]
+        return [f.node]
+
+    def _links_of(self, f) -> List[int]:
+        idx, names = self.net.index, self.sim.node_ids
+        n = len(names)
+        if isinstance(f, Partition):
+            side = {nid: g for g, group in enumerate(f.groups) for nid in group}
+            return [idx[a] * n + idx[b] for a in side for b in side if side[a] != side[b]]
+        if isinstance(f, Degrade):
+            links = {idx[a] * n + idx[b] for a, b in f.links}
+            for nid in f.nodes:
+                i = idx[nid]
+                links.update(i * n + j for j in range(n) if j != i)
+                links.update(j * n + i for j in range(n) if j != i)
+            return sorted(links)
+        i = idx[f.node]
+        return [i * n + j for j in range(n) if j != i] + [j * n + i for j in range(n) if j != i]
+
+    def _apply(self, i: int, sign: int):
+        f = self.faults[i]
+        for link in self._links[i]:
+            if isinstance(f, Degrade):
+                self.net.set_link_fault(link, drop=sign * f.drop_prob, delay=sign * f.delay)
+            else:
+                self.net.set_link_fault(link, cut=sign)
+        if isinstance(f, (Crash, Join)):
+            down = self._down[f.node] = self._down.get(f.node, 0) + sign
+            if down:
+                self.sim.crashed.add(f.node)
+            else:
+                self.sim.crashed.discard(f.node)
+        now = self.net.time
+        if sign > 0:
+            self._sent0[i] = (self.net.sent, self.net.fault_drops)
+        else:
+            s0, d0 = self._sent0[i]
+            self._window[i] = (self.net.sent - s0, self.net.fault_drops - d0)
+        log_event(
+            component="scenario",
+            event="FAULT_START" if sign > 0 else "FAULT_END",
+            time=now,
+            kind=f.kind,
+            links=len(self._links[i]),
+        )
+
+    def advance(self, now: int):
+        """Apply every start/end action due at or before now (step hook)."""
+        acts = self._actions
+        while self._next < len(acts) and acts[self._next][0] <= now:
+            _, _, i, sign = acts[self._next]
+            self._next += 1
+            self._apply(i, sign)
+
+    # --- finality ---
+
+    def on_finalize(self, node_id: str, height: int, block_hash: str):
+        c = self._count[height] = self._count.get(height, 0) + 1
+        now = self.net.time
+        if c == self._quorum:
+            self.quorum_at[height] = now
+        if c == len(self.sim.nodes):
+            self.all_at[height] = now
+
+    @staticmethod
+    def _first_after(times: Dict[int, int], t: int) -> Optional[int]:
+        ts = sorted(times.values())
+        i = bisect_left(ts, t)
+        return ts[i] if i < len(ts) else None
+
+    def run(self, until_time: int, max_heights: Optional[int] = None):
+        """Run heights until logical time reaches until_time (or max_heights more heights)."""
+        stop = None if max_heights is None else self.sim.height + max_heights
+        while self.net.time < until_time and (stop is None or self.sim.height < stop):
+            self.sim.run_until(self.sim.height)
+            self.advance(self.net.time)
+
+    def report(self) -> List[FaultReport]:
+        """One FaultReport per fault (a fault still active reports its counts so far)."""
+        out = []
+        for i, f in enumerate(self.faults):
+            if i in self._window:
+                sent, wasted = self._window[i]
+            elif i in self._sent0:  # fault còn đang diễn ra
+                s0, d0 = self._sent0[i]
+                sent, wasted = self.net.sent - s0, self.net.fault_drops - d0
+            else:
+                sent = wasted = 0
+            healed = i in self._window
+            rec = self._first_after(self.quorum_at, f.end) if healed else None
+            rec_all = self._first_after(self.all_at, f.end) if healed else None
+            out.append(FaultReport(
+                kind=f.kind, start=f.start, end=f.end, sent=sent, wasted=wasted,
+                recover_at=rec, time_to_recover=None if rec is None else rec - f.end,
+                all_recover_at=rec_all, time_to_recover_all=None if rec_all is None else rec_all - f.end,
+            ))
+        return out
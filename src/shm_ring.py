@@ -0,0 +1,80 @@
+import struct
+import time
+from multiprocessing import shared_memory
+from typing import Optional
+
+_HDR = 16  # head (u64, bytes written) + tail (u64, bytes read)
+_LEN = 4   # per-record length prefix
+
+
+class ShmRing:
+    """Single-producer / single-consumer byte ring in multiprocessing shared memory.
+
+    Records are length-prefixed and may wrap around the end of the buffer.
+    head/tail are monotonically increasing byte counters; the producer only
+    writes head and the consumer only writes tail, so no lock is needed. A
+    semaphore counts available records so the consumer can block instead of
+    spinning.
+    """
+    def __init__(self, capacity: int, ctx, name: Optional[str] = None, items=None):
+        self.capacity = capacity
+        self._owner = name is None
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=_HDR + capacity)
+            self.shm.buf[:_HDR] = bytes(_HDR)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.items = items if items is not None else ctx.Semaphore(0)
+
+    def __reduce__(self):
+        # Spawn-safe: the child re-attaches to the same segment by name
+        return (_attach, (self.capacity, self.shm.name, self.items))
+
+    def _counters(self):
+        return struct.unpack_from("<QQ", self.shm.buf, 0)
+
+    def _write(self, pos: int, data: bytes):
+        off = pos % self.capacity
+        first = min(len(data), self.capacity - off)
+        self.shm.buf[_HDR + off:_HDR + off + first] = data[:first]
+        if first < len(data):
+            self.shm.buf[_HDR:_HDR + len(data) - first] = data[first:]
+
+    def _read(self, pos: int, n: int) -> bytes:
+        off = pos % self.capacity
+        first = min(n, self.capacity - off)
+        out = bytes(self.shm.buf[_HDR + off:_HDR + off + first])
+        if first < n:
+            out += bytes(self.shm.buf[_HDR:_HDR + n - first])
+        return out
+
+    def push(self, payload: bytes):
+        need = _LEN + len(payload)
+        if need > self.capacity:
+            raise ValueError(f"record of {len(payload)} bytes exceeds ring capacity {self.capacity}")
+        while True:
+            head, tail = self._counters()
+            if self.capacity - (head - tail) >= need:
+                break
+            time.sleep(0)  # ring full: wait for the consumer
+        self._write(head, len(payload).to_bytes(_LEN, "little") + payload)
+        struct.pack_into("<Q", self.shm.buf, 0, head + need)
+        self.items.release()
+
+    def pop(self, timeout: Optional[float] = None) -> Optional[bytes]:
+        if not self.items.acquire(timeout=timeout):
+            return None
+        _, tail = self._counters()
+        n = int.from_bytes(self._read(tail, _LEN), "little")
+        payload = self._read(tail + _LEN, n)
+        struct.pack_into("<Q", self.shm.buf, 8, tail + _LEN + n)
+        return payload
+
+    def close(self):
+        self.shm.close()
+        if self._owner:
+            self.shm.unlink()
+
+
+def _attach(capacity: int, name: str, items) -> ShmRing:
+    return ShmRing(capacity, None, name=name, items=items)
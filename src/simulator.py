@@ -1,29 +1,76 @@
-from typing import List, Dict
+from typing import Callable, List, Dict, Optional
 
-from .crypto import generate_keypair, KeyPair
+from .crypto import derive_keypair, KeyPair
+from .keystore import load_or_create_keystore
 from .block import build_block
-from .consensus import VoteBook
+from .compact import make_compact_block
+from .exec_cache import ExecutionCache, ExecStore
+from .parallel_exec import ExecPool
+from .mvcc import VersionedStore
+from .types import Transaction
+from .consensus import VoteBook, proposer_for, verify_vote
 from .network import UnreliableNetwork, Message
+from .link_model import LinkModel
 from .node import Node
-from .logger import log_event
+from .validators import ValidatorSet
+from .logger import log_event, digest_checkpoint
 
 
 class Simulator:
-    def __init__(self, n_nodes: int, seed: int):
+    def __init__(self, n_nodes: int, seed: int, compact_blocks: bool = False, max_block_txs: Optional[int] = None,
+                 header_body: bool = False, keypairs: Optional[Dict[str, KeyPair]] = None,
+                 local_ids: Optional[List[str]] = None, accounts: int = 0, batch_steps: bool = False,
+                 keystore: Optional[str] = None, exec_cache_size: int = 256,
+                 exec_cache_store: Optional[ExecStore] = None, exec_workers: int = 0,
+                 state_history: bool = False, history_retention: Optional[int] = None,
+                 link_model: Optional[LinkModel] = None):
+        if compact_blocks and header_body:
+            raise ValueError("compact_blocks and header_body are mutually exclusive")
         self.seed = seed
+        # compact_blocks: gửi header + short tx ids thay vì full block
+        self.compact_blocks = compact_blocks
+        # header_body: gửi HEADER (nhỏ, có chữ ký) trước rồi BODY sau
+        self.header_body = header_body
+        self.max_block_txs = max_block_txs
+        # batch_steps: run_until xử lý cả tick 1 lần (network.step_batch + handle_batch)
+        self.batch_steps = batch_steps
         self.node_ids = [f"N{i}" for i in range(n_nodes)]
         self.validator_ids = self.node_ids  # all validators for simplicity
-        self.pk_map: Dict[str, bytes] = {}
         self.signers = {}
+        pks: List[bytes] = []
 
-        # Tạo keypair cho từng validator
+        # Keypair derive từ (seed, id) → cùng seed thì cùng key qua mọi lần chạy.
+        # keypairs truyền vào (vd. từ runtime đa tiến trình) được ưu tiên; keystore là
+        # file cache (seed, pk) để nạp cả validator set một lần.
+        self.account_ids = [f"A{i}" for i in range(accounts)]
+        if keypairs is None:
+            if keystore is not None:
+                keypairs = load_or_create_keystore(keystore, seed, self.validator_ids + self.account_ids)
+            else:
+                keypairs = {vid: derive_keypair(seed, vid) for vid in self.validator_ids}
         for vid in self.validator_ids:
-            kp = generate_keypair()
-            self.pk_map[vid] = kp.pk
+            kp = keypairs[vid]
+            pks.append(kp.pk)
             self.signers[vid] = kp.sk
 
-        # Mạng không tin cậy
-        self.network = UnreliableNetwork(self.node_ids, seed)
+        # Index số nguyên + bảng public key liên tục; cũng dùng được như pk_map (name -> pk)
+        self.validators = ValidatorSet(self.validator_ids, pks)
+        self.pk_map = self.validators
+
+        # Tài khoản thường (không phải validator) chỉ dùng để gửi tx, vd. cho workload
+        self.account_keys: Dict[str, KeyPair] = {
+            aid: keypairs[aid] if aid in keypairs else derive_keypair(seed, aid) for aid in self.account_ids}
+        self.tx_pk_map: Dict[str, bytes] = dict(self.validators)
+        self.tx_pk_map.update({aid: kp.pk for aid, kp in self.account_keys.items()})
+
+        # Kết quả execute block dùng chung cho mọi node (proposer build → các node verify
+        # chỉ còn lookup); exec_cache_store: store chung giữa các process worker
+        self.exec_cache = ExecutionCache(exec_cache_size, shared=exec_cache_store) if exec_cache_size > 0 else None
+        # exec_workers > 1: block lớn được execute song song theo nhóm sender
+        self.exec_pool = ExecPool(exec_workers) if exec_workers > 1 else None
+
+        # Mạng không tin cậy (link_model: latency/bandwidth riêng từng link, xem src/link_model.py)
+        self.network = UnreliableNetwork(self.node_ids, seed, model=link_model)
 
         # Tạo Node + VoteBook riêng cho từng node
         self.nodes: Dict[str, Node] = {}
@@ -44,26 +91,88 @@ class Simulator:
                 # nếu sau này có loại khác thì thêm ở đây
             return broadcast
 
-        for nid in self.node_ids:
-            vb = VoteBook(self.validator_ids)
+        # Countdown theo height: số node còn chưa finalize height đó.
+        # Node báo qua finalize_cb nên điều kiện dừng chỉ còn O(1).
+        self.pending_finalize: Dict[int, int] = {}
+
+        # Hook tùy chọn: gọi sau mỗi network step (với network.time), mỗi lần node
+        # finalize, và sau end_height (với height vừa chốt, vd. để checkpoint)
+        self.step_hooks: List[Callable[[int], None]] = []
+        self.finalize_hooks: List[Callable[[str, int, str], None]] = []
+        self.height_hooks: List[Callable[[int], None]] = []
+
+        def on_finalize(node_id: str, height: int, block_hash: str):
+            if height in self.pending_finalize:
+                self.pending_finalize[height] -= 1
+            for hook in self.finalize_hooks:
+                hook(node_id, height, block_hash)
+
+        # local_ids: chỉ dựng một phần node (worker của runtime đa tiến trình)
+        for nid in (local_ids if local_ids is not None else self.node_ids):
+            vb = VoteBook(self.validators)
             self.nodes[nid] = Node(
                 nid,
-                self.validator_ids,
+                self.validators,
                 self.pk_map,
                 vb,
                 keypair=KeyPair(self.signers[nid], self.pk_map[nid]),
                 broadcast_cb=make_broadcast(nid),
+                finalize_cb=on_finalize,
+                tx_pk_map=self.tx_pk_map,
+                exec_cache=self.exec_cache,
+                exec_pool=self.exec_pool,
+                # state_history: mỗi node giữ VersionedStore (retention = số height giữ lại)
+                history=VersionedStore(history_retention) if state_history else None,
             )
 
+        # Node đang crash / chưa join (src/scenario.py): không propose, không nhận message
+        self.crashed: set = set()
+        # Profiler (src/profiling.py) bật quanh run_until; None = không đo gì
+        self.profiler = None
+
         self.height = 1
         self.parent_hash = "GENESIS"
 
+    def submit_tx(self, tx: Transaction, origin: Optional[str] = None, gossip: bool = True) -> bool:
+        """Đưa tx vào mempool của node origin rồi gossip tới các node khác.
+
+        Trả về False nếu origin từ chối tx (trùng, đã execute, sai chữ ký).
+        """
+        if origin is None:
+            origin = tx.sender if tx.sender in self.nodes else self.node_ids[0]
+        if not self.nodes[origin].receive_tx(tx):
+            return False
+        if not gossip:
+            return True
+        msg = Message(
+            msg_id=f"tx_{tx.id()}",
+            kind="TX",
+            height=self.height,
+            body={"tx": tx},
+        )
+        self.network.broadcast(origin, msg)
+        return True
+
     def propose(self):
-        proposer = self.node_ids[self.height % len(self.node_ids)]
+        proposer = proposer_for(self.height, self.validators)
+        if proposer in self.crashed:
+            log_event(
+                component="simulator",
+                event="PROPOSE_SKIP",
+                height=self.height,
+                proposer=proposer,
+                reason="crashed",
+            )
+            return
         sk = self.signers[proposer]
-        txs = []  # Empty tx batch; extend as needed
+        proposer_node = self.nodes[proposer]
+        # Lấy tx từ mempool của proposer theo thứ tự deterministic
+        txs = sorted(proposer_node.mempool.values(), key=lambda tx: (tx.sender, tx.nonce, tx.key))
+        if self.max_block_txs is not None:
+            txs = txs[:self.max_block_txs]
 
-        block = build_block(self.parent_hash, self.height, txs, proposer, sk, self.pk_map)
+        block = build_block(self.parent_hash, self.height, txs, proposer, sk, self.tx_pk_map,
+                            parent_state=proposer_node.state, cache=self.exec_cache, pool=self.exec_pool)
 
         # Ghi log đề xuất block
         log_event(
@@ -75,6 +184,38 @@ class Simulator:
             block_hash=getattr(block, "hash", None),
         )
 
+        if self.compact_blocks:
+            # Proposer giữ full block (để trả GETBLOCKTXN), các node khác tự rebuild
+            proposer_node.receive_block(block)
+            msg = Message(
+                msg_id=f"cmpct_{self.height}",
+                kind="CMPCT_BLOCK",
+                height=self.height,
+                body={"compact": make_compact_block(block)},
+            )
+            self.network.broadcast(proposer, msg)
+            return
+
+        if self.header_body:
+            # Node kiểm tra header trong lúc body còn đang truyền; network giữ
+            # BODY lại (DEFER_BODY) cho tới khi node đích đã nhận HEADER
+            proposer_node.receive_block(block)
+            hdr = Message(
+                msg_id=f"hdr_{self.height}",
+                kind="HEADER",
+                height=self.height,
+                body={"block_hash": block.hash, "header": block.header},
+            )
+            body = Message(
+                msg_id=f"body_{self.height}",
+                kind="BODY",
+                height=self.height,
+                body={"block_hash": block.hash, "txs": block.txs},
+            )
+            self.network.broadcast(proposer, hdr)
+            self.network.broadcast(proposer, body)
+            return
+
         # Wrap block vào Message cho network
         msg = Message(
             msg_id=f"blk_{self.height}",
@@ -86,52 +227,161 @@ class Simulator:
         # Gửi qua UnreliableNetwork - API mới: (src, msg)
         self.network.broadcast(proposer, msg)
 
+    def begin_height(self):
+        """Mở height mới: reset countdown finalize rồi propose block."""
+        self.pending_finalize[self.height] = len(self.nodes)
+        self.propose()
+
+    def height_finalized(self) -> bool:
+        # Điều kiện dừng: tất cả node đã finalize height hiện tại
+        return self.pending_finalize[self.height] == 0
+
+    def end_height(self):
+        """Chốt height hiện tại (parent hash, log, checkpoint) và sang height kế."""
+        # Lấy block_hash đã finalize để làm parent cho height tiếp theo
+        sample_node = self.nodes[self.node_ids[0]]
+        finalized_entry = sample_node.ledger_by_height.get(self.height)
+        if finalized_entry:
+            self.parent_hash = finalized_entry.block_hash
+            log_event(
+                component="simulator",
+                event="HEIGHT_FINALIZED",
+                height=self.height,
+                block_hash=finalized_entry.block_hash,
+            )
+
+        # Checkpoint digest cho determinism mode (no-op nếu chưa bật)
+        digest_checkpoint(self.height)
+        del self.pending_finalize[self.height]
+        self.height += 1
+        for hook in self.height_hooks:
+            hook(self.height - 1)
+
+    def handle_message(self, msg: Message, dst: str = None):
+        """Handler mà network gọi khi deliver 1 message tới dst."""
+        if msg.kind == "BLOCK":
+            block = msg.body["block"]
+            for node in self._fanout(dst):
+                node.receive_block(block)
+        elif msg.kind == "VOTE":
+            vote = msg.body["vote"]
+            for node in self._fanout(dst):
+                node.receive_vote(vote)
+        else:
+            # Các loại message point-to-point: chỉ node đích xử lý
+            self._handle_p2p(msg, dst)
+
+    def handle_batch(self, batch: List[tuple]):
+        """Batch handler cho network.step_batch: mọi (msg, dst) đến trong cùng 1 tick.
+
+        Chữ ký của mỗi vote khác nhau trong batch chỉ verify 1 lần (thay vì 1 lần
+        cho mỗi node nhận, mỗi bản DUP); kết quả được truyền cho receive_vote.
+        """
+        verified: Dict[tuple, bool] = {}
+        for msg, dst in batch:
+            if msg.kind != "VOTE":
+                self.handle_message(msg, dst)
+                continue
+            v = msg.body["vote"]
+            key = (v.validator, v.height, v.block_hash, v.phase, v.signature)
+            ok = verified.get(key)
+            if ok is None:
+                ok = verified[key] = verify_vote(v, self.pk_map)
+            for node in self._fanout(dst):
+                node.receive_vote(v, verified=ok)
+
+    def _fanout(self, dst: str):
+        """Nodes that see a BLOCK/VOTE delivered to dst (all of them unless a fault is active)."""
+        net = self.network
+        # Network thay thế (runtime đa tiến trình, asyncio) không có fault injection
+        if not getattr(net, "faults", 0):
+            return self.nodes.values()
+        # Khi có partition/crash: chỉ các node còn link từ dst (dst đã nhận được nên còn sống)
+        n = len(self.node_ids)
+        base = net.index[dst] * n
+        return [node for nid, node in self.nodes.items()
+                if nid == dst or not net.cut[base + net.index[nid]]]
+
     def run_until(self, target_height: int):
+        prof = self.profiler
+        if prof is not None:
+            prof.start()
+            try:
+                self._run_until(target_height)
+            finally:
+                prof.stop()
+            return
+        self._run_until(target_height)
+
+    def _run_until(self, target_height: int):
         while self.height <= target_height:
-            self.propose()
+            self.begin_height()
 
             # Process events until block finalized
             while True:
-                # Đây chính là handler bạn hỏi – nó nằm bên trong run_until
-                def handler(msg: Message):
-                    if msg.kind == "BLOCK":
-                        block = msg.body["block"]
-                        for node in self.nodes.values():
-                            node.receive_block(block)
-                    elif msg.kind == "VOTE":
-                        vote = msg.body["vote"]
-                        for node in self.nodes.values():
-                            node.receive_vote(vote)
-
-                # network.step sẽ gọi handler(msg)
-                self.network.step(handler)
-
-                # Điều kiện dừng: tất cả node đã finalize height hiện tại
-                if all(
-                    any(le.height == self.height for le in n.ledger)
-                    for n in self.nodes.values()
-                ):
+                # network.step sẽ gọi handler(msg, dst)
+                if self.batch_steps:
+                    self.network.step_batch(batch_handler=self.handle_batch)
+                else:
+                    self.network.step(self.handle_message)
+                for hook in self.step_hooks:
+                    hook(self.network.time)
+
+                if self.height_finalized():
                     break
 
                 if self.network.idle():
                     break
 
-            # Lấy block_hash đã finalize để làm parent cho height tiếp theo
-            sample_node = self.nodes[self.node_ids[0]]
-            finalized_entry = next(
-                (le for le in sample_node.ledger if le.height == self.height),
-                None,
-            )
-            if finalized_entry:
-                self.parent_hash = finalized_entry.block_hash
-                log_event(
-                    component="simulator",
-                    event="HEIGHT_FINALIZED",
-                    height=self.height,
-                    block_hash=finalized_entry.block_hash,
-                )
+            self.end_height()
 
-            self.height += 1
+    def _handle_p2p(self, msg: Message, dst: str):
+        node = self.nodes[dst]
+        if msg.kind == "TX":
+            node.receive_tx(msg.body["tx"])
+        elif msg.kind == "CMPCT_BLOCK":
+            cb = msg.body["compact"]
+            missing = node.receive_compact(cb)
+            if missing:
+                req = Message(
+                    msg_id=f"getblocktxn_{dst}_{cb.header.height}",
+                    kind="GETBLOCKTXN",
+                    height=cb.header.height,
+                    body={"block_hash": cb.hash, "indexes": missing, "requester": dst},
+                )
+                self.network.send(dst, cb.header.proposer, req)
+        elif msg.kind == "GETBLOCKTXN":
+            txs = node.serve_block_txn(msg.height, msg.body["block_hash"], msg.body["indexes"])
+            if txs is None:
+                return
+            resp = Message(
+                msg_id=f"blocktxn_{msg.body['requester']}_{msg.height}",
+                kind="BLOCKTXN",
+                height=msg.height,
+                body={"block_hash": msg.body["block_hash"], "txs": txs},
+            )
+            self.network.send(dst, msg.body["requester"], resp)
+        elif msg.kind == "BLOCKTXN":
+            node.receive_block_txn(msg.body["block_hash"], msg.body["txs"])
+        elif msg.kind == "HEADER":
+            node.receive_header(msg.body["header"], msg.body["block_hash"])
+        elif msg.kind == "BODY":
+            node.receive_body(msg.body["block_hash"], msg.body["txs"])
 
     def collect_logs(self) -> str:
         return "\n".join(self.network.log)
+
+    def close(self):
+        """Stop the exec_workers thread pool; the simulator keeps working, serially."""
+        if self.exec_pool is None:
+            return
+        self.exec_pool.shutdown()
+        self.exec_pool = None
+        for node in self.nodes.values():
+            node.exec_pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
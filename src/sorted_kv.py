@@ -0,0 +1,124 @@
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+def _sender_of(key: str) -> str:
+    # Key của state luôn có dạng "sender/..." (ownership rule của State.apply)
+    i = key.find("/")
+    return key[:i] if i >= 0 else key
+
+
+class SortedKV(dict):
+    """dict that also keeps its keys in a sorted list (bisect) plus per-sender key counts.
+
+    Still a plain dict for every existing reader (kv[k], ==, dict(kv)), but
+    writes go through __setitem__/update/pop/… so the sorted key list stays
+    in sync. New keys cost one insort (memmove); overwriting an existing key
+    costs nothing extra. sorted_items(), scan() and range() then stream in
+    key order without re-sorting.
+    """
+    __slots__ = ("_keys", "_senders")
+
+    def __init__(self, data=None):
+        super().__init__()
+        self._keys: List[str] = []
+        self._senders: Counter = Counter()
+        if data:
+            if isinstance(data, SortedKV):
+                dict.update(self, data)
+                self._keys = list(data._keys)
+                self._senders = Counter(data._senders)
+            else:
+                dict.update(self, data)
+                self._keys = sorted(dict.keys(self))
+                self._senders = Counter(_sender_of(k) for k in self._keys)
+
+    def __reduce__(self):
+        return (SortedKV, (dict(self),))
+
+    # --- ghi ---
+
+    def __setitem__(self, key: str, value: str):
+        if key not in self:
+            insort(self._keys, key)
+            self._senders[_sender_of(key)] += 1
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key: str):
+        dict.__delitem__(self, key)
+        del self._keys[bisect_left(self._keys, key)]
+        s = _sender_of(key)
+        self._senders[s] -= 1
+        if not self._senders[s]:
+            del self._senders[s]
+
+    def pop(self, key, *default):
+        if key in self:
+            v = dict.__getitem__(self, key)
+            del self[key]
+            return v
+        if default:
+            return default[0]
+        raise KeyError(key)
+
+    def popitem(self):
+        k, v = dict.popitem(self)
+        dict.__setitem__(self, k, v)
+        del self[k]
+        return k, v
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return dict.__getitem__(self, key)
+
+    def update(self, other=(), **kw):
+        items = other.items() if hasattr(other, "items") else other
+        for k, v in items:
+            self[k] = v
+        for k, v in kw.items():
+            self[k] = v
+
+    def clear(self):
+        dict.clear(self)
+        self._keys.clear()
+        self._senders.clear()
+
+    def copy(self) -> "SortedKV":
+        return SortedKV(self)
+
+    # --- đọc theo thứ tự ---
+
+    def sorted_keys(self) -> List[str]:
+        return self._keys
+
+    def sorted_items(self) -> Iterator[Tuple[str, str]]:
+        get = dict.__getitem__
+        for k in self._keys:
+            yield k, get(self, k)
+
+    def range(self, lo: Optional[str] = None, hi: Optional[str] = None) -> Iterator[Tuple[str, str]]:
+        """(key, value) with lo <= key < hi, in key order (None = unbounded)."""
+        keys = self._keys
+        i = 0 if lo is None else bisect_left(keys, lo)
+        j = len(keys) if hi is None else bisect_left(keys, hi)
+        get = dict.__getitem__
+        for k in keys[i:j]:
+            yield k, get(self, k)
+
+    def scan(self, prefix: str) -> Iterator[Tuple[str, str]]:
+        """(key, value) of every key starting with prefix, in key order."""
+        keys = self._keys
+        get = dict.__getitem__
+        for i in range(bisect_left(keys, prefix), len(keys)):
+            k = keys[i]
+            if not k.startswith(prefix):
+                break
+            yield k, get(self, k)
+
+    def sender_counts(self) -> Dict[str, int]:
+        return dict(self._senders)
+
+    def count_for(self, sender: str) -> int:
+        return self._senders.get(sender, 0)
@@ -1,6 +1,7 @@
-from typing import Dict, Set
-from .crypto import state_hash, CTX_TX, sign, verify, encode_fields
-from .types import Transaction
+from typing import Dict, Iterator, Optional, Set, Tuple
+from .crypto import state_hash, encode_kv_items, CTX_TX, sign, verify, encode_fields
+from .sorted_kv import SortedKV
+from .types import Transaction, StateProof
 from .logger import log_event
 
 class State:
@@ -13,10 +14,13 @@ class State:
     4. commit() tạo deterministic hash của state
     """
     def __init__(self, parent_kv: Dict[str, str] = None, executed_txs: Set[str] = None):
-        # Inherit state from parent block (copy để không mutate parent)
-        self.kv: Dict[str, str] = dict(parent_kv) if parent_kv else {}
+        # Inherit state from parent block (copy để không mutate parent).
+        # SortedKV: vẫn là dict nhưng giữ key theo thứ tự → scan/range/commit không cần sort
+        self.kv: Dict[str, str] = SortedKV(parent_kv)
         # Copy executed transactions set to preserve replay protection across chain
         self.executed_txs: Set[str] = set(executed_txs) if executed_txs else set()
+        # Memo của commit_hash(); apply() thành công thì xóa
+        self._commit_hash: Optional[str] = None
 
     def apply(self, tx: Transaction) -> bool:
         """Apply transaction to state với validation.
@@ -28,50 +32,20 @@ class State:
         2. Ownership: sender chỉ có thể modify sender/* keys
         """
         tx_id = tx.id()
-        log_event(
-            component="state",
-            event="APPLY_TX_ATTEMPT",
-            tx_id=tx_id,
-            sender=tx.sender,
-            key=tx.key,
-            value=tx.value,
-        )
-        
+        log_apply_attempt(tx, tx_id)
+
         # Replay protection: prevent executing same tx twice
-        if tx_id in self.executed_txs:
-            log_event(
-                component="state",
-                event="APPLY_TX_REJECT",
-                reason="replay",
-                tx_id=tx_id,
-                sender=tx.sender,
-                key=tx.key,
-            )
-            return False
-        
         # Ownership: sender can only modify sender/*
-        if not tx.key.startswith(tx.sender + "/"):
-            log_event(
-                component="state",
-                event="APPLY_TX_REJECT",
-                reason="ownership",
-                tx_id=tx_id,
-                sender=tx.sender,
-                key=tx.key,
-            )
+        reason = apply_reject_reason(tx, tx_id, self.executed_txs)
+        if reason is not None:
+            log_apply_result(tx, tx_id, reason)
             return False
-        
+
         # Apply transaction
         self.kv[tx.key] = tx.value
         self.executed_txs.add(tx_id)
-        log_event(
-            component="state",
-            event="APPLY_TX_OK",
-            tx_id=tx_id,
-            sender=tx.sender,
-            key=tx.key,
-            value=tx.value,
-        )
+        self._commit_hash = None
+        log_apply_result(tx, tx_id, None)
         return True
 
     def commit(self) -> str:
@@ -85,6 +59,16 @@ class State:
         )
         return h
     
+    def child(self) -> 'State':
+        """Fresh state to execute a block on top of this one (copy; parent không đổi)."""
+        return State(self.kv, self.executed_txs)
+
+    def commit_hash(self) -> str:
+        """Same value as commit(), memoized and without logging (dùng làm cache key)."""
+        if self._commit_hash is None:
+            self._commit_hash = state_hash(self.kv)
+        return self._commit_hash
+
     def copy(self) -> 'State':
         """Create a deep copy of state for speculation/testing."""
         new_state = State(self.kv)
@@ -107,6 +91,84 @@ class State:
         )
         return self.kv.get(key, "")
 
+    def scan(self, prefix: str) -> Iterator[Tuple[str, str]]:
+        """(key, value) of keys starting with prefix, in key order (vd. scan("alice/"))."""
+        if isinstance(self.kv, SortedKV):
+            return self.kv.scan(prefix)
+        return ((k, self.kv[k]) for k in sorted(self.kv) if k.startswith(prefix))
+
+    def range(self, lo: Optional[str] = None, hi: Optional[str] = None) -> Iterator[Tuple[str, str]]:
+        """(key, value) with lo <= key < hi, in key order (None = unbounded)."""
+        if isinstance(self.kv, SortedKV):
+            return self.kv.range(lo, hi)
+        return ((k, self.kv[k]) for k in sorted(self.kv)
+                if (lo is None or k >= lo) and (hi is None or k < hi))
+
+    def sender_key_counts(self) -> Dict[str, int]:
+        """Số key của mỗi sender (prefix trước dấu "/")."""
+        if isinstance(self.kv, SortedKV):
+            return self.kv.sender_counts()
+        counts: Dict[str, int] = {}
+        for k in self.kv:
+            s = k.split("/", 1)[0]
+            counts[s] = counts.get(s, 0) + 1
+        return counts
+
+    def prove(self, key: str) -> StateProof:
+        """Build an inclusion (or absence) proof for key against commit()."""
+        # Hai nửa quanh key lấy thẳng từ thứ tự đã sort (không lọc cả state)
+        below = encode_kv_items(self.range(None, key))
+        above = encode_kv_items((k, v) for k, v in self.range(key, None) if k != key)
+        log_event(
+            component="state",
+            event="PROVE_KEY",
+            key=key,
+            found=(key in self.kv),
+        )
+        return StateProof(key=key, value=self.kv.get(key), prefix=below, suffix=above)
+
+# --- Kiểm tra thuần (không log) + ghi log tách riêng ---
+# Engine song song (parallel_exec) kiểm tra ở worker rồi ghi log theo đúng thứ
+# tự tx trong block, nên log giống hệt chạy tuần tự.
+
+def apply_reject_reason(tx: Transaction, tx_id: str, executed_txs) -> Optional[str]:
+    """"replay" / "ownership" nếu State.apply sẽ từ chối tx, None nếu hợp lệ."""
+    if tx_id in executed_txs:
+        return "replay"
+    if not tx.key.startswith(tx.sender + "/"):
+        return "ownership"
+    return None
+
+def log_apply_attempt(tx: Transaction, tx_id: str):
+    log_event(
+        component="state",
+        event="APPLY_TX_ATTEMPT",
+        tx_id=tx_id,
+        sender=tx.sender,
+        key=tx.key,
+        value=tx.value,
+    )
+
+def log_apply_result(tx: Transaction, tx_id: str, reason: Optional[str]):
+    if reason is not None:
+        log_event(
+            component="state",
+            event="APPLY_TX_REJECT",
+            reason=reason,
+            tx_id=tx_id,
+            sender=tx.sender,
+            key=tx.key,
+        )
+        return
+    log_event(
+        component="state",
+        event="APPLY_TX_OK",
+        tx_id=tx_id,
+        sender=tx.sender,
+        key=tx.key,
+        value=tx.value,
+    )
+
 def make_tx(sender: str, key: str, value: str, nonce: int, sk, pk) -> Transaction:
     fields = (sender, key, value, nonce)
     sig = sign(CTX_TX, fields, sk).hex()
@@ -120,38 +182,27 @@ def make_tx(sender: str, key: str, value: str, nonce: int, sk, pk) -> Transactio
     )
     return Transaction(sender=sender, key=key, value=value, nonce=nonce, signature=sig)
 
-def verify_tx(tx: Transaction, pk_map: Dict[str, bytes]) -> bool:
-    if tx.sender not in pk_map: 
-        log_event(
-            component="state",
-            event="VERIFY_TX_REJECT",
-            reason="unknown_sender",
-            sender=tx.sender,
-            key=tx.key,
-            value=tx.value,
-            nonce=tx.nonce,
-        )
-        return False
+def tx_reject_reason(tx: Transaction, pk_map: Dict[str, bytes]) -> Optional[str]:
+    """"unknown_sender" / "bad_signature", or None if the signature checks out (no logging)."""
+    if tx.sender not in pk_map:
+        return "unknown_sender"
     fields = (tx.sender, tx.key, tx.value, tx.nonce)
-    ok = verify(CTX_TX, fields, pk_map[tx.sender], bytes.fromhex(tx.signature))
-    if not ok:
-        log_event(
-            component="state",
-            event="VERIFY_TX_REJECT",
-            reason="bad_signature",
-            sender=tx.sender,
-            key=tx.key,
-            value=tx.value,
-            nonce=tx.nonce,
-        )
-    else:
-        log_event(
-            component="state",
-            event="VERIFY_TX_OK",
-            sender=tx.sender,
-            key=tx.key,
-            value=tx.value,
-            nonce=tx.nonce,
-        )
+    if not verify(CTX_TX, fields, pk_map[tx.sender], bytes.fromhex(tx.signature)):
+        return "bad_signature"
+    return None
+
+def log_tx_verify(tx: Transaction, reason: Optional[str]):
+    log_event(
+        component="state",
+        event="VERIFY_TX_OK" if reason is None else "VERIFY_TX_REJECT",
+        **({} if reason is None else {"reason": reason}),
+        sender=tx.sender,
+        key=tx.key,
+        value=tx.value,
+        nonce=tx.nonce,
+    )
 
-    return ok
+def verify_tx(tx: Transaction, pk_map: Dict[str, bytes]) -> bool:
+    reason = tx_reject_reason(tx, pk_map)
+    log_tx_verify(tx, reason)
+    return reason is None
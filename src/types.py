@@ -1,7 +1,10 @@
 from dataclasses import dataclass, field
-from typing import List, Dict
+from typing import List, Dict, Optional
 
-@dataclass
+# Tất cả type đều slotted (không có __dict__ per-instance); các type không bao giờ
+# bị sửa sau khi tạo thì frozen thêm. Header/Vote/Block vẫn mutable vì test và
+# tooling sửa trực tiếp field để mô phỏng giả mạo.
+@dataclass(slots=True, frozen=True)
 class Transaction:
     sender: str
     key: str
@@ -12,7 +15,7 @@ class Transaction:
     def id(self) -> str:
         return f"{self.sender}:{self.key}:{self.nonce}"
 
-@dataclass
+@dataclass(slots=True)
 class BlockHeader:
     parent_hash: str
     height: int
@@ -20,13 +23,13 @@ class BlockHeader:
     proposer: str
     signature: str  # hex
 
-@dataclass
+@dataclass(slots=True)
 class Block:
     header: BlockHeader
     txs: List[Transaction]
     hash: str
 
-@dataclass
+@dataclass(slots=True)
 class Vote:
     validator: str
     height: int
@@ -34,15 +37,28 @@ class Vote:
     phase: str  # PREVOTE / PRECOMMIT
     signature: str  # hex
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class LedgerEntry:
     height: int
     block_hash: str
     state_commit: str
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class FinalizationResult:
     height: int
     block_hash: str
     success: bool
     reason: str = ""
+
+@dataclass(slots=True)
+class StateProof:
+    key: str
+    value: Optional[str]  # None => proof of absence
+    prefix: bytes  # encoded records with keys < key (encode_kv_state layout)
+    suffix: bytes  # encoded records with keys > key
+
+@dataclass(slots=True, frozen=True)
+class CompactBlock:
+    header: BlockHeader
+    hash: str
+    short_ids: List[str]  # short_tx_id(tx.id(), hash) for each tx, in block order
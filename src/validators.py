@@ -0,0 +1,94 @@
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Optional
+
+PK_BYTES = 32  # Ed25519 public key (and the mock fallback) size
+
+
+class ValidatorSet(Mapping):
+    """Validators with stable integer indices and a contiguous public-key table.
+
+    Index i is the position in the constructor's name list. Public keys are
+    packed into one bytes table of PK_BYTES * N. The set is also a read-only
+    Mapping name -> public key, so it can stand in wherever a pk_map dict is
+    expected (verify_vote, verify_tx, verify_block).
+    """
+    def __init__(self, names: List[str], pks: Optional[List[bytes]] = None):
+        self.names: List[str] = list(names)
+        self.index: Dict[str, int] = {n: i for i, n in enumerate(self.names)}
+        if len(self.index) != len(self.names):
+            raise ValueError("duplicate validator name")
+        self.pk_table: Optional[bytes] = None
+        if pks is not None:
+            if len(pks) != len(self.names) or any(len(pk) != PK_BYTES for pk in pks):
+                raise ValueError(f"expected {len(self.names)} public keys of {PK_BYTES} bytes")
+            self.pk_table = b"".join(pks)
+
+    # --- index <-> name ---
+
+    def idx(self, name: str) -> int:
+        return self.index[name]
+
+    def name(self, i: int) -> str:
+        return self.names[i]
+
+    def pk(self, i: int) -> bytes:
+        if self.pk_table is None:
+            raise KeyError("validator set has no public keys")
+        return self.pk_table[i * PK_BYTES:(i + 1) * PK_BYTES]
+
+    # --- consensus helpers ---
+
+    def majority(self) -> int:
+        # Strict 2/3 majority, same rule as VoteBook.majority
+        return (2 * len(self.names)) // 3 + 1
+
+    def proposer(self, height: int) -> int:
+        """Round-robin proposer schedule, as an index."""
+        return height % len(self.names)
+
+    # --- Mapping[name, pk] (pk_map compatibility) ---
+
+    def __getitem__(self, name: str) -> bytes:
+        return self.pk(self.index[name])
+
+    def __contains__(self, name) -> bool:
+        return name in self.index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.names)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+
+class VoterSet:
+    """Set of validators packed into an int bitmask (bit i == validator index i)."""
+    __slots__ = ("vset", "mask")
+
+    def __init__(self, vset: ValidatorSet):
+        self.vset = vset
+        self.mask = 0
+
+    def add(self, name: str):
+        i = self.vset.index.get(name)
+        if i is not None:
+            self.mask |= 1 << i
+
+    def add_index(self, i: int):
+        self.mask |= 1 << i
+
+    def __contains__(self, name) -> bool:
+        i = self.vset.index.get(name)
+        return i is not None and (self.mask >> i) & 1 == 1
+
+    def __len__(self) -> int:
+        return self.mask.bit_count()
+
+    def __iter__(self) -> Iterator[str]:
+        # Luôn theo thứ tự index → log ổn định, không phụ thuộc hash seed
+        m, i = self.mask, 0
+        while m:
+            if m & 1:
+                yield self.vset.names[i]
+            m >>= 1
+            i += 1
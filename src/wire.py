@@ -0,0 +1,56 @@
+import json
+from dataclasses import fields, is_dataclass
+from typing import Any, Tuple
+from . import types
+from .network import Message
+
+# Dataclass types allowed on the wire (decoded by name, never by arbitrary import)
+WIRE_TYPES = {cls.__name__: cls for cls in (
+    types.Transaction, types.BlockHeader, types.Block, types.Vote,
+    types.CompactBlock, types.LedgerEntry,
+)}
+
+FRAME_HEADER = 4  # big-endian length prefix
+
+
+def _to_wire(obj: Any) -> Any:
+    if is_dataclass(obj) and type(obj).__name__ in WIRE_TYPES:
+        out = {"__t": type(obj).__name__}
+        for f in fields(obj):
+            out[f.name] = _to_wire(getattr(obj, f.name))
+        return out
+    if isinstance(obj, bytes):
+        return {"__b": obj.hex()}
+    if isinstance(obj, dict):
+        return {k: _to_wire(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_to_wire(v) for v in obj]
+    return obj
+
+
+def _from_wire(obj: Any) -> Any:
+    if isinstance(obj, dict):
+        if "__t" in obj:
+            cls = WIRE_TYPES[obj["__t"]]
+            return cls(**{k: _from_wire(v) for k, v in obj.items() if k != "__t"})
+        if "__b" in obj and len(obj) == 1:
+            return bytes.fromhex(obj["__b"])
+        return {k: _from_wire(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_from_wire(v) for v in obj]
+    return obj
+
+
+def encode_message(src: str, msg: Message) -> bytes:
+    rec = {"src": src, "msg_id": msg.msg_id, "kind": msg.kind,
+           "height": msg.height, "body": _to_wire(msg.body)}
+    return json.dumps(rec, sort_keys=True, separators=(",", ":")).encode()
+
+
+def decode_message(data: bytes) -> Tuple[str, Message]:
+    rec = json.loads(data)
+    return rec["src"], Message(rec["msg_id"], rec["kind"], rec["height"], _from_wire(rec["body"]))
+
+
+def frame(payload: bytes) -> bytes:
+    return len(payload).to_bytes(FRAME_HEADER, "big") + payload
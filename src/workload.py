@@ -0,0 +1,172 @@
+import bisect
+import math
+import random
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from .state import make_tx
+from .types import Transaction
+
+
+@dataclass(slots=True)
+class WorkloadConfig:
+    """Tham số của workload tổng hợp (đơn vị thời gian: tick logic của network)."""
+    accounts: int = 8            # số tài khoản A0..A{n-1} gửi tx
+    rate: float = 0.5            # số tx trung bình mỗi tick (Poisson)
+    key_space: int = 16          # số key mỗi tài khoản: A{i}/k0..k{key_space-1}
+    distribution: str = "uniform"  # "uniform" hoặc "zipf" (hot keys)
+    zipf_s: float = 1.2
+    value_size: int = 16         # độ dài value (ký tự)
+    replay_prob: float = 0.0     # xác suất gửi lại 1 tx cũ thay vì tx mới
+    # "direct": đưa tx thẳng vào mempool mọi node (không tốn băng thông gossip);
+    # "gossip": submit vào 1 node rồi broadcast TX như client thật
+    mode: str = "direct"
+
+
+@dataclass(slots=True)
+class WorkloadReport:
+    submitted: int
+    committed: int
+    rejected: int
+    replayed: int
+    ticks: int
+    tps: float  # giả định 1 tick = 1 ms
+    latency_p50: Optional[float]
+    latency_p90: Optional[float]
+    latency_p99: Optional[float]
+    latencies: List[int] = field(default_factory=list)
+
+
+def percentile(values: List[int], p: float) -> Optional[float]:
+    """Percentile kiểu nearest-rank; None nếu không có mẫu nào."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(p / 100 * len(ordered)))
+    return float(ordered[rank - 1])
+
+
+class Workload:
+    """Sinh tx có seed và bơm vào Simulator theo thời gian logic.
+
+    Hook vào Simulator.step_hooks: sau mỗi network step, các tx "đến" trong
+    khoảng (last_tick, now] được tạo (Poisson theo rate) và submit. Độ trễ
+    submit→finalize đo trên node mẫu N0, giống Simulator.end_height.
+    """
+    def __init__(self, sim, cfg: WorkloadConfig, seed: int = 0):
+        if cfg.distribution not in ("uniform", "zipf"):
+            raise ValueError(f"unknown key distribution: {cfg.distribution}")
+        if cfg.mode not in ("direct", "gossip"):
+            raise ValueError(f"unknown workload mode: {cfg.mode}")
+        if len(sim.account_ids) < cfg.accounts:
+            raise ValueError(f"simulator has {len(sim.account_ids)} accounts, workload needs {cfg.accounts}")
+        self.sim = sim
+        self.cfg = cfg
+        self.rng = random.Random(seed)
+        self.accounts = sim.account_ids[:cfg.accounts]
+        self.nonces: Dict[str, int] = {a: 0 for a in self.accounts}
+
+        # CDF của Zipf trên key index (key 0 nóng nhất)
+        self._zipf_cdf: List[float] = []
+        if cfg.distribution == "zipf":
+            acc = 0.0
+            for k in range(1, cfg.key_space + 1):
+                acc += 1.0 / k ** cfg.zipf_s
+                self._zipf_cdf.append(acc)
+
+        self.last_tick = sim.network.time
+        self.submit_time: Dict[str, int] = {}
+        self.history: List[Transaction] = []
+        self.latencies: List[int] = []
+        self.submitted = self.rejected = self.replayed = 0
+
+        self.sample = sim.node_ids[0]
+        sim.step_hooks.append(self.on_step)
+        sim.finalize_hooks.append(self.on_finalize)
+
+    # --- sinh tx ---
+
+    def _poisson(self, lam: float) -> int:
+        # Knuth; lam nhỏ (vài tx/tick) nên đủ nhanh
+        limit, k, p = math.exp(-lam), 0, self.rng.random()
+        while p > limit:
+            k += 1
+            p *= self.rng.random()
+        return k
+
+    def _key_index(self) -> int:
+        if self.cfg.distribution == "zipf":
+            r = self.rng.random() * self._zipf_cdf[-1]
+            return bisect.bisect_left(self._zipf_cdf, r)
+        return self.rng.randrange(self.cfg.key_space)
+
+    def next_tx(self) -> Transaction:
+        sender = self.accounts[self.rng.randrange(len(self.accounts))]
+        nonce = self.nonces[sender]
+        self.nonces[sender] = nonce + 1
+        value = "".join(self.rng.choices("abcdefghijklmnopqrstuvwxyz0123456789", k=self.cfg.value_size))
+        kp = self.sim.account_keys[sender]
+        return make_tx(sender, f"{sender}/k{self._key_index()}", value, nonce, kp.sk, kp.pk)
+
+    def submit(self, tx: Transaction) -> bool:
+        if self.cfg.mode == "gossip":
+            return self.sim.submit_tx(tx, origin=self.sim.node_ids[0], gossip=True)
+        accepted = False
+        for nid in self.sim.node_ids:
+            accepted |= self.sim.submit_tx(tx, origin=nid, gossip=False)
+        return accepted
+
+    def tick(self, now: int):
+        for t in range(self.last_tick + 1, now + 1):
+            for _ in range(self._poisson(self.cfg.rate)):
+                if self.history and self.rng.random() < self.cfg.replay_prob:
+                    tx = self.history[self.rng.randrange(len(self.history))]
+                    self.replayed += 1
+                else:
+                    tx = self.next_tx()
+                    self.history.append(tx)
+                self.submitted += 1
+                if self.submit(tx):
+                    self.submit_time.setdefault(tx.id(), t)
+                else:
+                    self.rejected += 1
+        self.last_tick = max(self.last_tick, now)
+
+    # --- hooks ---
+
+    def on_step(self, now: int):
+        self.tick(now)
+
+    def on_finalize(self, node_id: str, height: int, block_hash: str):
+        if node_id != self.sample:
+            return
+        block = self.sim.nodes[node_id].blocks_by_height.get(height)
+        if block is None:
+            return
+        now = self.sim.network.time
+        for tx in block.txs:
+            t0 = self.submit_time.pop(tx.id(), None)
+            if t0 is not None:
+                self.latencies.append(now - t0)
+
+    # --- chạy + báo cáo ---
+
+    def run(self, target_height: int) -> WorkloadReport:
+        start = self.sim.network.time
+        self.sim.run_until(target_height)
+        return self.report(self.sim.network.time - start)
+
+    def report(self, ticks: int) -> WorkloadReport:
+        committed = len(self.latencies)
+        return WorkloadReport(
+            submitted=self.submitted,
+            committed=committed,
+            rejected=self.rejected,
+            replayed=self.replayed,
+            ticks=ticks,
+            tps=committed * 1000.0 / ticks if ticks > 0 else 0.0,
+            latency_p50=percentile(self.latencies, 50),
+            latency_p90=percentile(self.latencies, 90),
+            latency_p99=percentile(self.latencies, 99),
+            latencies=list(self.latencies),
+        )
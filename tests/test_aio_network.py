@@ -0,0 +1,55 @@
+import asyncio
+
+from src.aio_network import AsyncRuntime
+from src.block import build_block, verify_block
+from src.crypto import generate_keypair
+from src.network import Message
+from src.simulator import Simulator
+from src.state import make_tx
+from src.wire import encode_message, decode_message
+
+
+def test_wire_roundtrip_block_message():
+    kp = generate_keypair()
+    pk_map = {"N0": kp.pk}
+    tx = make_tx("N0", "N0/k", "v", 1, kp.sk, kp.pk)
+    blk = build_block("GENESIS", 1, [tx], "N0", kp.sk, pk_map)
+    msg = Message("blk_1", "BLOCK", 1, {"block": blk, "raw": b"\x00\x01"})
+    src, back = decode_message(encode_message("N1", msg))
+    assert src == "N1"
+    assert back.body["block"] == blk
+    assert verify_block(back.body["block"], pk_map)
+    assert back.body["raw"] == b"\x00\x01"
+    assert (back.msg_id, back.kind, back.height) == ("blk_1", "BLOCK", 1)
+
+
+def test_async_runtime_finalizes_over_loopback():
+    sim = Simulator(4, seed=21)
+    rt = AsyncRuntime(sim, drop_prob=0.0, dup_prob=0.1, delay_max=2, tick_ms=0.5)
+    finality = rt.run(2, height_timeout_s=5.0)
+    assert sorted(finality) == [1, 2]
+    hashes = {node.ledger_by_height[2].block_hash for node in sim.nodes.values()}
+    assert len(hashes) == 1
+    assert rt.network.frames_sent > 0
+
+
+def test_async_runtime_delivers_only_to_destination_task():
+    sim = Simulator(4, seed=3)
+    rt = AsyncRuntime(sim, drop_prob=0.0, dup_prob=0.0, delay_max=1, tick_ms=0.5)
+    calls = []
+
+    def spy(nid, fn):
+        def wrapped(*args, **kw):
+            calls.append((nid, asyncio.current_task()))
+            return fn(*args, **kw)
+        return wrapped
+
+    for nid, node in sim.nodes.items():
+        node.receive_block = spy(nid, node.receive_block)
+        node.receive_vote = spy(nid, node.receive_vote)
+    assert sorted(rt.run(2, height_timeout_s=5.0)) == [1, 2]
+    # Task của mỗi node (tạo theo thứ tự sim.node_ids) chỉ gọi vào node đó
+    owner = {}
+    for nid, task in calls:
+        owner.setdefault(task, set()).add(nid)
+    assert len(owner) == 4 and all(len(nids) == 1 for nids in owner.values())
@@ -39,3 +39,17 @@ def test_block_reject_tampered_header():
     blk.header.height = 2   # đổi height, làm chữ ký không còn khớp dữ liệu header
 
     assert not verify_block(blk, pk_map)
+
+def test_core_types_are_slotted():
+    import copy, pickle
+    from src.network import Message, NetworkEvent
+    kp = generate_keypair()
+    tx = make_tx("P", "P/data", "v", 1, kp.sk, kp.pk)
+    blk = build_block("GENESIS", 1, [tx], "P", kp.sk, {"P": kp.pk})
+    ev = NetworkEvent(3, "A", "B", Message("m", "BLOCK", 1, {"block": blk}))
+    for obj in (tx, blk, blk.header, ev, ev.msg):
+        assert not hasattr(obj, "__dict__")
+    assert ev.deadline is None
+    # Frozen + slotted types must still survive the network's deepcopy and pickling
+    assert pickle.loads(pickle.dumps(blk)) == blk
+    assert copy.deepcopy(ev).msg.body["block"] == blk
@@ -0,0 +1,139 @@
+import pytest
+
+from src.checkpoint import Checkpointer
+from src.logger import set_log_sink
+from src.simulator import Simulator
+from src.state import make_tx
+
+
+def _capture(fn):
+    lines = []
+    set_log_sink(lines.append)
+    try:
+        fn()
+    finally:
+        set_log_sink(None)
+    return lines
+
+
+def _with_txs(sim, height):
+    # Vài tx để state/mempool/executed_txs có dữ liệu thật
+    for i, nid in enumerate(sim.node_ids):
+        tx = make_tx(nid, f"{nid}/k", f"h{height}", height, sim.signers[nid], sim.pk_map[nid])
+        sim.submit_tx(tx, gossip=False)
+
+
+def _run(sim, start, end):
+    for h in range(start, end + 1):
+        _with_txs(sim, h)
+        sim.run_until(h)
+
+
+def test_resume_is_byte_identical(tmp_path):
+    ref = Simulator(4, seed=21, header_body=True)
+    full = _capture(lambda: _run(ref, 1, 6))
+
+    sim = Simulator(4, seed=21, header_body=True)
+    ck = Checkpointer(sim, tmp_path / "sim.ckpt")
+    first = _capture(lambda: (_run(sim, 1, 2), ck.save(), _run(sim, 3, 4), ck.save()))
+
+    resumed = Checkpointer.load(tmp_path / "sim.ckpt")
+    rest = _capture(lambda: _run(resumed.sim, 5, 6))
+
+    assert first + rest == full
+    assert [e.block_hash for e in resumed.sim.nodes["N0"].ledger] == [e.block_hash for e in ref.nodes["N0"].ledger]
+    assert resumed.sim.nodes["N2"].state.kv == ref.nodes["N2"].state.kv
+
+
+def test_resume_keeps_state_history_and_exec_options(tmp_path):
+    opts = dict(state_history=True, history_retention=3, exec_cache_size=8, exec_workers=2)
+    with Simulator(4, seed=5, **opts) as ref, Simulator(4, seed=5, **opts) as sim:
+        full = _capture(lambda: _run(ref, 1, 8))
+        ck = Checkpointer(sim, tmp_path / "sim.ckpt")
+        _capture(lambda: (_run(sim, 1, 2), ck.save(), _run(sim, 3, 6), ck.save()))
+        with Checkpointer.load(tmp_path / "sim.ckpt").sim as resumed:
+            assert resumed.exec_pool.workers == 2 and resumed.exec_cache.capacity == 8
+
+            a, b = sim.nodes["N1"].history, resumed.nodes["N1"].history
+            assert (b.retention, b.oldest, b.tip) == (a.retention, a.oldest, a.tip) == (3, 3, 6)
+            for h in range(a.oldest, a.tip + 1):
+                assert dict(resumed.nodes["N1"].state_at(h).kv) == dict(sim.nodes["N1"].state_at(h).kv)
+                assert resumed.nodes["N1"].state_at(h).commit_hash() == sim.nodes["N1"].state_at(h).commit_hash()
+
+            rest = _capture(lambda: _run(resumed, 7, 8))
+            assert rest == full[-len(rest):]
+            assert dict(resumed.nodes["N3"].state_at(7).kv) == dict(ref.nodes["N3"].state_at(7).kv)
+
+
+def test_saves_are_incremental(tmp_path):
+    sim = Simulator(4, seed=3)
+    ck = Checkpointer(sim, tmp_path / "sim.ckpt")
+    sim.run_until(5)
+    base = ck.save()
+    sim.run_until(6)
+    delta = ck.save()
+    assert delta < base
+    # Không có gì đổi → record chỉ còn network/RNG
+    assert ck.save() < delta
+
+
+def test_periodic_checkpoint_and_continue_appending(tmp_path):
+    path = tmp_path / "sim.ckpt"
+    sim = Simulator(4, seed=8)
+    Checkpointer(sim, path, every=2)
+    sim.run_until(5)  # lưu sau height 2 và 4
+
+    ck = Checkpointer.load(path)
+    assert ck.sim.height == 5 and ck.saves == 2
+    ck.sim.run_until(6)
+    ck.save()
+    again = Checkpointer.load(path)
+    assert again.sim.height == 7
+    assert [e.height for e in again.sim.nodes["N1"].ledger] == [e.height for e in ck.sim.nodes["N1"].ledger]
+
+
+def test_rejects_foreign_file(tmp_path):
+    bad = tmp_path / "bad.ckpt"
+    bad.write_bytes(b"not a checkpoint at all")
+    with pytest.raises(ValueError):
+        Checkpointer.load(bad)
+
+
+def _downgrade_to_v1(path):
+    # Viết lại file theo format v1: headers_add là list hash, không có watermark/parked
+    import pickle
+    import zlib
+    from src.checkpoint import MAGIC, _REC
+
+    data, out, pos = path.read_bytes(), b"", 0
+    while pos < len(data):
+        _, _, n = _REC.unpack_from(data, pos)
+        rec = pickle.loads(zlib.decompress(data[pos + _REC.size:pos + _REC.size + n]))
+        pos += _REC.size + n
+        rec["network"].pop("pruned_below")
+        for d in rec["nodes"].values():
+            d["headers_add"] = sorted(d["headers_add"])
+            for k in ("pruned_below", "parked_headers", "parked_bodies"):
+                d.pop(k)
+        payload = zlib.compress(pickle.dumps(rec))
+        out += _REC.pack(MAGIC, 1, len(payload)) + payload
+    path.write_bytes(out)
+
+
+def test_loads_v1_checkpoint(tmp_path):
+    ref = Simulator(4, seed=21, header_body=True)
+    full = _capture(lambda: _run(ref, 1, 4))
+
+    sim = Simulator(4, seed=21, header_body=True)
+    ck = Checkpointer(sim, tmp_path / "sim.ckpt")
+    first = _capture(lambda: (_run(sim, 1, 2), ck.save()))
+    _downgrade_to_v1(tmp_path / "sim.ckpt")
+
+    resumed = Checkpointer.load(tmp_path / "sim.ckpt")
+    # v1 không có height của header → gán height hiện tại (3) khi load
+    assert {dst: dict(hs) for dst, hs in resumed.sim.network.accepted_headers.items() if hs} == \
+        {dst: dict.fromkeys(hs, 3) for dst, hs in sim.network.accepted_headers.items() if hs}
+    rest = _capture(lambda: _run(resumed.sim, 3, 4))
+    assert first + rest == full
+    resumed.save()  # file lẫn v1 + v2 vẫn load được
+    assert Checkpointer.load(tmp_path / "sim.ckpt").sim.height == 5
@@ -0,0 +1,77 @@
+from src.columnar_log import ColumnarLog, ColumnarWriter, MISSING, columnar_sink, convert_json_log
+from src.logger import set_log_sink
+from src.simulator import Simulator
+
+RECS = [
+    {"component": "net", "event": "SEND", "time": 3, "src": "N0", "dst": "N1"},
+    {"component": "node", "event": "FINALIZE", "height": 1, "node_id": "N1"},
+    {"component": "node", "event": "X", "validators": ["N0", "N1"], "flag": True, "v": None},
+    {"component": "net", "event": "SEND", "time": 2 ** 70, "height": "late"},  # int quá lớn → json
+]
+
+
+def test_round_trip_and_typed_columns(tmp_path):
+    p = tmp_path / "a.col"
+    with ColumnarWriter(p, rows_per_segment=3) as w:
+        for r in RECS:
+            w.append(r)
+    assert w.segments == 2
+    with ColumnarLog(p) as log:
+        assert len(log) == 4 and list(log.records()) == RECS
+        seg = log.segments[0]
+        assert seg.columns["time"]["kind"] == "int" and seg.columns["event"]["kind"] == "str"
+        assert list(seg.array("time")) == [3, MISSING, MISSING]
+        assert seg.columns["height"]["kind"] == "int"
+        last = log.segments[1].columns  # segment mới: kiểu cột suy lại từ đầu
+        assert last["height"]["kind"] == "str" and last["time"]["kind"] == "json"
+        assert log.column("src") == ["N0", None, None, None]
+        assert log.counts("event") == {"SEND": 2, "FINALIZE": 1, "X": 1}
+        assert log.column("validators")[2] == ["N0", "N1"]
+
+
+def test_mixed_types_in_one_segment_promote_column(tmp_path):
+    p = tmp_path / "b.col"
+    with ColumnarWriter(p) as w:
+        for r in RECS:
+            w.append(r)
+    with ColumnarLog(p) as log:
+        assert log.segments[0].columns["height"]["kind"] == "json"
+        assert list(log.records()) == RECS
+
+
+def test_sink_and_converter_match_json_log(tmp_path):
+    def run():
+        Simulator(4, seed=5).run_until(2)
+
+    lines = []
+    set_log_sink(lines.append)
+    try:
+        run()
+    finally:
+        set_log_sink(None)
+    with columnar_sink(tmp_path / "sim.col", rows_per_segment=500) as w:
+        run()
+    src = tmp_path / "runs.log"
+    src.write_text("".join(lines), encoding="utf-8")
+    assert convert_json_log(src, tmp_path / "conv.col") == len(lines) == w.rows
+    for name in ("sim.col", "conv.col"):
+        with ColumnarLog(tmp_path / name) as log:
+            assert "".join(log.lines()) == "".join(lines)
+            assert log.counts("event")["PROPOSE_BLOCK"] == sum('"PROPOSE_BLOCK"' in l for l in lines)
+
+
+def test_empty_log(tmp_path):
+    ColumnarWriter(tmp_path / "e.col").close()
+    with ColumnarLog(tmp_path / "e.col") as log:
+        assert len(log) == 0 and list(log.lines()) == []
+
+
+def test_counts_merge_promoted_segments(tmp_path):
+    p = tmp_path / "c.col"
+    with ColumnarWriter(p, rows_per_segment=2) as w:
+        for r in [{"n": "N1"}, {"n": "N1"}, {"n": "N1"}, {"n": None}, {"n": [1, 2]}, {"n": 7}]:
+            w.append(r)
+    with ColumnarLog(p) as log:
+        assert log.segments[1].columns["n"]["kind"] == "json"
+        assert log.column("n") == ["N1", "N1", "N1", None, [1, 2], 7]
+        assert log.counts("n") == {"N1": 3, None: 1, (1, 2): 1, 7: 1}
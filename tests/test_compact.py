@@ -0,0 +1,61 @@
+from src.block import build_block
+from src.compact import make_compact_block, reconstruct, fill_missing
+from src.crypto import generate_keypair
+from src.simulator import Simulator
+from src.state import make_tx
+
+
+def _txs(kp, sender, n):
+    return [make_tx(sender, f"{sender}/k{i}", f"v{i}", i, kp.sk, kp.pk) for i in range(n)]
+
+
+def test_reconstruct_from_pool_and_fill_missing():
+    kp = generate_keypair()
+    pk_map = {"P": kp.pk}
+    txs = _txs(kp, "P", 5)
+    blk = build_block("GENESIS", 1, txs, "P", kp.sk, pk_map)
+    cb = make_compact_block(blk)
+    assert len(cb.short_ids) == 5
+
+    slots, missing = reconstruct(cb, [txs[0], txs[2], txs[4]])
+    assert missing == [1, 3]
+    assert fill_missing(cb, slots, [txs[1], txs[3]]) == []
+    assert [tx.id() for tx in slots] == [tx.id() for tx in txs]
+
+
+def _run_compact(gossip):
+    sim = Simulator(4, seed=11, compact_blocks=True)
+    # Tắt drop/dup để kiểm tra đường rebuild một cách xác định
+    sim.network.drop_prob = 0.0
+    sim.network.dup_prob = 0.0
+    for nid in sim.node_ids:
+        kp_sk = sim.signers[nid]
+        for i in range(2):
+            tx = make_tx(nid, f"{nid}/k{i}", f"v{i}", i, kp_sk, sim.pk_map[nid])
+            # Chỉ proposer của height 1 (N1) biết tx nếu không gossip
+            sim.submit_tx(tx, origin="N1", gossip=gossip)
+    # Cho gossip lan hết trước khi propose (chỉ có message TX đang bay)
+    while not sim.network.idle():
+        sim.network.step(sim._handle_p2p)
+    sim.run_until(1)
+    return sim
+
+
+def test_compact_relay_with_gossiped_mempool():
+    sim = _run_compact(gossip=True)
+    # Mempool đã đủ nên không node nào phải xin thêm tx
+    assert all(not node.pending_compact for node in sim.nodes.values())
+    for node in sim.nodes.values():
+        assert 1 in node.ledger_by_height
+        assert len(node.blocks_by_height[1].txs) == 8
+        assert node.state.kv["N3/k1"] == "v1"
+        assert not node.mempool
+
+
+def test_compact_relay_fetches_unseen_txs():
+    sim = _run_compact(gossip=False)
+    hashes = {node.ledger_by_height[1].block_hash for node in sim.nodes.values()}
+    assert len(hashes) == 1
+    for node in sim.nodes.values():
+        assert node.state.kv["N0/k0"] == "v0"
+        assert not node.pending_compact
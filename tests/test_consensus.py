@@ -1,6 +1,6 @@
 import unittest
 from src.consensus import VoteBook, make_vote, verify_vote
-from src.node import Node
+from src.node import MAX_PARKED_PER_HEIGHT, Node
 from src.types import Vote, Block, BlockHeader, Transaction
 from src.crypto import generate_keypair
 from src.block import build_block
@@ -107,5 +107,51 @@ class TestConsensus(unittest.TestCase):
         self.assertEqual(node.ledger[0].height, 1)
         self.assertEqual(node.ledger[0].block_hash, block.hash)
 
+    def test_node_finalize_callback_fires_once(self):
+        calls = []
+        node = Node("V1", self.validators, self.pk_map, self.vote_book,
+                    finalize_cb=lambda nid, h, bh: calls.append((nid, h, bh)))
+        node.keypair = type('KP', (), {'sk': self.signers["V1"], 'pk': self.pk_map["V1"]})()
+        block = build_block("parent", 1, [], "V1", self.signers["V1"], self.pk_map)
+        node.receive_block(block)
+        for i in range(3):
+            pc = make_vote(self.validators[i], 1, block.hash, "PRECOMMIT", self.signers[self.validators[i]])
+            node.handle_vote(pc)
+        # Re-finalization is a no-op and must not fire the callback again
+        node.finalize(1, block.hash)
+        self.assertEqual(calls, [("V1", 1, block.hash)])
+        self.assertIn(1, node.ledger_by_height)
+
+    def test_node_header_first_validation(self):
+        node = Node("V1", self.validators, self.pk_map, self.vote_book)
+        node.keypair = type('KP', (), {'sk': self.signers["V1"], 'pk': self.pk_map["V1"]})()
+        # Height 1 theo lịch round-robin thuộc về V2
+        wrong = build_block("GENESIS", 1, [], "V3", self.signers["V3"], self.pk_map)
+        self.assertFalse(node.receive_header(wrong.header, wrong.hash))
+        orphan = build_block("parent", 1, [], "V2", self.signers["V2"], self.pk_map)
+        self.assertFalse(node.receive_header(orphan.header, orphan.hash))
+
+        block = build_block("GENESIS", 1, [], "V2", self.signers["V2"], self.pk_map)
+        self.assertTrue(node.receive_header(block.header, block.hash))
+        node.receive_body(block.hash, block.txs)
+        self.assertIn(1, node.blocks_by_height)
+        self.assertIn("V1", self.vote_book.prevotes[1][block.hash])
+
+    def test_node_parks_only_authenticated_headers(self):
+        node = Node("V1", self.validators, self.pk_map, self.vote_book)
+        # Parent chưa finalize nhưng header sai proposer / sai chữ ký → reject, không park
+        wrong = build_block("unknown", 2, [], "V4", self.signers["V4"], self.pk_map)
+        forged = build_block("unknown", 2, [], "V3", self.signers["V4"], self.pk_map)
+        for b in (wrong, forged):
+            self.assertFalse(node.receive_header(b.header, b.hash))
+        self.assertEqual(node.parked_headers, {})
+
+        parked = [build_block(f"unknown{i}", 2, [], "V3", self.signers["V3"], self.pk_map)
+                  for i in range(MAX_PARKED_PER_HEIGHT + 1)]
+        for b in parked:
+            self.assertFalse(node.receive_header(b.header, b.hash))
+        self.assertEqual(set(node.parked_headers), {b.hash for b in parked[:MAX_PARKED_PER_HEIGHT]})
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -45,3 +45,13 @@ def test_signature_reject_wrong_public_key():
 
     # Verify bằng public key của người khác
     assert not verify(CTX_TX, fields, kp2.pk, sig)
+
+
+def test_derive_keypair_is_deterministic():
+    from src.crypto import derive_keypair
+    a, b = derive_keypair(7, "N0"), derive_keypair(7, "N0")
+    assert a.pk == b.pk
+    assert derive_keypair(7, "N1").pk != a.pk
+    assert derive_keypair(8, "N0").pk != a.pk
+    sig = sign(CTX_VOTE, ("x",), a.sk)
+    assert verify(CTX_VOTE, ("x",), b.pk, sig)
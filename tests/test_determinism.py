@@ -8,4 +8,24 @@ def test_deterministic_logs():
     s2 = Simulator(4, seed=42)
     s2.run_until(3)
     log2 = s2.collect_logs()
-    assert log1 == log2
\ No newline at end of file
+    assert log1 == log2
+
+def test_digest_checkpoints_match_across_runs():
+    from src.logger import start_digest, stop_digest, first_divergence
+    start_digest()
+    Simulator(4, seed=7).run_until(3)
+    d1 = stop_digest()
+    start_digest()
+    Simulator(4, seed=7).run_until(3)
+    d2 = stop_digest()
+    assert [cp[0] for cp in d1.checkpoints] == [1, 2, 3]
+    assert d1.checkpoints == d2.checkpoints
+    assert first_divergence(d1.checkpoints, d2.checkpoints) is None
+
+
+def test_first_divergence_bisects_checkpoints():
+    from src.logger import first_divergence
+    a = [(h, h * 10, f"d{h}") for h in range(1, 101)]
+    b = a[:63] + [(h, h * 10, f"x{h}") for h in range(64, 101)]
+    assert first_divergence(a, b) == 63
+    assert first_divergence(a, a[:50]) == 50
@@ -85,3 +85,41 @@ def test_e2e_ledger_deterministic_across_runs():
     chain2 = _extract_chain_for_node(sim2, "N0")
 
     assert chain1 == chain2
+
+
+def test_e2e_header_body_propagation():
+    sim = Simulator(n_nodes=4, seed=123, header_body=True)
+    sim.run_until(3)
+
+    chains = _collect_chains(sim)
+    _assert_no_fork_safety_only(chains)
+    # Header/body path phải thực sự được dùng và finalize được (seed cố định)
+    assert all(sorted(hmap) == [1, 2, 3] for hmap in chains.values())
+
+
+def test_e2e_header_body_keeps_progressing():
+    # Seed 0 / 3: một height không finalize được sớm (trước đây node kẹt ở đó mãi)
+    for seed in (0, 3):
+        sim = Simulator(n_nodes=6, seed=seed, header_body=True)
+        sim.network.rate = 1000
+        sizes = []
+        for target in (10, 20, 30):
+            sim.run_until(target)
+            sizes.append(min(len(node.ledger) for node in sim.nodes.values()))
+
+        _assert_no_fork_safety_only(_collect_chains(sim))
+        assert sizes[0] < sizes[1] < sizes[2]
+
+
+def test_e2e_batched_steps():
+    sim = Simulator(n_nodes=4, seed=123, batch_steps=True)
+    sim.run_until(3)
+
+    chains = _collect_chains(sim)
+    _assert_no_fork_safety_only(chains)
+    assert all(sorted(hmap) == [1, 2, 3] for hmap in chains.values())
+
+    # Cùng seed → cùng chain với chế độ từng event
+    ref = Simulator(n_nodes=4, seed=123)
+    ref.run_until(3)
+    assert _extract_chain_for_node(sim, "N0") == _extract_chain_for_node(ref, "N0")
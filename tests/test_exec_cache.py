@@ -0,0 +1,88 @@
+from src.block import build_block, verify_body
+from src.crypto import derive_keypair
+from src.exec_cache import ExecutionCache, execute_txs, exec_key
+from src.logger import set_log_sink
+from src.mp_runtime import MultiProcessRuntime
+from src.simulator import Simulator
+from src.state import State, make_tx
+
+
+def _txs(n=3):
+    kp = derive_keypair(1, "P")
+    return {"P": kp.pk}, [make_tx("P", f"P/k{i % 2}", f"v{i}", i, kp.sk, kp.pk) for i in range(n)], kp
+
+
+def _capture(fn):
+    lines = []
+    set_log_sink(lines.append)
+    try:
+        res = fn()
+    finally:
+        set_log_sink(None)
+    return res, lines
+
+
+def test_hit_returns_same_result_and_same_log():
+    pk_map, txs, _ = _txs()
+    cache = ExecutionCache(4)
+    parent = State()
+    miss, log_miss = _capture(lambda: execute_txs(parent, txs, pk_map, cache))
+    hit, log_hit = _capture(lambda: execute_txs(parent, txs, pk_map, cache))
+    plain, log_plain = _capture(lambda: execute_txs(parent, txs, pk_map))
+    assert hit is miss
+    assert miss.commit == plain.commit
+    assert miss.write_set == (("P/k0", "v2"), ("P/k1", "v1"))
+    assert log_hit == log_miss == log_plain
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_key_depends_on_parent_and_tx_order():
+    pk_map, txs, _ = _txs()
+    s1 = State()
+    k = exec_key(s1, txs)
+    assert exec_key(s1, list(reversed(txs))) != k
+    s1.apply(txs[0])
+    assert exec_key(s1, txs) != k
+
+
+def test_lru_eviction_and_hit_rate():
+    pk_map, txs, _ = _txs(4)
+    cache = ExecutionCache(2)
+    for i in range(4):
+        execute_txs(State(), txs[:i + 1], pk_map, cache)
+    assert len(cache) == 2 and cache.evictions == 2
+    execute_txs(State(), txs[:4], pk_map, cache)  # còn trong cache
+    execute_txs(State(), txs[:1], pk_map, cache)  # đã bị evict
+    assert cache.hits == 1 and cache.misses == 5
+    assert cache.hit_rate == 1 / 6
+
+
+def test_build_then_verify_is_a_lookup():
+    pk_map, txs, kp = _txs()
+    cache = ExecutionCache()
+    blk = build_block("GENESIS", 1, txs, "P", kp.sk, pk_map, cache=cache)
+    assert all(verify_body(blk, pk_map, State(), cache=cache) for _ in range(3))
+    assert cache.hits == 3 and cache.misses == 1
+
+
+def test_simulator_log_identical_with_and_without_cache():
+    def run(size):
+        sim = Simulator(4, seed=9, exec_cache_size=size, accounts=2)
+        for i in range(3):
+            kp = sim.account_keys["A0"]
+            sim.submit_tx(make_tx("A0", f"A0/k{i}", "v", i, kp.sk, kp.pk), gossip=False)
+        sim.run_until(3)
+        return sim
+    (cached, log_a), (plain, log_b) = _capture(lambda: run(256)), _capture(lambda: run(0))
+    assert log_a == log_b
+    assert cached.exec_cache.hit_rate > 0.5
+    assert plain.exec_cache is None
+
+
+def test_multiprocess_shared_cache():
+    with MultiProcessRuntime(4, seed=17, workers=2, shared_exec_cache=True) as rt:
+        rt.run_until(3)
+        stats = rt.exec_cache_stats()
+    assert len(stats) == 2
+    # Worker không chứa proposer vẫn lấy được kết quả từ store chung
+    assert sum(s["shared_hits"] for s in stats) > 0
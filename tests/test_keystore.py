@@ -0,0 +1,52 @@
+import pytest
+
+import src.keystore
+import src.simulator
+from src.crypto import derive_keypair
+from src.keystore import load_keystore, load_or_create_keystore
+from src.simulator import Simulator
+
+
+def test_keystore_roundtrip_and_mismatch(tmp_path):
+    path = tmp_path / "keys.bin"
+    names = [f"N{i}" for i in range(5)]
+    created = load_or_create_keystore(path, 3, names)
+    loaded = load_keystore(path, 3, names)
+    assert {n: kp.pk for n, kp in loaded.items()} == {n: derive_keypair(3, n).pk for n in names}
+    assert {n: kp.pk for n, kp in created.items()} == {n: kp.pk for n, kp in loaded.items()}
+
+    with pytest.raises(ValueError):
+        load_keystore(path, 4, names)
+    with pytest.raises(ValueError):
+        load_keystore(path, 3, names[:4])
+    # load_or_create tự build lại khi cache không khớp
+    assert len(load_or_create_keystore(path, 3, names[:4])) == 4
+    assert len(load_keystore(path, 3, names[:4])) == 4
+
+
+def test_simulator_keys_are_seeded(tmp_path):
+    a, b = Simulator(4, seed=5, accounts=2), Simulator(4, seed=5, accounts=2)
+    assert a.validators.pk_table == b.validators.pk_table
+    assert a.tx_pk_map == b.tx_pk_map
+    c = Simulator(4, seed=5, accounts=2, keystore=tmp_path / "k.bin")
+    assert c.validators.pk_table == a.validators.pk_table
+    assert c.tx_pk_map == a.tx_pk_map
+
+
+def test_large_validator_set_loads_keys_from_cache(tmp_path, monkeypatch):
+    derived = []
+
+    def counting(seed, name):
+        derived.append(name)
+        return derive_keypair(seed, name)
+
+    monkeypatch.setattr(src.keystore, "derive_keypair", counting)
+    monkeypatch.setattr(src.simulator, "derive_keypair", counting)
+    path = tmp_path / "k1000.bin"
+    first = Simulator(1000, seed=1, keystore=path)  # build cache
+    assert len(derived) == 1000
+    derived.clear()
+    sim = Simulator(1000, seed=1, keystore=path)
+    assert derived == []  # không derive lại key nào
+    assert len(sim.validators) == 1000
+    assert sim.validators.pk_table == first.validators.pk_table
@@ -0,0 +1,89 @@
+import unittest
+from src.block import build_block
+from src.consensus import VoteBook, make_vote
+from src.crypto import generate_keypair
+from src.light_client import LightClient, verify_state_proof
+from src.simulator import Simulator
+from src.state import State, make_tx
+
+class TestLightClient(unittest.TestCase):
+    def setUp(self):
+        self.validators = ["V1", "V2", "V3", "V4"]
+        self.pk_map = {}
+        self.signers = {}
+        for v in self.validators:
+            kp = generate_keypair()
+            self.pk_map[v] = kp.pk
+            self.signers[v] = kp.sk
+        self.vote_book = VoteBook(self.validators)
+
+    def _finalize(self, block, n=3):
+        for v in self.validators[:n]:
+            self.vote_book.add_vote(make_vote(v, block.header.height, block.hash, "PRECOMMIT", self.signers[v]))
+
+    def test_follow_chain_and_verify_state(self):
+        lc = LightClient(self.validators, self.pk_map)
+        st = State()
+        tx = make_tx("V1", "V1/k", "hello", 1, self.signers["V1"], self.pk_map["V1"])
+        b1 = build_block("GENESIS", 1, [tx], "V2", self.signers["V2"], self.pk_map, parent_state=st)
+        self._finalize(b1)
+        self.assertTrue(lc.update_from_votebook(b1.header, b1.hash, self.vote_book))
+        self.assertEqual(lc.tip_hash, b1.hash)
+
+        st.apply(tx)
+        self.assertTrue(lc.verify_state(1, st.prove("V1/k")))
+        self.assertTrue(lc.verify_state(1, st.prove("V1/missing")))
+        forged = st.prove("V1/k")
+        forged.value = "bye"
+        self.assertFalse(lc.verify_state(1, forged))
+
+    def test_reject_insufficient_precommits(self):
+        lc = LightClient(self.validators, self.pk_map)
+        b1 = build_block("GENESIS", 1, [], "V2", self.signers["V2"], self.pk_map)
+        self._finalize(b1, n=2)
+        self.assertFalse(lc.update(b1.header, b1.hash, self.vote_book.precommit_votes[1][b1.hash].values()))
+        self.assertEqual(lc.tip_height, 0)
+
+    def test_reject_broken_linkage_and_forged_header(self):
+        lc = LightClient(self.validators, self.pk_map)
+        b1 = build_block("NOT_GENESIS", 1, [], "V2", self.signers["V2"], self.pk_map)
+        self._finalize(b1)
+        self.assertFalse(lc.update_from_votebook(b1.header, b1.hash, self.vote_book))
+
+        b1 = build_block("GENESIS", 1, [], "V2", self.signers["V3"], self.pk_map)
+        self._finalize(b1)
+        self.assertFalse(lc.update_from_votebook(b1.header, b1.hash, self.vote_book))
+
+    def test_follow_chain_across_skipped_height(self):
+        lc = LightClient(self.validators, self.pk_map)
+        b1 = build_block("GENESIS", 1, [], "V2", self.signers["V2"], self.pk_map)
+        self._finalize(b1)
+        self.assertTrue(lc.update_from_votebook(b1.header, b1.hash, self.vote_book))
+        # Height 2 không finalize → block height 3 nối thẳng vào block height 1
+        b3 = build_block(b1.hash, 3, [], "V4", self.signers["V4"], self.pk_map)
+        self._finalize(b3)
+        self.assertTrue(lc.update_from_votebook(b3.header, b3.hash, self.vote_book))
+        self.assertEqual((lc.tip_height, lc.tip_hash), (3, b3.hash))
+        self.assertNotIn(2, lc.state_commits)
+        # Không quay lại height thấp hơn tip
+        self.assertFalse(lc.update_from_votebook(b1.header, b1.hash, self.vote_book))
+
+    def test_absence_proof_cannot_hide_key(self):
+        st = State({"a/x": "1", "b/y": "2"})
+        commit = st.commit()
+        proof = st.prove("a/x")
+        proof.value = None
+        self.assertFalse(verify_state_proof(commit, proof))
+
+    def test_follow_simulator(self):
+        sim = Simulator(4, seed=5)
+        sim.run_until(3)
+        node = sim.nodes["N0"]
+        lc = LightClient(sim.validator_ids, sim.pk_map)
+        for le in sorted(node.ledger, key=lambda le: le.height):
+            blk = node.blocks_by_height[le.height]
+            self.assertTrue(lc.update_from_votebook(blk.header, blk.hash, node.vote_book))
+        self.assertEqual(lc.tip_height, len(node.ledger))
+
+if __name__ == "__main__":
+    unittest.main()
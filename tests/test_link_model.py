@@ -0,0 +1,125 @@
+import pytest
+
+from src.link_model import LinkModel, region_matrix
+from src.logger import set_log_sink
+from src.network import UnreliableNetwork, Message
+from src.simulator import Simulator
+from src.state import make_tx
+
+NODES = ["A", "B", "C", "D"]
+
+
+def _msg(i, size=0):
+    return Message(msg_id=f"m{i}", kind="X", height=1, body={"pad": "x" * size})
+
+
+def _delays(net, src, dst, n):
+    out = []
+    for i in range(n):
+        net.send(src, dst, _msg(i))
+    while not net.idle():
+        t = net.pq[0][0]
+        net.step(lambda m, d: out.append((m.msg_id, d, t)))
+    return out
+
+
+def test_region_matrix():
+    regions = {"A": "eu", "B": "eu", "C": "us", "D": "asia"}
+    m = region_matrix(NODES, regions, {("eu", "us"): 40, ("us", "asia"): 70, ("eu", "asia"): 90}, local=2)
+    assert m[0] == [0, 2, 40, 90]
+    assert m[2][3] == m[3][2] == 70
+    with pytest.raises(ValueError):
+        region_matrix(NODES, regions, {("eu", "us"): 40})
+
+
+@pytest.mark.parametrize("dist", ["uniform", "lognormal", "pareto"])
+def test_delay_is_latency_plus_jitter(dist):
+    model = LinkModel(NODES, seed=1, latency=[[0, 10, 50, 50]] * 4, jitter=4, distribution=dist,
+                      drop_prob=0.0, dup_prob=0.0, batch=16)
+    set_log_sink(lambda line: None)
+    try:
+        for _ in range(40):
+            dropped, delay, dup = model.sample(1, _msg(0), 0)
+            assert not dropped and not dup and delay >= 10
+            dropped, delay, dup = model.sample(2, _msg(0), 0)
+            assert delay >= 50
+            if dist == "uniform":
+                assert delay <= 54
+    finally:
+        set_log_sink(None)
+
+
+def test_link_streams_are_independent_and_seeded():
+    def run(extra_traffic):
+        model = LinkModel(NODES, seed=7, jitter=20, drop_prob=0.3, dup_prob=0.3, batch=8)
+        if extra_traffic:
+            for _ in range(50):
+                model.sample(5, _msg(0), 0)  # link khác không làm lệch stream của link 1
+        return [model.sample(1, _msg(0), 0) for _ in range(30)]
+
+    assert run(False) == run(True)
+    other = LinkModel(NODES, seed=8, jitter=20, drop_prob=0.3, dup_prob=0.3, batch=8)
+    assert [other.sample(1, _msg(0), 0) for _ in range(30)] != run(False)
+
+
+def test_bandwidth_queues_messages_on_a_link():
+    model = LinkModel(NODES, seed=1, latency=5, jitter=0, bandwidth=100, drop_prob=0.0, dup_prob=0.0,
+                      size_fn=lambda msg: 250)
+    net = UnreliableNetwork(NODES, seed=1, model=model, bucket_cap=100)
+    set_log_sink(lambda line: None)
+    try:
+        got = _delays(net, "A", "B", 3)
+    finally:
+        set_log_sink(None)
+    # 250 byte / 100 byte/tick = 2.5 tick mỗi message, nối đuôi nhau trên link
+    assert [t for _, _, t in got] == [8, 10, 13]
+
+
+def test_simulator_with_link_model_is_deterministic():
+    def run():
+        lines = []
+        set_log_sink(lines.append)
+        try:
+            ids = [f"N{i}" for i in range(4)]
+            model = LinkModel.from_regions(ids, seed=3, regions={"N0": "eu", "N1": "eu", "N2": "us", "N3": "us"},
+                                           region_latency={("eu", "us"): 6}, jitter=2,
+                                           distribution="lognormal", bandwidth=5000)
+            sim = Simulator(4, seed=3, link_model=model)
+            for nid in sim.node_ids:
+                tx = make_tx(nid, f"{nid}/k", "v", 1, sim.signers[nid], sim.pk_map[nid])
+                for node in sim.nodes.values():
+                    node.receive_tx(tx)
+            sim.run_until(3)
+        finally:
+            set_log_sink(None)
+        return lines, [e.block_hash for e in sim.nodes["N0"].ledger]
+
+    (a, ledger), (b, _) = run(), run()
+    assert a == b and ledger
+
+
+def test_model_node_list_must_match():
+    with pytest.raises(ValueError):
+        UnreliableNetwork(NODES, seed=1, model=LinkModel(NODES[:3], seed=1))
+    with pytest.raises(ValueError):
+        LinkModel(NODES, seed=1, distribution="normal")
+
+
+def test_numpy_backend_is_seeded_and_links_independent():
+    pytest.importorskip("numpy")
+
+    def run(seed, extra_traffic):
+        model = LinkModel(NODES, seed=seed, jitter=20, distribution="pareto", drop_prob=0.3, dup_prob=0.3,
+                          batch=8, backend="numpy")
+        if extra_traffic:
+            for _ in range(50):
+                model.sample(5, _msg(0), 0)
+        return [model.sample(1, _msg(0), 0) for _ in range(30)]
+
+    ref = run(7, False)
+    assert run(7, True) == ref
+    assert run(8, False) != ref
+    assert all(isinstance(d, int) and d >= 2 for dropped, d, _ in ref if not dropped)
+    python = LinkModel(NODES, seed=7, jitter=20, distribution="pareto", drop_prob=0.3, dup_prob=0.3,
+                       batch=8, backend="python")
+    assert python.backend == "python" and [python.sample(1, _msg(0), 0) for _ in range(30)] != ref
@@ -0,0 +1,90 @@
+import json
+
+from src.log_index import LogIndex, index_paths
+from src.logger import set_log_sink
+from src.simulator import Simulator
+
+
+def _write(path, recs):
+    path.write_text("".join(json.dumps(r, sort_keys=True) + "\n" for r in recs), encoding="utf-8")
+
+
+RECS = [
+    {"component": "simulator", "event": "PROPOSE_BLOCK", "height": 1, "proposer": "N1"},
+    {"component": "network", "event": "SEND", "time": 0, "src": "N1", "dst": "N0", "msg_id": "blk_1", "height": 1},
+    {"component": "network", "event": "DROP", "time": 0, "src": "N1", "dst": "N2", "msg_id": "blk_1", "height": 1},
+    {"component": "network", "event": "DELIVER", "time": 3, "src": "N1", "dst": "N0", "kind": "BLOCK", "msg_id": "blk_1", "height": 1},
+    {"component": "state", "event": "COMMIT", "size": 0, "state_hash": "x"},
+    {"component": "node", "event": "RECEIVE_VOTE", "node_id": "N0", "validator": "N1", "phase": "PREVOTE", "height": 1},
+    {"component": "node", "event": "RECEIVE_VOTE", "node_id": "N0", "validator": "N2", "phase": "PREVOTE", "height": 1},
+    {"component": "consensus", "event": "FINALIZE", "height": 1},
+    {"component": "node", "event": "RECEIVE_VOTE", "node_id": "N1", "validator": "N0", "phase": "PRECOMMIT", "height": 1},
+    {"component": "network", "event": "DEFER_BODY", "time": 5, "dst": "N2", "msg_id": "body_1", "height": 1},
+    {"component": "simulator", "event": "HEIGHT_FINALIZED", "height": 1},
+    {"component": "simulator", "event": "PROPOSE_BLOCK", "height": 2, "proposer": "N2"},
+    {"component": "network", "event": "DUP", "time": 6, "src": "N2", "dst": "N0", "msg_id": "blk_2", "height": 2},
+    {"component": "network", "event": "DELIVER", "time": 7, "src": "N2", "dst": "N0", "kind": "BLOCK", "msg_id": "blk_2", "height": 2},
+    {"component": "simulator", "event": "HEIGHT_FINALIZED", "height": 2},
+]
+
+
+def test_index_queries(tmp_path):
+    log = tmp_path / "runs.log"
+    _write(log, RECS)
+    idx = LogIndex.build(log)
+
+    assert idx.total_records == len(RECS)
+    # COMMIT không có height → gán vào height 1
+    assert idx.heights[1].records == 11
+    assert [r["event"] for r in idx.timeline(1)] == ["SEND", "DROP", "DELIVER", "DEFER_BODY"]
+    assert idx.link_counts(1) == {("N1", "N2"): {"DROP": 1}, ("*", "N2"): {"DEFER_BODY": 1}}
+    assert idx.link_counts()[("N2", "N0")] == {"DUP": 1}
+    assert idx.vote_order(1) == [("N0", "N1", "PREVOTE"), ("N0", "N2", "PREVOTE")]
+    assert idx.slowest() == [(1, 5), (2, 2)]
+    assert idx.counts("nodes", height=2) == {"N0": 2}
+    assert [r["event"] for r in idx.records(1, node="N1")] == ["RECEIVE_VOTE"]
+
+
+def test_sidecar_reload_and_staleness(tmp_path):
+    log = tmp_path / "runs.log"
+    _write(log, RECS)
+    built = LogIndex.build(log)
+    assert all(p.exists() for p in index_paths(log))
+
+    loaded = LogIndex.load(log)
+    assert loaded is not None
+    assert loaded.slowest() == built.slowest()
+    assert list(loaded.records(2)) == list(built.records(2))
+
+    # Log thay đổi → index cũ bị coi là stale và open() index lại
+    _write(log, RECS[:5])
+    assert LogIndex.load(log) is None
+    assert LogIndex.open(log).total_records == 5
+
+
+def test_export_columns(tmp_path):
+    log = tmp_path / "runs.log"
+    _write(log, RECS)
+    idx = LogIndex.build(log, save=False)
+    cols = idx.columns()
+    assert cols["height"] == [1, 2]
+    assert cols["duration"] == [5, 2]
+    assert cols["drops"] == [1, 0]
+    out = idx.export_csv(tmp_path / "summary.csv")
+    lines = out.read_text(encoding="utf-8").splitlines()
+    assert lines[0].startswith("height,records,")
+    assert len(lines) == 3
+
+
+def test_index_real_run(tmp_path):
+    log = tmp_path / "runs.log"
+    with log.open("w", encoding="utf-8") as f:
+        set_log_sink(f.write)
+        try:
+            Simulator(4, seed=3).run_until(3)
+        finally:
+            set_log_sink(None)
+    idx = LogIndex.build(log)
+    assert sorted(idx.heights) == [1, 2, 3]
+    assert all(d >= 0 for _, d in idx.slowest())
+    assert len(idx.vote_order(1)) > 0
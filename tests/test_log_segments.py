@@ -0,0 +1,79 @@
+import gzip
+import json
+
+import pytest
+
+from src.logger import log_event, log_lines, set_log_sink, set_log_writer, digest_checkpoint
+from src.log_segments import SegmentWriter, iter_log_lines, read_manifest, segmented_log
+from src.simulator import Simulator
+
+
+def _lines(n, pad=20):
+    return [json.dumps({"i": i, "pad": "x" * pad}) + "\n" for i in range(n)]
+
+
+@pytest.mark.parametrize("compress", ["gzip", "lzma", None])
+def test_rotation_by_bytes_and_transparent_read(tmp_path, compress):
+    w = SegmentWriter(tmp_path / "run", max_bytes=200, compress=compress)
+    lines = _lines(30)
+    for l in lines:
+        w.write_lines([l])
+    w.close()
+    meta = read_manifest(tmp_path / "run")
+    assert meta["closed"] and len(meta["segments"]) > 3
+    assert sum(s["records"] for s in meta["segments"]) == 30
+    ext = {"gzip": ".gz", "lzma": ".xz", None: ".log"}[compress]
+    assert all(s["file"].endswith(ext) for s in meta["segments"])
+    assert len(list((tmp_path / "run").glob("seg-*"))) == len(meta["segments"])
+    assert list(iter_log_lines(tmp_path / "run")) == lines
+
+
+def test_rotation_by_height_and_run_dir_is_not_reused(tmp_path):
+    w = SegmentWriter.for_run(tmp_path, "r1", seed=7, max_heights=2)
+    for h in range(1, 6):
+        w.write_lines(_lines(3))
+        w.end_height(h)
+    w.close()
+    segs = read_manifest(tmp_path / "r1-seed7")["segments"]
+    assert [(s["first_height"], s["last_height"]) for s in segs] == [(1, 2), (3, 4), (5, 5)]
+    with pytest.raises(FileExistsError):
+        SegmentWriter.for_run(tmp_path, "r1", seed=7)
+
+
+def test_logger_routes_to_writer_and_matches_plain_log(tmp_path):
+    def run():
+        sim = Simulator(4, seed=3)
+        sim.run_until(3)
+
+    plain = []
+    set_log_sink(plain.append)
+    try:
+        run()
+    finally:
+        set_log_sink(None)
+    with segmented_log(tmp_path, "sim", 3, max_bytes=20000, compress="gzip") as w:
+        run()
+    assert w.meta["closed"] and len(w.meta["segments"]) > 1
+    assert "".join(iter_log_lines(w.dir)) == "".join(plain)
+
+
+def test_log_lines_and_checkpoint_go_to_writer(tmp_path):
+    w = SegmentWriter(tmp_path / "run", max_heights=1, compress=None)
+    prev = set_log_writer(w)
+    try:
+        log_event(component="t", event="A")
+        log_lines(_lines(2))
+        digest_checkpoint(1)
+        log_event(component="t", event="B")
+    finally:
+        set_log_writer(prev)
+        w.close()
+    segs = read_manifest(w.dir)["segments"]
+    assert [s["records"] for s in segs] == [3, 1]
+
+
+def test_plain_compressed_file(tmp_path):
+    p = tmp_path / "runs.log.gz"
+    with gzip.open(p, "wt", encoding="utf-8") as f:
+        f.writelines(_lines(5))
+    assert list(iter_log_lines(p)) == _lines(5)
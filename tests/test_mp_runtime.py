@@ -0,0 +1,33 @@
+from src.logger import start_digest, stop_digest
+from src.mp_runtime import MultiProcessRuntime
+from src.shm_ring import ShmRing
+from src.simulator import Simulator
+import multiprocessing
+
+
+def test_shm_ring_wraps_records():
+    ring = ShmRing(64, multiprocessing.get_context())
+    try:
+        for i in range(20):
+            payload = bytes([i]) * (i % 7 + 10)
+            ring.push(payload)
+            assert ring.pop(timeout=1) == payload
+        assert ring.pop(timeout=0.01) is None
+    finally:
+        ring.close()
+
+
+def test_multiprocess_run_matches_single_process_log():
+    start_digest()
+    Simulator(4, seed=17).run_until(3)
+    seq = stop_digest()
+
+    start_digest()
+    with MultiProcessRuntime(4, seed=17, workers=2) as rt:
+        rt.run_until(3)
+        ledgers = rt.ledgers()
+    mp = stop_digest()
+
+    assert sorted(ledgers) == ["N0", "N1", "N2", "N3"]
+    assert all(len(entries) == 3 for entries in ledgers.values())
+    assert mp.checkpoints == seq.checkpoints
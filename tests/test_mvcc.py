@@ -0,0 +1,89 @@
+import pytest
+
+from src.block import build_block, verify_body
+from src.crypto import derive_keypair, state_hash
+from src.mvcc import VersionedStore
+from src.simulator import Simulator
+from src.state import make_tx
+
+
+def _store():
+    st = VersionedStore()
+    st.commit_height(1, {"a/x": "1", "a/y": "1"}, ["t1"])
+    st.commit_height(2, {"a/x": "2"}, ["t2"])
+    st.commit_height(4, {"a/x": "4", "a/z": "4"}, ["t4"])  # height 3 bị bỏ qua
+    return st
+
+
+def test_point_in_time_get_and_snapshot():
+    st = _store()
+    assert st.get("a/x", 0) is None
+    assert [st.get("a/x", h) for h in range(1, 5)] == ["1", "2", "2", "4"]
+    assert st.get("a/x") == "4"
+    assert st.history("a/x") == [(1, "1"), (2, "2"), (4, "4")]
+
+    snap = st.snapshot(2)
+    assert dict(snap.kv) == {"a/x": "2", "a/y": "1"}
+    assert "t2" in snap.executed_txs and "t4" not in snap.executed_txs
+    assert len(snap.executed_txs) == 2 and len(st.snapshot(3).executed_txs) == 2
+    assert snap.commit_hash() == state_hash({"a/x": "2", "a/y": "1"})
+
+    with pytest.raises(KeyError):
+        st.get("a/x", 5)
+    with pytest.raises(ValueError):
+        st.commit_height(4, {})
+
+
+def test_child_overlay_does_not_touch_store():
+    st = _store()
+    child = st.snapshot(2).child()
+    kp = derive_keypair(0, "a")
+    tx = make_tx("a", "a/x", "new", 9, kp.sk, kp.pk)
+    assert child.apply(tx)
+    assert not child.apply(tx)  # replay trong overlay
+    assert child.kv["a/x"] == "new" and child.kv["a/y"] == "1"
+    assert st.get("a/x", 2) == "2" and "a:a/x:9" not in st.snapshot(2).executed_txs
+    assert child.commit() == state_hash({"a/x": "new", "a/y": "1"})
+
+
+def test_retention_prunes_old_versions():
+    st = VersionedStore(retention=2)
+    for h in range(1, 7):
+        st.commit_height(h, {"k/a": str(h)} if h % 2 else {"k/b": str(h)})
+    assert st.oldest == 4
+    assert st.get("k/a", 4) == "3" and st.get("k/b", 4) == "4"
+    assert st.history("k/a") == [(3, "3"), (5, "5")]
+    assert st.history("k/b") == [(4, "4"), (6, "6")]
+    with pytest.raises(KeyError):
+        st.snapshot(3)
+
+
+def test_verify_against_historical_parent():
+    kp = derive_keypair(0, "P")
+    pk_map = {"P": kp.pk}
+    st = VersionedStore()
+    st.commit_height(1, {"P/k": "v1"}, ["P:P/k:1"])
+    st.commit_height(2, {"P/k": "v2"}, ["P:P/k:2"])
+    txs = [make_tx("P", "P/other", "fork", 3, kp.sk, kp.pk)]
+    # Block nhánh rẽ xây trên height 1 (không phải tip)
+    blk = build_block("H1", 2, txs, "P", kp.sk, pk_map, parent_state=st.snapshot(1))
+    assert verify_body(blk, pk_map, parent_state=st.snapshot(1))
+    assert not verify_body(blk, pk_map, parent_state=st.snapshot(2))
+    assert st.get("P/k", 1) == "v1"
+
+
+def test_simulator_node_history():
+    sim = Simulator(4, seed=6, accounts=2, state_history=True)
+    kp = sim.account_keys["A0"]
+    for h in range(1, 4):
+        tx = make_tx("A0", "A0/k", f"h{h}", h, kp.sk, kp.pk)
+        for nid in sim.node_ids:
+            sim.submit_tx(tx, origin=nid, gossip=False)
+        sim.run_until(h)
+    node = sim.nodes["N0"]
+    assert [node.state_at(e.height).get("A0/k") for e in node.ledger] == [f"h{e.height}" for e in node.ledger]
+    tip = node.state_at(node.ledger[-1].height)
+    assert dict(tip.kv) == node.state.kv
+    assert tip.commit_hash() == node.ledger[-1].state_commit
+    with pytest.raises(ValueError):
+        Simulator(4, seed=6).nodes["N0"].state_at(1)
@@ -0,0 +1,77 @@
+from src.network import UnreliableNetwork, Message
+
+
+def _net():
+    net = UnreliableNetwork(["A", "B", "C"], seed=1, drop_prob=0.0, dup_prob=0.0,
+                            delay_min=2, delay_max=2)
+    return net
+
+
+def _msg(i, kind="X"):
+    return Message(msg_id=f"m{i}", kind=kind, height=1, body={})
+
+
+def test_step_batch_drains_one_timestamp_in_seq_order():
+    net = _net()
+    for i in range(3):
+        net.send("A", "B", _msg(i))
+    net.time = 1
+    net.send("A", "C", _msg(3))  # t = 3
+
+    batches = []
+    assert net.step_batch(batch_handler=batches.append) == 3
+    assert net.time == 2
+    assert [[m.msg_id for m, _ in b] for b in batches] == [["m0", "m1", "m2"]]
+
+    got = []
+    assert net.step_batch(lambda m, d: got.append((m.msg_id, d))) == 1
+    assert got == [("m3", "C")] and net.time == 3
+    assert net.step_batch(lambda m, d: None) == 0 and net.time == 4
+
+
+def test_same_tick_sends_go_to_next_batch():
+    net = _net()
+    net.delay_max = net.delay_min = 0
+    net.send("A", "B", _msg(0))
+    seen = []
+
+    def handler(msg, dst):
+        seen.append(msg.msg_id)
+        if msg.msg_id == "m0":
+            net.send("B", "C", _msg(1))  # cùng t
+
+    assert net.step_batch(handler) == 1
+    assert seen == ["m0"]
+    assert net.step_batch(handler) == 1
+    assert seen == ["m0", "m1"] and net.time == 0
+
+
+def test_run_until_time_and_stop():
+    net = _net()
+    for i in range(4):
+        net.time = i
+        net.send("A", "B", _msg(i))  # t = i + 2
+    net.time = 0
+
+    got = []
+    assert net.run_until_time(3, lambda m, d: got.append(m.msg_id)) == 2
+    assert got == ["m0", "m1"] and net.time == 3
+
+    assert net.run_until_time(100, lambda m, d: got.append(m.msg_id), stop=lambda: True) == 1
+    assert got == ["m0", "m1", "m2"] and net.time == 4
+
+
+def test_batch_unblocks_once_per_tick():
+    net = _net()
+    net.capacity = 1
+    net.tokens = type(net.tokens)("d", [1.0]) * len(net.tokens)
+    net.rate = 0
+    net.send("A", "B", _msg(0))
+    net.send("A", "B", _msg(1))  # hết token → block link A→B
+    assert ("A", "B") in net.blocked_links
+    net.step_batch(lambda m, d: None)  # t = 2: vẫn còn block
+    assert ("A", "B") in net.blocked_links
+    net.time = net.block_duration
+    net.send("A", "C", _msg(2))
+    net.step_batch(lambda m, d: None)
+    assert net.blocked_links == {}
@@ -0,0 +1,84 @@
+from dataclasses import replace
+
+from src.block import build_block, verify_body
+from src.crypto import derive_keypair
+from src.exec_cache import execute_txs
+from src.logger import set_log_sink
+from src.parallel_exec import ExecPool, sender_groups
+from src.simulator import Simulator
+from src.state import State, make_tx
+from src.workload import Workload, WorkloadConfig
+
+
+def _capture(fn):
+    lines = []
+    set_log_sink(lines.append)
+    try:
+        res = fn()
+    finally:
+        set_log_sink(None)
+    return res, lines
+
+
+def _mixed_block():
+    keys = {f"S{i}": derive_keypair(2, f"S{i}") for i in range(6)}
+    pk_map = {s: kp.pk for s, kp in keys.items()}
+    txs = []
+    for n in range(8):
+        for s, kp in keys.items():
+            txs.append(make_tx(s, f"{s}/k{n % 3}", f"v{n}", n, kp.sk, kp.pk))
+    txs.append(txs[3])                                      # replay trong block
+    kp = keys["S0"]
+    txs.append(make_tx("S0", "S1/k0", "steal", 99, kp.sk, kp.pk))   # sai ownership
+    txs.append(replace(txs[0], value="tampered"))            # sai chữ ký
+    txs.append(make_tx("X", "X/k", "v", 0, kp.sk, kp.pk))   # sender lạ
+    parent = State()
+    parent.apply(txs[1])                                    # đã execute ở parent
+    return pk_map, txs, parent, keys
+
+
+def test_sender_groups_keep_order():
+    _, txs, _, _ = _mixed_block()
+    groups = sender_groups(txs)
+    for sender, group in groups.items():
+        assert all(tx.sender == sender for _, tx in group)
+        idx = [i for i, _ in group]
+        assert idx == sorted(idx)
+    assert sum(len(g) for g in groups.values()) == len(txs)
+
+
+def test_parallel_matches_serial_commit_and_log():
+    pk_map, txs, parent, _ = _mixed_block()
+    pool = ExecPool(4)
+    try:
+        serial, log_s = _capture(lambda: execute_txs(parent, txs, pk_map))
+        par, log_p = _capture(lambda: execute_txs(parent, txs, pk_map, pool=pool))
+    finally:
+        pool.shutdown()
+    assert par == serial
+    assert log_p == log_s
+    assert len(serial.applied) == 6 * 8 - 1  # trừ tx đã có ở parent
+
+
+def test_build_and_verify_with_pool():
+    pk_map, txs, parent, keys = _mixed_block()
+    pool = ExecPool(3)
+    try:
+        kp = keys["S0"]
+        blk = build_block("GENESIS", 1, txs, "S0", kp.sk, pk_map, parent_state=parent, pool=pool)
+        assert verify_body(blk, pk_map, parent_state=parent)
+        assert verify_body(blk, pk_map, parent_state=parent, pool=pool)
+    finally:
+        pool.shutdown()
+
+
+def test_simulator_with_exec_workers_is_log_identical():
+    def run(workers):
+        with Simulator(4, seed=4, accounts=8, exec_workers=workers, exec_cache_size=0) as sim:
+            Workload(sim, WorkloadConfig(accounts=8, rate=12), seed=4).run(3)
+        return sim
+    (a, log_a), (b, log_b) = _capture(lambda: run(0)), _capture(lambda: run(4))
+    assert log_a == log_b
+    assert a.nodes["N0"].state.kv == b.nodes["N0"].state.kv
+    # close() (cuối with) dừng thread pool; node chạy tiếp tuần tự
+    assert b.exec_pool is None and b.nodes["N0"].exec_pool is None
@@ -0,0 +1,32 @@
+import pytest
+from src.logger import start_digest, stop_digest
+from src.pdes import ConsensusModel, SequentialEngine, ParallelEngine
+
+
+def _digest_of(engine_factory):
+    start_digest()
+    engine = engine_factory()
+    engine.run()
+    d = stop_digest()
+    return engine, d
+
+
+def test_parallel_engine_matches_sequential_log():
+    model = ConsensusModel(6, target_height=3)
+    net = dict(drop_prob=0.0, dup_prob=0.2, delay_min=2, delay_max=6)
+
+    seq, d_seq = _digest_of(lambda: SequentialEngine(model, seed=8, **net))
+    assert min(lp.finalized_height() for lp in seq.part.lps.values()) >= 3
+
+    _, d_inproc = _digest_of(lambda: ParallelEngine(model, seed=8, workers=3, processes=False, **net))
+    _, d_proc = _digest_of(lambda: ParallelEngine(model, seed=8, workers=2, processes=True, **net))
+
+    assert d_seq.records > 0
+    assert (d_inproc.records, d_inproc.hexdigest()) == (d_seq.records, d_seq.hexdigest())
+    assert (d_proc.records, d_proc.hexdigest()) == (d_seq.records, d_seq.hexdigest())
+
+
+def test_lookahead_required():
+    model = ConsensusModel(4, target_height=1)
+    with pytest.raises(ValueError):
+        SequentialEngine(model, seed=1, delay_min=0)
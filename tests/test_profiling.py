@@ -0,0 +1,64 @@
+import src.crypto
+import src.state
+from src.logger import set_log_sink
+from src.node import Node
+from src.profiling import Profiler
+from src.simulator import Simulator
+
+
+def _sim(seed=1):
+    sim = Simulator(4, seed=seed)
+    sim.network.rate = 1000
+    return sim
+
+
+def _capture(fn):
+    lines = []
+    set_log_sink(lines.append)
+    try:
+        fn()
+    finally:
+        set_log_sink(None)
+    return lines
+
+
+def test_profiler_does_not_change_the_run_and_restores_patches():
+    finalize, verify = Node.__dict__["finalize"], src.state.verify
+    plain = _sim()
+    a = _capture(lambda: plain.run_until(4))
+    sim = _sim()
+    prof = Profiler(sim, memory=True)
+    b = _capture(lambda: sim.run_until(4))
+    assert a == b
+    assert Node.__dict__["finalize"] is finalize and src.state.verify is verify
+    assert [hp.height for hp in prof.heights] == [1, 2, 3, 4]
+
+
+def test_timers_split_inclusive_and_exclusive():
+    sim = _sim()
+    prof = Profiler(sim)
+    _capture(lambda: sim.run_until(3))
+    rows = prof.breakdown()
+    assert rows["crypto.verify"]["calls"] > 0 and rows["node.finalize"]["calls"] > 0
+    for c, r in rows.items():
+        assert 0 <= r["exclusive"] <= r["inclusive"] + 1e-9
+    # network.step gọi handle_message → verify/finalize nằm bên trong nó
+    assert rows["network.step"]["exclusive"] < rows["network.step"]["inclusive"]
+    assert abs(sum(r["share"] for r in rows.values()) - 1.0) < 0.05
+    hp = prof.heights[0]
+    assert hp.calls["crypto.verify"] > 0 and hp.wall > 0
+
+
+def test_memory_and_sampling(tmp_path):
+    sim = _sim()
+    prof = Profiler(sim, timers=False, memory=True, sampling=True, interval=0.001)
+    _capture(lambda: sim.run_until(4))
+    assert all(c[0] == 0 for c in prof.totals.values())
+    assert any(hp.memory for hp in prof.heights)
+    assert prof.samples
+    out = tmp_path / "run.folded"
+    n = prof.write_collapsed(out)
+    lines = out.read_text().splitlines()
+    assert n == len(lines) > 0
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 0 and ";" in stack
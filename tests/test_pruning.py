@@ -0,0 +1,90 @@
+from src.checkpoint import Checkpointer
+from src.consensus import make_vote
+from src.logger import set_log_sink
+from src.pruning import HeightPruner, memory_report
+from src.simulator import Simulator
+from src.state import make_tx
+
+
+def _quiet(fn):
+    set_log_sink(lambda line: None)
+    try:
+        return fn()
+    finally:
+        set_log_sink(None)
+
+
+def _run(sim, start, end):
+    for h in range(start, end + 1):
+        for nid in sim.node_ids:
+            tx = make_tx(nid, f"{nid}/k", f"h{h}", h, sim.signers[nid], sim.pk_map[nid])
+            for node in sim.nodes.values():
+                node.receive_tx(tx)
+        sim.run_until(h)
+
+
+def test_pruned_run_keeps_per_height_data_flat():
+    ref = Simulator(4, seed=2)
+    sim = Simulator(4, seed=2)
+    pruner = HeightPruner(sim)
+    _quiet(lambda: (_run(ref, 1, 5), _run(sim, 1, 5)))
+
+    # Cùng chuỗi block và state như khi không prune
+    for nid in sim.node_ids:
+        assert [e.block_hash for e in sim.nodes[nid].ledger] == [e.block_hash for e in ref.nodes[nid].ledger]
+        assert sim.nodes[nid].state.kv == ref.nodes[nid].state.kv
+    assert pruner.complete == 5 and pruner.pruned_below == 6
+
+    node = sim.nodes["N1"]
+    assert node.blocks_by_height == {}
+    assert not node.vote_book.prevotes and not node.vote_book.precommit_votes
+    assert len(ref.nodes["N1"].blocks_by_height) == 5
+
+    mid = memory_report(sim)
+    _quiet(lambda: _run(sim, 6, 9))
+    end = memory_report(sim)
+    for comp in ("node.blocks_by_height", "votebook.tallies", "votebook.evidence", "network.accepted_headers"):
+        assert end[comp]["entries"] == mid[comp]["entries"] == 0
+    assert end["node.ledger"]["entries"] == 4 * 9  # ledger là bản ghi chuỗi, không prune
+    # Chỉ hash chưa prune (tip + GENESIS) còn là parent hợp lệ
+    assert end["node.ledger_hashes"]["entries"] == mid["node.ledger_hashes"]["entries"] == 4 * 2
+
+
+def test_late_votes_for_pruned_heights_are_ignored():
+    sim = Simulator(4, seed=9)
+    HeightPruner(sim)
+    _quiet(lambda: _run(sim, 1, 3))
+    node = sim.nodes["N0"]
+    assert node.vote_book.pruned_below == 4
+    old = sim.nodes["N1"].ledger[0]
+    v = _quiet(lambda: make_vote("N1", old.height, old.block_hash, "PRECOMMIT", sim.signers["N1"]))
+    _quiet(lambda: node.receive_vote(v))
+    assert old.height not in node.vote_book.precommits
+    assert old.height not in node.vote_book.finalized
+
+
+def test_retention_prunes_without_full_finalization():
+    sim = Simulator(4, seed=2)
+    pruner = HeightPruner(sim, retention=2)
+    pruner.on_finalize = lambda *a: None  # không bao giờ thấy height "xong" → chỉ retention
+    sim.finalize_hooks[-1] = pruner.on_finalize
+    _quiet(lambda: _run(sim, 1, 6))
+    assert pruner.pruned_below == 5
+    assert sorted(sim.nodes["N2"].blocks_by_height) == [5, 6]
+    assert min(sim.nodes["N2"].vote_book.finalized) == 5
+
+
+def test_checkpoint_restores_pruned_watermark(tmp_path):
+    sim = Simulator(4, seed=6, header_body=True)
+    HeightPruner(sim, retention=3)
+    ck = Checkpointer(sim, tmp_path / "sim.ckpt")
+    _quiet(lambda: (_run(sim, 1, 3), ck.save(), _run(sim, 4, 8), ck.save()))
+    assert any(sim.network.accepted_headers.values())
+
+    restored = _quiet(lambda: Checkpointer.load(tmp_path / "sim.ckpt")).sim
+    for nid in sim.node_ids:
+        a, b = sim.nodes[nid], restored.nodes[nid]
+        assert b.pruned_below == a.pruned_below == 6
+        assert set(b.blocks_by_height) == set(a.blocks_by_height)
+        assert b.ledger_hashes == a.ledger_hashes
+        assert dict(restored.network.accepted_headers[nid]) == dict(sim.network.accepted_headers[nid])
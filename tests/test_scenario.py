@@ -0,0 +1,100 @@
+import json
+
+import pytest
+
+from src.logger import set_log_sink
+from src.network import UnreliableNetwork, Message
+from src.scenario import ScenarioEngine, Partition, Degrade, Crash, Join, parse_timeline
+from src.simulator import Simulator
+
+HALVES = [["N0", "N1"], ["N2", "N3"]]
+
+
+def _capture(fn):
+    lines = []
+    set_log_sink(lines.append)
+    try:
+        fn()
+    finally:
+        set_log_sink(None)
+    return lines
+
+
+def _sim(seed=42):
+    sim = Simulator(4, seed=seed)
+    sim.network.rate = 1000  # run dài: không để token bucket làm nghẽn
+    return sim
+
+
+def test_empty_timeline_does_not_change_the_run():
+    plain = _sim()
+    a = _capture(lambda: plain.run_until(6))
+    sim = _sim()
+    ScenarioEngine(sim, [])
+    b = _capture(lambda: sim.run_until(6))
+    assert a == b
+
+
+def test_partition_halts_finality_then_recovers():
+    sim = _sim()
+    eng = ScenarioEngine(sim, [Partition(50, 150, HALVES)])
+    lines = _capture(lambda: eng.run(250))
+    stalled = [h for h, t in eng.quorum_at.items() if 52 <= t < 150]
+    assert stalled == []  # 2/2: không bên nào đủ 2/3
+    (rep,) = eng.report()
+    assert rep.wasted > 0 and rep.sent >= rep.wasted
+    assert rep.recover_at is not None and rep.recover_at >= 150
+    assert rep.time_to_recover == rep.recover_at - 150
+    assert sim.network.faults == 0 and not any(sim.network.cut)
+    events = [json.loads(l)["event"] for l in lines]
+    assert events.count("FAULT_START") == events.count("FAULT_END") == 1
+    assert "FAULT_DROP" in events
+
+
+def test_crash_and_delayed_join():
+    sim = _sim()
+    eng = ScenarioEngine(sim, [Crash(40, 120, "N3"), Join(at=80, node="N2")])
+    seen = {}
+
+    def probe(now):
+        if 60 <= now < 80:
+            seen.setdefault("crashed", set(sim.crashed))
+    sim.step_hooks.append(probe)
+    lines = _capture(lambda: eng.run(200))
+    assert seen["crashed"] == {"N3", "N2"}
+    assert not sim.crashed
+    assert len(sim.nodes["N2"].ledger) < len(sim.nodes["N0"].ledger)
+    skips = [json.loads(l) for l in lines if '"PROPOSE_SKIP"' in l]
+    assert skips and {r["proposer"] for r in skips} <= {"N3", "N2"}
+    crash, join = eng.report()
+    assert crash.recover_at is not None and join.start == 0 and join.end == 80
+
+
+def test_degrade_adds_delay_and_overlapping_cuts_stack():
+    net = UnreliableNetwork(["A", "B", "C"], seed=1, drop_prob=0.0, dup_prob=0.0, delay_min=1, delay_max=1)
+    link = net.link_id("A", "B")
+    net.set_link_fault(link, delay=5)
+    net.set_link_fault(link, cut=1)
+    net.set_link_fault(link, cut=1)
+    net.set_link_fault(link, cut=-1)
+    lines = _capture(lambda: net.send("A", "B", Message("m0", "X", 1, {})))
+    assert '"FAULT_DROP"' in lines[0] and net.fault_drops == 1
+    net.set_link_fault(link, cut=-1)
+    _capture(lambda: net.send("A", "B", Message("m1", "X", 1, {})))
+    assert net.pq[0][0] == 6
+    net.set_link_fault(link, delay=-5)
+    assert net.faults == 0
+
+
+def test_parse_timeline():
+    faults = parse_timeline([
+        {"kind": "partition", "start": 1, "end": 5, "groups": HALVES},
+        {"kind": "degrade", "start": 2, "end": 3, "links": [["N0", "N1"]], "drop_prob": 0.5},
+        {"kind": "join", "at": 10, "node": "N2"},
+    ])
+    assert isinstance(faults[0], Partition) and faults[1].links == [("N0", "N1")]
+    assert isinstance(faults[1], Degrade) and isinstance(faults[2], Join)
+    with pytest.raises(ValueError):
+        parse_timeline([{"kind": "meteor", "start": 0, "end": 1}])
+    with pytest.raises(ValueError):
+        ScenarioEngine(_sim(), [Crash(5, 10, "N99")])
@@ -0,0 +1,91 @@
+import pickle
+import random
+from collections import ChainMap
+
+from src.crypto import state_hash, encode_kv_items
+from src.light_client import verify_state_proof
+from src.sorted_kv import SortedKV
+from src.state import State
+
+
+def _random_kv(rng, n=200):
+    return {f"{rng.choice('abcde')}/{rng.randrange(1000):04d}": str(rng.random()) for _ in range(n)}
+
+
+def test_sorted_keys_follow_writes():
+    rng = random.Random(1)
+    kv = SortedKV()
+    ref = {}
+    for _ in range(2000):
+        k = f"{rng.choice('xyz')}/{rng.randrange(300)}"
+        op = rng.random()
+        if op < 0.6:
+            kv[k] = ref[k] = str(op)
+        elif op < 0.8:
+            assert kv.pop(k, None) == ref.pop(k, None)
+        else:
+            kv.update({k: "u"})
+            ref[k] = "u"
+    assert kv == ref
+    assert kv.sorted_keys() == sorted(ref)
+    counts = {}
+    for k in ref:
+        counts[k.split("/")[0]] = counts.get(k.split("/")[0], 0) + 1
+    assert kv.sender_counts() == counts
+
+
+def test_scan_and_range():
+    kv = SortedKV({"a/1": "1", "a/2": "2", "ab/1": "3", "b/1": "4", "b/2": "5"})
+    assert list(kv.scan("a/")) == [("a/1", "1"), ("a/2", "2")]
+    assert list(kv.scan("a")) == [("a/1", "1"), ("a/2", "2"), ("ab/1", "3")]
+    assert list(kv.scan("c/")) == []
+    assert [k for k, _ in kv.range("a/2", "b/2")] == ["a/2", "ab/1", "b/1"]
+    assert [k for k, _ in kv.range(None, "a/2")] == ["a/1"]
+    assert [k for k, _ in kv.range("b/", None)] == ["b/1", "b/2"]
+    assert kv.count_for("a") == 2 and kv.count_for("zz") == 0
+
+
+def test_copy_and_pickle_keep_order():
+    kv = SortedKV({"b/1": "x", "a/1": "y"})
+    for other in (kv.copy(), SortedKV(kv), pickle.loads(pickle.dumps(kv))):
+        assert isinstance(other, SortedKV)
+        assert other.sorted_keys() == ["a/1", "b/1"]
+        other["a/0"] = "z"
+        assert kv.sorted_keys() == ["a/1", "b/1"]  # không share list với bản gốc
+
+
+def test_state_commit_matches_plain_dict():
+    rng = random.Random(7)
+    data = _random_kv(rng)
+    assert state_hash(SortedKV(data)) == state_hash(dict(data))
+    st = State(data)
+    assert isinstance(st.kv, SortedKV)
+    assert st.commit_hash() == state_hash(dict(data))
+    child = State(st.kv)
+    child.kv["a/zzzz"] = "1"
+    assert "a/zzzz" not in st.kv
+
+
+def test_state_scan_range_and_counts():
+    st = State({"alice/b": "1", "alice/a": "2", "bob/x": "3"})
+    assert list(st.scan("alice/")) == [("alice/a", "2"), ("alice/b", "1")]
+    assert list(st.range("alice/b", "bob/y")) == [("alice/b", "1"), ("bob/x", "3")]
+    assert st.sender_key_counts() == {"alice": 2, "bob": 1}
+    # kv dạng overlay (MVCC child) → fallback sort, cùng kết quả
+    overlay = State()
+    overlay.kv = ChainMap({"alice/c": "4"}, dict(st.kv))
+    assert list(overlay.scan("alice/")) == [("alice/a", "2"), ("alice/b", "1"), ("alice/c", "4")]
+    assert overlay.sender_key_counts() == {"alice": 3, "bob": 1}
+
+
+def test_prove_uses_sorted_halves():
+    rng = random.Random(3)
+    data = _random_kv(rng, 50)
+    st = State(data)
+    root = st.commit_hash()
+    for key in list(data)[:5] + ["c/missing"]:
+        proof = st.prove(key)
+        keys = sorted(data)
+        assert proof.prefix == encode_kv_items((k, data[k]) for k in keys if k < key)
+        assert proof.suffix == encode_kv_items((k, data[k]) for k in keys if k > key)
+        assert verify_state_proof(root, proof)
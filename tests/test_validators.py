@@ -0,0 +1,62 @@
+import unittest
+from src.consensus import VoteBook, make_vote, verify_vote, proposer_for
+from src.crypto import generate_keypair
+from src.network import UnreliableNetwork, Message
+from src.validators import ValidatorSet, VoterSet
+
+class TestValidatorSet(unittest.TestCase):
+    def setUp(self):
+        self.names = ["N0", "N1", "N2", "N3"]
+        self.kps = [generate_keypair() for _ in self.names]
+        self.vset = ValidatorSet(self.names, [kp.pk for kp in self.kps])
+
+    def test_index_and_pk_table(self):
+        self.assertEqual(self.vset.idx("N2"), 2)
+        self.assertEqual(self.vset.name(3), "N3")
+        self.assertEqual(self.vset.pk(1), self.kps[1].pk)
+        # Mapping name -> pk: dùng thay pk_map được
+        self.assertEqual(self.vset["N1"], self.kps[1].pk)
+        self.assertIn("N0", self.vset)
+        self.assertNotIn("X", self.vset)
+        v = make_vote("N1", 1, "h", "PREVOTE", self.kps[1].sk)
+        self.assertTrue(verify_vote(v, self.vset))
+
+    def test_proposer_schedule(self):
+        self.assertEqual(proposer_for(5, self.vset), proposer_for(5, self.names))
+
+    def test_voter_set_bitmask(self):
+        vs = VoterSet(self.vset)
+        vs.add("N3")
+        vs.add("N1")
+        vs.add("N1")
+        vs.add("unknown")
+        self.assertEqual(len(vs), 2)
+        self.assertEqual(list(vs), ["N1", "N3"])
+        self.assertIn("N3", vs)
+        self.assertNotIn("N0", vs)
+
+    def test_vote_book_tallies_by_index(self):
+        vb = VoteBook(self.vset)
+        for i in (2, 0, 1):
+            vb.add_vote(make_vote(self.names[i], 1, "h", "PRECOMMIT", self.kps[i].sk))
+        self.assertEqual(vb.finalized[1], "h")
+        self.assertEqual(vb.precommits[1]["h"].mask, 0b0111)
+
+    def test_network_link_arrays(self):
+        net = UnreliableNetwork(self.names, seed=1, drop_prob=0.0, dup_prob=0.0,
+                                bucket_cap=2, rate_per_sec=0, block_duration=5)
+        for i in range(3):
+            net.send("N0", "N1", Message(f"m{i}", "VOTE", 7, {}))
+        link = net.link_id("N0", "N1")
+        self.assertEqual(net.last_height[link], 7)
+        self.assertEqual(net.blocked_links, {("N0", "N1"): 5})
+        while not net.idle():
+            net.step(lambda msg, dst: None)
+        net.time = 5
+        net.send("N2", "N3", Message("x", "VOTE", 7, {}))
+        net.step(lambda msg, dst: None)
+        self.assertEqual(net.blocked_links, {})
+        self.assertEqual(net.blocked_until[link], 0)
+
+if __name__ == "__main__":
+    unittest.main()
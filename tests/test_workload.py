@@ -0,0 +1,55 @@
+import pytest
+
+from src.simulator import Simulator
+from src.workload import Workload, WorkloadConfig, percentile
+
+
+def _run(seed=5, **cfg):
+    sim = Simulator(4, seed=seed, accounts=6, max_block_txs=40)
+    wl = Workload(sim, WorkloadConfig(accounts=6, **cfg), seed=seed)
+    return sim, wl.run(6)
+
+
+def test_workload_commits_and_reports_latency():
+    sim, rep = _run(rate=2.0)
+    assert rep.submitted > 0
+    assert 0 < rep.committed <= rep.submitted - rep.rejected
+    assert rep.tps > 0
+    assert rep.latency_p50 <= rep.latency_p90 <= rep.latency_p99
+    # Tx đã commit nằm trong state của mọi node đã finalize
+    n0 = sim.nodes["N0"]
+    assert any(k.startswith("A") for k in n0.state.kv)
+
+
+def test_workload_replays_are_rejected():
+    _, rep = _run(rate=2.0, replay_prob=0.3)
+    assert rep.replayed > 0
+    assert rep.rejected >= 1
+    assert rep.rejected <= rep.replayed
+
+
+def test_workload_is_deterministic():
+    _, a = _run(rate=1.5, distribution="zipf")
+    _, b = _run(rate=1.5, distribution="zipf")
+    assert a == b
+
+
+def test_zipf_concentrates_on_hot_keys():
+    sim = Simulator(4, seed=1, accounts=1)
+    wl = Workload(sim, WorkloadConfig(accounts=1, key_space=50, distribution="zipf", zipf_s=1.5), seed=1)
+    keys = [wl.next_tx().key for _ in range(300)]
+    assert keys.count("A0/k0") > 300 // 10
+
+
+def test_workload_config_validation():
+    sim = Simulator(4, seed=1, accounts=2)
+    with pytest.raises(ValueError):
+        Workload(sim, WorkloadConfig(accounts=3))
+    with pytest.raises(ValueError):
+        Workload(sim, WorkloadConfig(accounts=2, distribution="pareto"))
+
+
+def test_percentile_nearest_rank():
+    assert percentile([], 50) is None
+    assert percentile([5, 1, 3, 2, 4], 50) == 3.0
+    assert percentile(list(range(1, 101)), 99) == 99.0